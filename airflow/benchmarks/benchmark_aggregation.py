@@ -0,0 +1,109 @@
+"""
+Full vs incremental aggregation of raw_stock_data
+
+Builds synthetic daily history for 500 symbols, then times the daily
+aggregation step after one more day is loaded: the previous full
+GROUP BY over all history against aggregate_stock_metrics_incremental.
+
+    python airflow/benchmarks/benchmark_aggregation.py --years 1 3 5 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'plugins'))
+
+FULL_AGGREGATION = """
+    INSERT INTO aggregated_stock_metrics
+    SELECT
+        symbol,
+        EXTRACT(year FROM date) AS year,
+        EXTRACT(month FROM date) AS month,
+        AVG((high + low) / 2) AS avg_price,
+        SUM(volume) AS total_volume,
+        STDDEV((high - low) / ((high + low) / 2)) AS price_volatility,
+        CURRENT_TIMESTAMP AS calc_timestamp
+    FROM raw_stock_data
+    GROUP BY symbol, EXTRACT(year FROM date), EXTRACT(month FROM date)
+"""
+
+def load_history(conn, symbols, start, days):
+    """Append ``days`` days of synthetic rows, each with its own load_timestamp"""
+    conn.execute(f"""
+        INSERT INTO raw_stock_data BY NAME
+        SELECT
+            'SYM' || lpad(CAST(s AS VARCHAR), 5, '0') AS symbol,
+            CAST(DATE '{start}' + INTERVAL (d) DAY AS DATE) AS date,
+            50 + random() * 10 AS open,
+            60 + random() * 10 AS high,
+            40 + random() * 10 AS low,
+            50 + random() * 10 AS close,
+            CAST(random() * 1e6 AS BIGINT) AS volume,
+            'synthetic' AS source,
+            TIMESTAMP '{start}' + INTERVAL (d) DAY + INTERVAL 18 HOUR AS load_timestamp
+        FROM range({symbols}) r(s), range({days}) t(d)
+    """)
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 5, 10])
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'years':>5} {'raw rows':>10} {'full':>10} {'incremental':>12} {'groups':>7}")
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ['DUCKDB_PATH'] = os.path.join(directory, 'stocks.db')
+            from duckdb_utils import (
+                aggregate_stock_metrics_incremental, get_duckdb_connection, init_duckdb_tables, record_raw_stock_changes,
+            )
+
+            init_duckdb_tables()
+            history_days = years * 365
+            with get_duckdb_connection() as conn:
+                load_history(conn, args.symbols, '2010-01-01', history_days)
+                rows = conn.execute("SELECT COUNT(*) FROM raw_stock_data").fetchone()[0]
+            aggregate_stock_metrics_incremental()
+
+            def next_day_incremental():
+                """Load the next day (a copy of the latest one) and aggregate it"""
+                with get_duckdb_connection() as conn:
+                    conn.execute("""
+                        INSERT INTO raw_stock_data BY NAME
+                        SELECT
+                            symbol,
+                            CAST(date + INTERVAL 1 DAY AS DATE) AS date,
+                            open, high, low, close, volume, source,
+                            load_timestamp + INTERVAL 1 DAY AS load_timestamp
+                        FROM raw_stock_data
+                        WHERE date = (SELECT MAX(date) FROM raw_stock_data)
+                    """)
+                    record_raw_stock_changes(conn, 'raw_stock_data', "date = (SELECT MAX(date) FROM raw_stock_data)")
+                start = time.perf_counter()
+                groups = aggregate_stock_metrics_incremental()
+                return time.perf_counter() - start, groups
+
+            def full():
+                with get_duckdb_connection() as conn:
+                    conn.execute("DELETE FROM aggregated_stock_metrics")
+                    conn.execute(FULL_AGGREGATION)
+
+            results = [next_day_incremental() for _ in range(args.repeat)]
+            incremental = min(elapsed for elapsed, _ in results)
+            full_time = timed(full, args.repeat)
+            print(f"{years:>5} {rows:>10} {full_time * 1000:>8.1f}ms {incremental * 1000:>10.1f}ms {results[-1][1]:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Per-query connections vs the pooled DuckDB connection manager
+
+Times repeated small analytic queries against a synthetic stocks.db, first
+opening and closing a connection per query (the previous
+get_duckdb_connection) and then through the long-lived manager, serially
+and from parallel reader threads.
+
+    python airflow/benchmarks/benchmark_duckdb_connections.py --queries 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'plugins'))
+
+QUERIES = [
+    "SELECT symbol, close FROM raw_stock_data WHERE date = DATE '2024-12-30' ORDER BY volume DESC LIMIT 10",
+    "SELECT symbol, SUM(volume) FROM raw_stock_data WHERE date >= DATE '2024-06-01' GROUP BY symbol ORDER BY 2 DESC LIMIT 10",
+    "SELECT COUNT(*) FROM aggregated_stock_metrics WHERE year = 2024 AND avg_price > 100",
+]
+
+
+def build_database(db_path, symbols, days):
+    conn = duckdb.connect(db_path)
+    conn.execute("""
+        CREATE TABLE raw_stock_data AS
+        SELECT
+            printf('SYM%05d', s) AS symbol,
+            DATE '2024-01-01' + CAST(d AS INTEGER) AS date,
+            50 + s % 100 + d * 0.1 AS open,
+            52 + s % 100 + d * 0.1 AS high,
+            48 + s % 100 + d * 0.1 AS low,
+            51 + s % 100 + d * 0.1 AS close,
+            CAST(1000 + s * d AS BIGINT) AS volume,
+            'synthetic' AS source,
+            TIMESTAMP '2024-01-01' + to_days(CAST(d AS INTEGER)) AS load_timestamp
+        FROM range(?) s(s), range(?) d(d)
+    """, [symbols, days])
+    conn.execute("""
+        CREATE TABLE aggregated_stock_metrics AS
+        SELECT symbol, EXTRACT(year FROM date) AS year, EXTRACT(month FROM date) AS month,
+               AVG((high + low) / 2) AS avg_price, SUM(volume) AS total_volume,
+               STDDEV((high - low) / ((high + low) / 2)) AS price_volatility,
+               CURRENT_TIMESTAMP AS calc_timestamp
+        FROM raw_stock_data GROUP BY ALL
+    """)
+    conn.close()
+
+
+def per_query_connection(db_path, sql):
+    # The previous get_duckdb_connection: open, query, close
+    conn = duckdb.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def pooled_reader(sql):
+    from duckdb_utils import get_duckdb_connection
+
+    with get_duckdb_connection(read_only=True) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def measure(run, count, workers=1):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        run(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if workers == 1:
+        for i in range(count):
+            one(i)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(one, range(count)))
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'qps': count / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stocks.db')
+        build_database(db_path, args.symbols, args.days)
+        os.environ['DUCKDB_PATH'] = db_path
+
+        from duckdb_utils import close_duckdb_connections
+
+        runs = [
+            ('connection per query', lambda sql: per_query_connection(db_path, sql), 1),
+            ('pooled, serial', pooled_reader, 1),
+            (f'pooled, {args.workers} threads', pooled_reader, args.workers),
+        ]
+
+        print(f"{args.symbols} symbols x {args.days} days, {args.queries} queries")
+        print(f"{'mode':<24}{'p50 ms':>10}{'p95 ms':>10}{'queries/s':>12}")
+        for name, run, workers in runs:
+            if run is pooled_reader:
+                run(QUERIES[0])  # open the manager outside the timings
+            result = measure(run, args.queries, workers)
+            print(f"{name:<24}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['qps']:>12.0f}")
+
+        close_duckdb_connections()
+
+
+if __name__ == '__main__':
+    main()
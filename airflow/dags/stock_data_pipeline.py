@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from airflow import DAG
 from airflow.providers.standard.operators.python import PythonOperator
 from airflow.decorators import task
@@ -8,7 +8,13 @@ import sys
 # Add plugins directory to path for custom utilities
 sys.path.append("/opt/airflow/plugins")
 from s3_utils import ensure_bucket_exists
-from duckdb_utils import init_duckdb_tables, get_duckdb_connection
+from duckdb_utils import (
+    init_duckdb_tables,
+    load_raw_stock_snapshot,
+    aggregate_stock_metrics_incremental,
+)
+from screener_utils import fetch_screener_snapshot, to_raw_stock_data, screener_market
+from lake_utils import write_frame_partition, write_query_partition
 
 # Default args
 default_args = {
@@ -42,25 +48,48 @@ with DAG(
 
         init_duckdb_tables()
 
+    def run_date(logical_date):
+        # Manually triggered runs have no logical date; file them under today
+        return (logical_date or datetime.now(timezone.utc)).date()
+
+    @task
+    def ingest_stock_snapshot(logical_date=None):
+        """
+        Fetch the screener snapshot, archive it to the raw lake and
+        bulk-load it into raw_stock_data
+        """
+        snapshot_date = run_date(logical_date)
+
+        stocks_df = fetch_screener_snapshot()
+        if stocks_df.empty:
+            raise ValueError("Screener returned no data")
+
+        write_frame_partition(
+            stocks_df, os.getenv("RAW_DATA_BUCKET"), "screener_snapshots", screener_market(), snapshot_date
+        )
+        return load_raw_stock_snapshot(to_raw_stock_data(stocks_df, snapshot_date))
+
     @task
     def process_stock_data():
-        """Process stock data and store aggregated metrics"""
-        with get_duckdb_connection() as conn:
-            conn.execute(
-                """
-                INSERT INTO aggregated_stock_metrics
-                SELECT
-                    symbol,
-                    EXTRACT(year FROM date) AS year,
-                    EXTRACT(month FROM date) AS month,
-                    AVG((high + low) / 2) AS avg_price,
-                    SUM(volume) AS total_volume,
-                    STDDEV((high - low) / ((high + low) / 2)) AS price_volatility,
-                    CURRENT_TIMESTAMP AS calc_timestamp
-                FROM raw_stock_data
-                GROUP BY symbol, EXTRACT(year FROM date), EXTRACT(month FROM date)
-            """
-            )
+        """Aggregate the raw rows loaded since the last run into monthly metrics"""
+        return aggregate_stock_metrics_incremental()
+
+    @task
+    def export_stock_metrics(logical_date=None):
+        """Publish the month-to-date metrics as of this run to the processed lake"""
+        snapshot_date = run_date(logical_date)
+        manifest = write_query_partition(
+            f"""
+            SELECT symbol, year, month, avg_price, total_volume, price_volatility, calc_timestamp
+            FROM aggregated_stock_metrics
+            WHERE year = {snapshot_date.year} AND month = {snapshot_date.month}
+            """,
+            os.getenv("PROCESSED_DATA_BUCKET"),
+            "aggregated_stock_metrics",
+            screener_market(),
+            snapshot_date,
+        )
+        return manifest["row_count"]
 
     # Task dependencies
-    init_storage() >> process_stock_data()
+    init_storage() >> ingest_stock_snapshot() >> process_stock_data() >> export_stock_metrics()
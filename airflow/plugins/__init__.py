@@ -1,6 +1,17 @@
 from airflow.plugins_manager import AirflowPlugin
-from duckdb_utils import get_duckdb_connection, init_duckdb_tables
-from s3_utils import get_s3_client, ensure_bucket_exists, upload_to_s3
+from duckdb_utils import get_duckdb_connection, init_duckdb_tables, load_raw_stock_snapshot, delete_raw_stock_data, aggregate_stock_metrics_incremental
+from screener_utils import fetch_screener_snapshot, to_raw_stock_data, screener_market
+from s3_utils import (
+    get_s3_client,
+    ensure_bucket_exists,
+    upload_to_s3,
+    download_from_s3,
+    upload_many_to_s3,
+    download_many_from_s3,
+    list_s3_keys,
+    delete_from_s3,
+)
+from lake_utils import write_frame_partition, write_query_partition, configure_lake_access, lake_scan
 
 class StockInsightsPlugin(AirflowPlugin):
     name = "stock_insights"
@@ -18,7 +29,22 @@ class StockInsightsPlugin(AirflowPlugin):
     helpers = [
         get_duckdb_connection,
         init_duckdb_tables,
+        load_raw_stock_snapshot,
+        delete_raw_stock_data,
+        aggregate_stock_metrics_incremental,
+        fetch_screener_snapshot,
+        to_raw_stock_data,
+        screener_market,
         get_s3_client,
         ensure_bucket_exists,
-        upload_to_s3
+        upload_to_s3,
+        download_from_s3,
+        upload_many_to_s3,
+        download_many_from_s3,
+        list_s3_keys,
+        delete_from_s3,
+        write_frame_partition,
+        write_query_partition,
+        configure_lake_access,
+        lake_scan
     ]
\ No newline at end of file
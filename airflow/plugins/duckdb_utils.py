@@ -1,20 +1,122 @@
+import atexit
 import os
+import queue
+import threading
 import duckdb
 from contextlib import contextmanager
 
-@contextmanager
-def get_duckdb_connection():
+# Cursors kept open per database for parallel readers in one process
+READER_POOL_SIZE = int(os.getenv('DUCKDB_READER_POOL_SIZE', '4'))
+
+class DuckDBConnectionManager:
+    """
+    Long-lived connection to one DuckDB database file.
+
+    The database stays open for the life of the process, so its buffer cache
+    and catalog survive between queries. Writes go through the single root
+    connection one at a time; readers borrow cursors from a pool, which share
+    the same database instance and can run in parallel threads.
+    """
+
+    def __init__(self, db_path, read_only=False, threads=None, memory_limit=None,
+                 pool_size=READER_POOL_SIZE):
+        config = {}
+        if threads:
+            config['threads'] = int(threads)
+        if memory_limit:
+            config['memory_limit'] = memory_limit
+
+        # ':memory:' and bare file names have no directory to create
+        if not read_only and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.read_only = read_only
+        self.pid = os.getpid()
+        self.connection = duckdb.connect(db_path, read_only=read_only, config=config)
+        self._write_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(pool_size)
+
+    @contextmanager
+    def writer(self):
+        """The root connection, held exclusively for the duration of the block"""
+        if self.read_only:
+            raise RuntimeError(f'{self.db_path} is open read-only')
+        with self._write_lock:
+            yield self.connection
+
+    @contextmanager
+    def reader(self):
+        """A pooled cursor; blocks while all ``pool_size`` cursors are in use"""
+        with self._reader_slots:
+            try:
+                cursor = self._readers.get_nowait()
+            except queue.Empty:
+                cursor = self.connection.cursor()
+            try:
+                yield cursor
+            except Exception:
+                # Don't hand a cursor with a failed transaction to the next reader
+                cursor.close()
+                raise
+            else:
+                self._readers.put(cursor)
+
+    def close(self):
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self.connection.close()
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_connection_manager(read_only=False):
     """
-    Context manager for DuckDB connection
+    Process-wide connection manager for DUCKDB_PATH, sized from the
+    DUCKDB_THREADS and DUCKDB_MEMORY_LIMIT settings. A read-only request is
+    served by the read-write manager when one is already open, since DuckDB
+    only allows one configuration per file within a process.
     """
     db_path = os.getenv('DUCKDB_PATH', '/opt/airflow/duckdb/stocks.db')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    conn = duckdb.connect(db_path)
-    try:
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        # Connections inherited from a parent process must not be reused
+        if manager is not None and manager.pid != os.getpid():
+            manager = None
+        if manager is not None and manager.read_only and not read_only:
+            manager.close()
+            manager = None
+        if manager is None:
+            manager = DuckDBConnectionManager(
+                db_path,
+                read_only=read_only,
+                threads=os.getenv('DUCKDB_THREADS'),
+                memory_limit=os.getenv('DUCKDB_MEMORY_LIMIT'),
+            )
+            _managers[db_path] = manager
+        return manager
+
+@atexit.register
+def close_duckdb_connections():
+    """Close every managed database, checkpointing its WAL"""
+    with _managers_lock:
+        for manager in _managers.values():
+            if manager.pid == os.getpid():
+                manager.close()
+        _managers.clear()
+
+@contextmanager
+def get_duckdb_connection(read_only=False):
+    """
+    Context manager for DuckDB connection. Yields the shared writer
+    connection, or a pooled reader cursor with ``read_only=True``.
+    """
+    manager = get_connection_manager(read_only=read_only)
+    with (manager.reader() if read_only else manager.writer()) as conn:
         yield conn
-    finally:
-        conn.close()
 
 def init_duckdb_tables():
     """
@@ -49,10 +151,171 @@ def init_duckdb_tables():
             );
         """)
 
+        # (symbol, date) keys inserted, replaced or deleted in raw_stock_data
+        # since aggregated_stock_metrics last consumed them
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_stock_changes (
+                symbol VARCHAR,
+                date DATE
+            );
+        """)
+
+        # When each incremental job last committed. Aggregation's pending work is
+        # the raw_stock_changes log, not a load_timestamp high-water mark (which
+        # missed deletes and rows committed out of timestamp order), so for it
+        # the row only records the last run; no row means rebuild everything
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+                name VARCHAR PRIMARY KEY,
+                high_water TIMESTAMP
+            );
+        """)
+
+def record_raw_stock_changes(conn, relation, where="TRUE", params=None):
+    """
+    Log the (symbol, date) keys of ``relation`` rows matching ``where`` as
+    changed. Anything writing to raw_stock_data must call this in the same
+    transaction, for deleted rows too, so their aggregates get recomputed.
+    """
+    conn.execute(
+        f"INSERT INTO raw_stock_changes SELECT DISTINCT symbol, date FROM {relation} WHERE {where}",
+        params,
+    )
+
 def load_data_to_duckdb(df, table_name):
     """
-    Load a pandas DataFrame into DuckDB
+    Load a pandas DataFrame into DuckDB, matching columns by name
     """
     with get_duckdb_connection() as conn:
         conn.register('temp_df', df)
-        conn.execute(f"INSERT INTO {table_name} SELECT * FROM temp_df")
\ No newline at end of file
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            conn.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM temp_df")
+            if table_name == 'raw_stock_data':
+                record_raw_stock_changes(conn, 'temp_df')
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.unregister('temp_df')
+
+def load_raw_stock_snapshot(df):
+    """
+    Bulk-load a snapshot (see screener_utils.to_raw_stock_data) into
+    raw_stock_data in one transaction. Rows already loaded for the same
+    (symbol, date) are replaced, so retrying a run never duplicates data.
+    Returns the number of rows loaded.
+    """
+    with get_duckdb_connection() as conn:
+        # Registered frames are scanned in place, without copying into DuckDB first
+        conn.register('snapshot_df', df)
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            conn.execute("""
+                DELETE FROM raw_stock_data
+                USING snapshot_df
+                WHERE raw_stock_data.symbol = snapshot_df.symbol
+                  AND raw_stock_data.date = snapshot_df.date
+            """)
+            conn.execute("INSERT INTO raw_stock_data BY NAME SELECT * FROM snapshot_df")
+            record_raw_stock_changes(conn, 'snapshot_df')
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.unregister('snapshot_df')
+    return len(df)
+
+def delete_raw_stock_data(where, params=None):
+    """
+    Delete the raw_stock_data rows matching the SQL condition ``where``,
+    logging their keys so aggregation drops or recomputes their groups.
+    Returns the number of rows deleted.
+    """
+    with get_duckdb_connection() as conn:
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            record_raw_stock_changes(conn, 'raw_stock_data', where, params)
+            deleted = conn.execute(f"DELETE FROM raw_stock_data WHERE {where}", params).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return deleted
+
+# pipeline_watermarks row of the aggregation job
+AGGREGATION_WATERMARK = 'aggregated_stock_metrics'
+
+def aggregate_stock_metrics_incremental():
+    """
+    Refresh aggregated_stock_metrics from the raw_stock_data keys changed
+    since the last run (see record_raw_stock_changes). Only the
+    (symbol, year, month) groups holding a changed key are recomputed and
+    replaced, so groups whose rows were all deleted disappear; the first run
+    (no watermark yet) rebuilds the whole table. The change log is consumed
+    and the watermark moved in the same transaction as the aggregate write,
+    so changes committed while a run is in progress are left for the next.
+    Returns the number of groups recomputed.
+    """
+    with get_duckdb_connection() as conn:
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            first_run = conn.execute(
+                "SELECT COUNT(*) = 0 FROM pipeline_watermarks WHERE name = ?",
+                [AGGREGATION_WATERMARK],
+            ).fetchone()[0]
+
+            if first_run:
+                conn.execute("DELETE FROM aggregated_stock_metrics")
+            conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE touched_groups AS
+                SELECT DISTINCT
+                    symbol,
+                    CAST(EXTRACT(year FROM date) AS INTEGER) AS year,
+                    CAST(EXTRACT(month FROM date) AS INTEGER) AS month
+                FROM {'raw_stock_data' if first_run else 'raw_stock_changes'}
+            """)
+
+            conn.execute("""
+                DELETE FROM aggregated_stock_metrics
+                USING touched_groups t
+                WHERE aggregated_stock_metrics.symbol = t.symbol
+                  AND aggregated_stock_metrics.year = t.year
+                  AND aggregated_stock_metrics.month = t.month
+            """)
+
+            # The date bound lets DuckDB skip row groups holding older history
+            conn.execute("""
+                INSERT INTO aggregated_stock_metrics BY NAME
+                SELECT
+                    r.symbol,
+                    t.year,
+                    t.month,
+                    AVG((r.high + r.low) / 2) AS avg_price,
+                    SUM(r.volume) AS total_volume,
+                    STDDEV((r.high - r.low) / ((r.high + r.low) / 2)) AS price_volatility,
+                    CURRENT_TIMESTAMP AS calc_timestamp
+                FROM raw_stock_data r
+                JOIN touched_groups t
+                  ON r.symbol = t.symbol
+                 AND EXTRACT(year FROM r.date) = t.year
+                 AND EXTRACT(month FROM r.date) = t.month
+                WHERE r.date >= (SELECT MIN(make_date(year, month, 1)) FROM touched_groups)
+                GROUP BY r.symbol, t.year, t.month
+            """)
+            groups = conn.execute("SELECT COUNT(*) FROM touched_groups").fetchone()[0]
+
+            # Only the log rows this transaction saw are removed
+            conn.execute("DELETE FROM raw_stock_changes")
+            conn.execute(
+                "INSERT OR REPLACE INTO pipeline_watermarks VALUES (?, CURRENT_TIMESTAMP)",
+                [AGGREGATION_WATERMARK],
+            )
+            conn.execute("DROP TABLE touched_groups")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return groups
@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import duckdb
+import pandas as pd
+
+from duckdb_utils import get_duckdb_connection
+from s3_utils import delete_from_s3, list_s3_keys, upload_many_to_s3, upload_to_s3
+
+# Parquet layout of the lake: <dataset>/market=<market>/date=<YYYY-MM-DD>/part-<n>.parquet
+PARQUET_COMPRESSION = 'zstd'
+# Files roll over once they reach about this size, so large partitions split
+# into several scan-friendly files instead of one huge one
+LAKE_FILE_SIZE_BYTES = int(os.getenv('LAKE_FILE_SIZE_BYTES', str(128 * 1024 * 1024)))
+LAKE_ROW_GROUP_SIZE = int(os.getenv('LAKE_ROW_GROUP_SIZE', '122880'))
+MANIFEST_NAME = '_manifest.json'
+
+def partition_prefix(dataset, market, date):
+    """
+    Object prefix of one market/day partition of a dataset
+    """
+    return f'{dataset}/market={market}/date={pd.Timestamp(date).date().isoformat()}/'
+
+def _copy_to_parquet(conn, query, directory):
+    """
+    Write ``query`` as compressed Parquet files of bounded size into ``directory``
+    """
+    conn.execute(f"""
+        COPY ({query}) TO '{directory}' (
+            FORMAT PARQUET,
+            COMPRESSION {PARQUET_COMPRESSION},
+            ROW_GROUP_SIZE {LAKE_ROW_GROUP_SIZE},
+            FILE_SIZE_BYTES {LAKE_FILE_SIZE_BYTES},
+            FILENAME_PATTERN 'part-{{i}}'
+        )
+    """)
+    files = conn.execute(f"""
+        SELECT file_name, num_rows
+        FROM parquet_file_metadata('{directory}/*.parquet')
+        ORDER BY file_name
+    """).fetchall()
+    columns = conn.execute(
+        f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM read_parquet('{directory}/*.parquet'))"
+    ).fetchall() if files else []
+    # Rolling over can leave an empty last file; keep one only for an empty partition
+    non_empty = [(path, rows) for path, rows in files if rows]
+    return non_empty or files[:1], columns
+
+def _publish_partition(conn, query, bucket, dataset, market, date):
+    prefix = partition_prefix(dataset, market, date)
+    with tempfile.TemporaryDirectory() as staging:
+        directory = os.path.join(staging, 'partition')
+        files, columns = _copy_to_parquet(conn, query, directory)
+
+        parts = [
+            {
+                'key': prefix + os.path.basename(path),
+                'rows': rows,
+                'bytes': os.path.getsize(path),
+            }
+            for path, rows in files
+        ]
+        manifest = {
+            'dataset': dataset,
+            'market': market,
+            'date': pd.Timestamp(date).date().isoformat(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'compression': PARQUET_COMPRESSION,
+            'row_count': sum(part['rows'] for part in parts),
+            'columns': [{'name': name, 'type': dtype} for name, dtype in columns],
+            'files': parts,
+        }
+        manifest_path = os.path.join(staging, MANIFEST_NAME)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        existing = set(list_s3_keys(bucket, prefix))
+        upload_many_to_s3([(path, part['key']) for (path, _), part in zip(files, parts)], bucket)
+        # The manifest goes last, once every file it lists is in place
+        upload_to_s3(manifest_path, bucket, prefix + MANIFEST_NAME)
+
+    # Files left over from an earlier, larger write of the same partition
+    stale = existing - {part['key'] for part in parts} - {prefix + MANIFEST_NAME}
+    if stale:
+        delete_from_s3(bucket, sorted(stale))
+    return manifest
+
+def write_frame_partition(df, bucket, dataset, market, date):
+    """
+    Write a DataFrame as the market/date partition of a dataset, replacing
+    any earlier write of that partition. Returns the partition's manifest.
+    """
+    conn = duckdb.connect()
+    try:
+        conn.register('partition_df', df)
+        return _publish_partition(conn, 'SELECT * FROM partition_df', bucket, dataset, market, date)
+    finally:
+        conn.close()
+
+def write_query_partition(query, bucket, dataset, market, date):
+    """
+    Write the result of a query against stocks.db as the market/date
+    partition of a dataset. Returns the partition's manifest.
+    """
+    with get_duckdb_connection(read_only=True) as conn:
+        return _publish_partition(conn, query, bucket, dataset, market, date)
+
+def _sql_string(value):
+    return "'" + str(value or '').replace("'", "''") + "'"
+
+def configure_lake_access(conn):
+    """
+    Let a DuckDB connection read s3:// paths with the pipeline's S3/MinIO
+    settings (needs the httpfs extension)
+    """
+    endpoint_url = os.getenv('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+    # MinIO serves buckets by path rather than by virtual host
+    url_style = 'path' if 'minio' in endpoint_url else 'vhost'
+    conn.execute(f"""
+        CREATE OR REPLACE SECRET lake_s3 (
+            TYPE s3,
+            KEY_ID {_sql_string(os.getenv('AWS_ACCESS_KEY_ID'))},
+            SECRET {_sql_string(os.getenv('AWS_SECRET_ACCESS_KEY'))},
+            REGION {_sql_string(os.getenv('AWS_DEFAULT_REGION', 'us-east-1'))},
+            ENDPOINT {_sql_string(endpoint_url.replace('http://', '').replace('https://', ''))},
+            URL_STYLE '{url_style}',
+            USE_SSL {str(endpoint_url.startswith('https://')).lower()}
+        )
+    """)
+
+def lake_scan(bucket, dataset, market=None, root='s3://'):
+    """
+    read_parquet() over a dataset with hive partitioning, so filters on
+    ``market`` and ``date`` only open the matching partitions, e.g.
+
+        SELECT ... FROM {lake_scan(bucket, 'screener_snapshots')}
+        WHERE date BETWEEN DATE '2025-06-01' AND DATE '2025-06-30'
+    """
+    market_glob = f'market={market}' if market else '*'
+    path = f'{root}{bucket}/{dataset}/{market_glob}/*/*.parquet'
+    return f"read_parquet('{path}', hive_partitioning = true, hive_types = {{'market': VARCHAR, 'date': DATE}})"
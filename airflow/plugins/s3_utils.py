@@ -1,25 +1,35 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 import boto3
+import urllib3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 
-def get_s3_client():
-    """
-    Get S3 client based on environment configuration.
-    Returns either MinIO client for local development or boto3 S3 client for production.
-    """
-    endpoint_url = os.getenv('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
-    access_key = os.getenv('AWS_ACCESS_KEY_ID')
-    secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
-    region = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+# Concurrent transfers per batch; also sizes each client's connection pool
+S3_MAX_WORKERS = int(os.getenv('S3_MAX_WORKERS', '8'))
+# Multipart part size; S3 and MinIO require at least 5 MiB per part
+S3_MULTIPART_CHUNK_SIZE = int(os.getenv('S3_MULTIPART_CHUNK_SIZE', str(8 * 1024 * 1024)))
+
+_clients = {}
+_clients_lock = threading.Lock()
 
+def _build_s3_client(endpoint_url, access_key, secret_key, region):
     if 'minio' in endpoint_url:
         # Local development with MinIO
+        timeout = urllib3.Timeout(connect=300, read=300)
         return Minio(
             endpoint_url.replace('http://', '').replace('https://', ''),
             access_key=access_key,
             secret_key=secret_key,
-            secure=False
+            secure=False,
+            http_client=urllib3.PoolManager(
+                timeout=timeout,
+                maxsize=S3_MAX_WORKERS,
+                retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+            ),
         )
     else:
         # Production with AWS S3
@@ -28,9 +38,37 @@ def get_s3_client():
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
             region_name=region,
-            config=Config(signature_version='s3v4')
+            config=Config(signature_version='s3v4', max_pool_connections=S3_MAX_WORKERS)
         )
 
+def get_s3_client():
+    """
+    Get S3 client based on environment configuration.
+    Returns either MinIO client for local development or boto3 S3 client for production.
+    Clients are thread-safe and cached per endpoint and credentials, so their
+    connection pools are reused across calls.
+    """
+    endpoint_url = os.getenv('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+    access_key = os.getenv('AWS_ACCESS_KEY_ID')
+    secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
+    region = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+
+    # Connection pools must not be shared with a forked parent
+    key = (os.getpid(), endpoint_url, access_key, secret_key, region)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_s3_client(endpoint_url, access_key, secret_key, region)
+            _clients[key] = client
+        return client
+
+def _transfer_config(chunk_size, max_concurrency):
+    return TransferConfig(
+        multipart_threshold=chunk_size,
+        multipart_chunksize=chunk_size,
+        max_concurrency=max_concurrency,
+    )
+
 def ensure_bucket_exists(bucket_name):
     """
     Ensure the specified bucket exists, create it if it doesn't.
@@ -46,24 +84,112 @@ def ensure_bucket_exists(bucket_name):
         except:
             client.create_bucket(Bucket=bucket_name)
 
-def upload_to_s3(local_path, bucket, s3_key):
+def upload_to_s3(local_path, bucket, s3_key, chunk_size=None, max_concurrency=None):
     """
-    Upload a file to S3/MinIO
+    Upload a file to S3/MinIO, in parts of ``chunk_size`` bytes when larger
     """
     client = get_s3_client()
-    
+    chunk_size = chunk_size or S3_MULTIPART_CHUNK_SIZE
+    max_concurrency = min(max_concurrency or S3_MAX_WORKERS, S3_MAX_WORKERS)
+
     if isinstance(client, Minio):
-        client.fput_object(bucket, s3_key, local_path)
+        client.fput_object(
+            bucket, s3_key, local_path, part_size=chunk_size, num_parallel_uploads=max_concurrency
+        )
     else:
-        client.upload_file(local_path, bucket, s3_key)
+        client.upload_file(
+            local_path, bucket, s3_key, Config=_transfer_config(chunk_size, max_concurrency)
+        )
 
-def download_from_s3(bucket, s3_key, local_path):
+def download_from_s3(bucket, s3_key, local_path, chunk_size=None, max_concurrency=None):
     """
     Download a file from S3/MinIO
     """
     client = get_s3_client()
-    
+
     if isinstance(client, Minio):
+        # MinIO streams the object in one request
         client.fget_object(bucket, s3_key, local_path)
     else:
-        client.download_file(bucket, s3_key, local_path)
\ No newline at end of file
+        client.download_file(
+            bucket,
+            s3_key,
+            local_path,
+            Config=_transfer_config(
+                chunk_size or S3_MULTIPART_CHUNK_SIZE,
+                min(max_concurrency or S3_MAX_WORKERS, S3_MAX_WORKERS),
+            ),
+        )
+
+def _run_batch(transfer, items, bucket, max_workers, chunk_size):
+    items = list(items)
+    if not items:
+        return []
+    # The cached client's pool holds S3_MAX_WORKERS connections; more threads would only queue on it
+    max_workers = min(max_workers or S3_MAX_WORKERS, S3_MAX_WORKERS, len(items))
+    # Split the connection budget between the objects moving at once
+    per_object = max(1, S3_MAX_WORKERS // max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-transfer') as pool:
+        futures = [
+            pool.submit(transfer, bucket, first, second, chunk_size, per_object)
+            for first, second in items
+        ]
+        # The pool waits for every transfer; the first failure is raised after
+        return [future.result() for future in futures]
+
+def upload_many_to_s3(files, bucket, max_workers=None, chunk_size=None):
+    """
+    Upload ``(local_path, s3_key)`` pairs concurrently through a bounded
+    thread pool. Returns the uploaded keys in input order.
+    """
+    def upload(bucket, local_path, s3_key, chunk_size, max_concurrency):
+        upload_to_s3(local_path, bucket, s3_key, chunk_size, max_concurrency)
+        return s3_key
+
+    return _run_batch(upload, files, bucket, max_workers, chunk_size)
+
+def download_many_from_s3(objects, bucket, max_workers=None, chunk_size=None):
+    """
+    Download ``(s3_key, local_path)`` pairs concurrently through a bounded
+    thread pool. Returns the local paths in input order.
+    """
+    def download(bucket, s3_key, local_path, chunk_size, max_concurrency):
+        download_from_s3(bucket, s3_key, local_path, chunk_size, max_concurrency)
+        return local_path
+
+    return _run_batch(download, objects, bucket, max_workers, chunk_size)
+
+def list_s3_keys(bucket, prefix):
+    """
+    Keys of every object under ``prefix``
+    """
+    client = get_s3_client()
+
+    if isinstance(client, Minio):
+        return [obj.object_name for obj in client.list_objects(bucket, prefix=prefix, recursive=True)]
+    keys = []
+    for page in client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return keys
+
+def delete_from_s3(bucket, keys):
+    """
+    Delete objects from S3/MinIO in bulk requests
+    """
+    client = get_s3_client()
+    keys = list(keys)
+
+    if isinstance(client, Minio):
+        # remove_objects is lazy; errors only surface while iterating
+        errors = list(client.remove_objects(bucket, [DeleteObject(key) for key in keys]))
+        if errors:
+            raise RuntimeError(f'Failed to delete {len(errors)} objects from {bucket}: {errors[0]}')
+    else:
+        # DeleteObjects accepts at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            response = client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True},
+            )
+            if response.get('Errors'):
+                raise RuntimeError(f"Failed to delete {len(response['Errors'])} objects from {bucket}")
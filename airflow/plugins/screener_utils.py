@@ -0,0 +1,47 @@
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import tvscreener as tvs
+
+# Screener columns feeding raw_stock_data, mapped to the table's columns
+RAW_STOCK_COLUMNS = {
+    'Symbol': 'symbol',
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Price': 'close',
+    'Volume': 'volume',
+}
+
+def screener_market():
+    """
+    Market fetched by the pipeline (SCREENER_MARKET, default EGYPT)
+    """
+    return os.getenv('SCREENER_MARKET', 'EGYPT')
+
+def fetch_screener_snapshot(market=None, limit=None):
+    """
+    Fetch the current screener snapshot for a market (default: screener_market())
+    """
+    market = market or screener_market()
+    limit = int(limit or os.getenv('SCREENER_LIMIT', '500'))
+
+    ss = tvs.StockScreener()
+    ss.set_markets(tvs.Market[market])
+    ss.set_range(0, limit)
+    return ss.get()
+
+def to_raw_stock_data(df, snapshot_date, load_timestamp=None, source='tvscreener'):
+    """
+    Map a screener frame onto raw_stock_data's columns, one row per symbol
+    """
+    raw = df.reindex(columns=list(RAW_STOCK_COLUMNS)).rename(columns=RAW_STOCK_COLUMNS)
+    raw = raw[raw['symbol'].notna()].drop_duplicates('symbol', keep='first')
+
+    # Volumes come back as floats; keep missing ones as NULL in the BIGINT column
+    raw['volume'] = raw['volume'].round().astype('Int64')
+    raw['date'] = pd.Timestamp(snapshot_date).date()
+    raw['source'] = source
+    raw['load_timestamp'] = load_timestamp or datetime.now(timezone.utc).replace(tzinfo=None)
+    return raw.reset_index(drop=True)
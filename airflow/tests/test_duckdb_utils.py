@@ -0,0 +1,330 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'plugins'))
+
+import numpy as np
+import pandas as pd
+
+import duckdb_utils
+from duckdb_utils import (
+    DuckDBConnectionManager,
+    aggregate_stock_metrics_incremental,
+    delete_raw_stock_data,
+    get_connection_manager,
+    init_duckdb_tables,
+    load_raw_stock_snapshot,
+    record_raw_stock_changes,
+)
+from screener_utils import to_raw_stock_data
+
+
+class ConnectionManagerTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = os.path.join(directory.name, 'nested', 'stocks.db')
+        managers = mock.patch.dict(duckdb_utils._managers, clear=True)
+        managers.start()
+        self.addCleanup(managers.stop)
+        env = mock.patch.dict(os.environ, {'DUCKDB_PATH': self.db_path})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(duckdb_utils.close_duckdb_connections)
+
+    def test_writer_is_held_exclusively(self):
+        manager = DuckDBConnectionManager(self.db_path)
+        self.addCleanup(manager.close)
+        inside, overlaps = [], []
+
+        def write(i):
+            with manager.writer() as conn:
+                inside.append(i)
+                overlaps.append(len(inside))
+                conn.execute('SELECT 1')
+                time.sleep(0.02)
+                inside.remove(i)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(write, range(8)))
+        self.assertEqual(max(overlaps), 1)
+
+    def test_readers_are_pooled_and_bounded(self):
+        manager = DuckDBConnectionManager(self.db_path, pool_size=2)
+        self.addCleanup(manager.close)
+        with manager.writer() as conn:
+            conn.execute('CREATE TABLE t AS SELECT range AS x FROM range(10)')
+
+        lock = threading.Lock()
+        active, peak, cursors = [0], [0], set()
+
+        def read(_):
+            with manager.reader() as cursor:
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                    cursors.add(id(cursor))
+                total = cursor.execute('SELECT sum(x) FROM t').fetchone()[0]
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+                return total
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            self.assertEqual(set(pool.map(read, range(12))), {45})
+        # Readers run in parallel, never more than pool_size at once, on reused cursors
+        self.assertEqual(peak[0], 2)
+        self.assertLessEqual(len(cursors), 2)
+
+    def test_failed_reader_cursor_is_not_reused(self):
+        manager = DuckDBConnectionManager(self.db_path, pool_size=1)
+        self.addCleanup(manager.close)
+        with manager.reader() as cursor:
+            healthy = cursor
+        with manager.reader() as cursor:
+            self.assertIs(cursor, healthy)
+
+        with self.assertRaises(Exception):
+            with manager.reader() as cursor:
+                cursor.execute('SELECT * FROM missing_table')
+        with manager.reader() as cursor:
+            self.assertIsNot(cursor, healthy)
+            self.assertEqual(cursor.execute('SELECT 42').fetchone()[0], 42)
+
+    def test_read_only_manager_has_no_writer(self):
+        DuckDBConnectionManager(self.db_path).close()
+        manager = DuckDBConnectionManager(self.db_path, read_only=True)
+        self.addCleanup(manager.close)
+        with self.assertRaises(RuntimeError):
+            with manager.writer():
+                pass
+
+    def test_managers_are_shared_per_process(self):
+        manager = get_connection_manager()
+        self.addCleanup(manager.close)
+        self.assertIs(get_connection_manager(), manager)
+        # A read-only request is served by the open read-write manager
+        self.assertIs(get_connection_manager(read_only=True), manager)
+
+        # A forked child must not reuse its parent's connection
+        with mock.patch.object(duckdb_utils.os, 'getpid', return_value=manager.pid + 1):
+            child = get_connection_manager()
+            self.addCleanup(child.close)
+        self.assertIsNot(child, manager)
+
+    def test_in_memory_database(self):
+        with mock.patch.dict(os.environ, {'DUCKDB_PATH': ':memory:'}):
+            with duckdb_utils.get_duckdb_connection() as conn:
+                conn.execute('CREATE TABLE t (x INTEGER)')
+            with duckdb_utils.get_duckdb_connection(read_only=True) as cursor:
+                self.assertEqual(cursor.execute('SELECT count(*) FROM t').fetchone()[0], 0)
+
+
+
+class InMemoryDatabaseTestCase(unittest.TestCase):
+    """Tests against a fresh in-memory stocks database with the pipeline's tables"""
+
+    def setUp(self):
+        managers = mock.patch.dict(duckdb_utils._managers, clear=True)
+        managers.start()
+        self.addCleanup(managers.stop)
+        env = mock.patch.dict(os.environ, {'DUCKDB_PATH': ':memory:'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(duckdb_utils.close_duckdb_connections)
+        init_duckdb_tables()
+
+    def query(self, sql):
+        with duckdb_utils.get_duckdb_connection() as conn:
+            return conn.execute(sql).fetchall()
+
+
+def screener_frame(prices, volume=1000.0):
+    """Screener columns for one row per symbol, priced from ``prices``"""
+    symbols = list(prices)
+    close = np.array([prices[symbol] for symbol in symbols], dtype=float)
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Open': close - 1,
+        'High': close + 2,
+        'Low': close - 2,
+        'Price': close,
+        'Volume': volume,
+    })
+
+
+class RawSnapshotLoadTests(InMemoryDatabaseTestCase):
+    def load(self, prices, day, **kwargs):
+        return load_raw_stock_snapshot(to_raw_stock_data(screener_frame(prices, **kwargs), day))
+
+    def rows(self):
+        return self.query('SELECT symbol, date::VARCHAR, close, volume FROM raw_stock_data ORDER BY ALL')
+
+    def test_reloading_a_day_replaces_its_rows(self):
+        self.assertEqual(self.load({'COMI': 80.0, 'ETEL': 40.0}, '2025-06-02'), 2)
+        first = self.rows()
+        self.load({'COMI': 80.0, 'ETEL': 40.0}, '2025-06-02')
+        self.assertEqual(self.rows(), first)
+
+        self.load({'COMI': 81.5}, '2025-06-02')
+        self.load({'COMI': 82.0, 'ETEL': 41.0}, '2025-06-03')
+        self.assertEqual(self.rows(), [
+            ('COMI', '2025-06-02', 81.5, 1000),
+            ('COMI', '2025-06-03', 82.0, 1000),
+            ('ETEL', '2025-06-02', 40.0, 1000),
+            ('ETEL', '2025-06-03', 41.0, 1000),
+        ])
+
+    def test_snapshot_rows_are_cleaned_before_loading(self):
+        frame = screener_frame({'COMI': 80.0, 'ETEL': 40.0})
+        frame = pd.concat([frame, frame.iloc[[0]].assign(Price=99.0), frame.iloc[[1]].assign(Symbol=None)])
+        frame['Volume'] = [1500.4, np.nan, 7.0, 8.0]
+        load_raw_stock_snapshot(to_raw_stock_data(frame, '2025-06-02'))
+        # One row per symbol (the first), no symbol-less rows, missing volumes as NULL
+        self.assertEqual(self.rows(), [('COMI', '2025-06-02', 80.0, 1500), ('ETEL', '2025-06-02', 40.0, None)])
+
+    def test_failed_loads_leave_the_table_untouched(self):
+        self.load({'COMI': 80.0}, '2025-06-02')
+        before = self.rows()
+        bad = to_raw_stock_data(screener_frame({'COMI': 81.0}), '2025-06-02')
+        bad['volume'] = 'not a number'
+        with self.assertRaises(Exception):
+            load_raw_stock_snapshot(bad)
+        self.assertEqual(self.rows(), before)
+
+
+
+# What aggregate_stock_metrics_incremental must match: every group rebuilt from scratch
+FULL_AGGREGATION = """
+    SELECT
+        symbol,
+        CAST(EXTRACT(year FROM date) AS INTEGER) AS year,
+        CAST(EXTRACT(month FROM date) AS INTEGER) AS month,
+        AVG((high + low) / 2) AS avg_price,
+        SUM(volume) AS total_volume,
+        STDDEV((high - low) / ((high + low) / 2)) AS price_volatility
+    FROM raw_stock_data
+    GROUP BY ALL
+    ORDER BY ALL
+"""
+
+
+class PausingConnection:
+    """Writer connection that calls ``before_consume()`` just before the change log is cleared"""
+
+    def __init__(self, conn, before_consume):
+        self.conn = conn
+        self.before_consume = before_consume
+
+    def execute(self, sql, *args):
+        if sql.strip() == 'DELETE FROM raw_stock_changes':
+            self.before_consume()
+        return self.conn.execute(sql, *args)
+
+
+class IncrementalAggregationTests(InMemoryDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for day in ('2025-05-29', '2025-05-30', '2025-06-02', '2025-06-03'):
+            self.load({'COMI': 80.0 + int(day[-2:]), 'ETEL': 40.0, 'HRHO': 20.0 - int(day[-2:]) / 10}, day)
+
+    def load(self, prices, day):
+        load_raw_stock_snapshot(to_raw_stock_data(screener_frame(prices), day))
+
+    def aggregates(self):
+        return self.query("""
+            SELECT symbol, year, month, avg_price, total_volume, price_volatility
+            FROM aggregated_stock_metrics
+            ORDER BY ALL
+        """)
+
+    def calculated_at(self):
+        return dict(((symbol, month), at) for symbol, month, at in self.query(
+            'SELECT symbol, month, calc_timestamp FROM aggregated_stock_metrics'
+        ))
+
+    def assertMatchesFullAggregation(self):
+        self.assertEqual(self.aggregates(), self.query(FULL_AGGREGATION))
+
+    def test_first_run_rebuilds_everything(self):
+        self.query("INSERT INTO aggregated_stock_metrics VALUES ('GONE', 2020, 1, 1, 1, 0, NULL)")
+        self.assertEqual(aggregate_stock_metrics_incremental(), 6)
+        self.assertMatchesFullAggregation()
+        self.assertEqual(self.query('SELECT count(*) FROM raw_stock_changes'), [(0,)])
+        self.assertEqual(aggregate_stock_metrics_incremental(), 0)
+
+    def test_only_changed_groups_are_recomputed(self):
+        aggregate_stock_metrics_incremental()
+        before = self.calculated_at()
+
+        self.load({'COMI': 150.0}, '2025-06-04')
+        self.assertEqual(aggregate_stock_metrics_incremental(), 1)
+        self.assertMatchesFullAggregation()
+        after = self.calculated_at()
+        self.assertGreater(after[('COMI', 6)], before[('COMI', 6)])
+        self.assertEqual({key: at for key, at in after.items() if key != ('COMI', 6)},
+                         {key: at for key, at in before.items() if key != ('COMI', 6)})
+
+    def test_replaced_and_deleted_rows_are_reaggregated(self):
+        aggregate_stock_metrics_incremental()
+
+        # Reloading a past day keeps its original dates and an older load_timestamp
+        self.load({'ETEL': 10.0}, '2025-05-29')
+        delete_raw_stock_data("symbol = ? AND date >= ?", ['HRHO', '2025-06-01'])
+        self.assertEqual(aggregate_stock_metrics_incremental(), 2)
+        self.assertMatchesFullAggregation()
+        self.assertNotIn(('HRHO', 6), self.calculated_at())
+
+    def test_a_failed_run_keeps_the_change_log(self):
+        aggregate_stock_metrics_incremental()
+        watermark = self.query('SELECT high_water FROM pipeline_watermarks')
+        self.load({'COMI': 150.0}, '2025-06-04')
+
+        self.query('ALTER TABLE aggregated_stock_metrics RENAME TO aggregated_stock_metrics_old')
+        with self.assertRaises(Exception):
+            aggregate_stock_metrics_incremental()
+        self.query('ALTER TABLE aggregated_stock_metrics_old RENAME TO aggregated_stock_metrics')
+        self.assertEqual(self.query('SELECT high_water FROM pipeline_watermarks'), watermark)
+        self.assertEqual(self.query('SELECT symbol, date::VARCHAR FROM raw_stock_changes'), [('COMI', '2025-06-04')])
+
+        self.assertEqual(aggregate_stock_metrics_incremental(), 1)
+        self.assertMatchesFullAggregation()
+
+    def test_changes_committed_during_a_run_are_left_for_the_next(self):
+        aggregate_stock_metrics_incremental()
+        self.load({'COMI': 150.0}, '2025-06-04')
+        manager = get_connection_manager()
+
+        def concurrent_load():
+            # Another connection commits a row while the run's transaction is open
+            with manager.reader() as cursor:
+                cursor.execute("""
+                    INSERT INTO raw_stock_data
+                    VALUES ('ETEL', DATE '2025-05-31', 1, 99, 1, 50, 5, 'test', TIMESTAMP '2000-01-01')
+                """)
+                record_raw_stock_changes(cursor, 'raw_stock_data', "date = DATE '2025-05-31'")
+
+        real = duckdb_utils.get_duckdb_connection
+
+        @contextmanager
+        def pausing_connection(read_only=False):
+            with real(read_only) as conn:
+                yield PausingConnection(conn, concurrent_load)
+
+        with mock.patch.object(duckdb_utils, 'get_duckdb_connection', pausing_connection):
+            self.assertEqual(aggregate_stock_metrics_incremental(), 1)
+        self.assertEqual(self.query('SELECT symbol, date::VARCHAR FROM raw_stock_changes'), [('ETEL', '2025-05-31')])
+
+        self.assertEqual(aggregate_stock_metrics_incremental(), 1)
+        self.assertMatchesFullAggregation()
+
+
+if __name__ == '__main__':
+    unittest.main()
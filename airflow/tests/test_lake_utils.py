@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'plugins'))
+
+import lake_utils
+
+
+class LocalBucket:
+    """Stand-in for the s3_utils calls lake_utils makes, backed by a directory"""
+
+    def __init__(self, root):
+        self.root = root
+        self.deleted = []
+
+    def path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+
+    def upload_to_s3(self, local_path, bucket, s3_key, *args, **kwargs):
+        os.makedirs(os.path.dirname(self.path(bucket, s3_key)), exist_ok=True)
+        shutil.copyfile(local_path, self.path(bucket, s3_key))
+
+    def upload_many_to_s3(self, files, bucket, *args, **kwargs):
+        for local_path, s3_key in files:
+            self.upload_to_s3(local_path, bucket, s3_key)
+        return [s3_key for _, s3_key in files]
+
+    def list_s3_keys(self, bucket, prefix):
+        base = os.path.join(self.root, bucket)
+        return [
+            os.path.relpath(os.path.join(directory, name), base)
+            for directory, _, names in os.walk(base)
+            for name in names
+            if os.path.relpath(os.path.join(directory, name), base).startswith(prefix)
+        ]
+
+    def delete_from_s3(self, bucket, keys):
+        for key in keys:
+            os.remove(self.path(bucket, key))
+            self.deleted.append(key)
+
+
+def snapshot_frame(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'symbol': [f'SYM{i:05d}' for i in range(rows)],
+        'close': rng.normal(50, 10, rows),
+        'volume': rng.integers(0, 10**6, rows),
+    })
+
+
+@mock.patch.object(lake_utils, 'LAKE_FILE_SIZE_BYTES', 64 * 1024)
+@mock.patch.object(lake_utils, 'LAKE_ROW_GROUP_SIZE', 2048)
+class PartitionWriterTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.bucket = LocalBucket(self.root)
+        for name in ('upload_to_s3', 'upload_many_to_s3', 'list_s3_keys', 'delete_from_s3'):
+            patcher = mock.patch.object(lake_utils, name, getattr(self.bucket, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, rows, date='2025-06-02'):
+        return lake_utils.write_frame_partition(snapshot_frame(rows), 'raw', 'snapshots', 'egypt', date)
+
+    def keys(self):
+        return sorted(self.bucket.list_s3_keys('raw', 'snapshots/'))
+
+    def test_manifest_describes_the_uploaded_parts(self):
+        manifest = self.write(20000)
+        prefix = 'snapshots/market=egypt/date=2025-06-02/'
+
+        self.assertEqual((manifest['dataset'], manifest['market'], manifest['date']), ('snapshots', 'egypt', '2025-06-02'))
+        self.assertEqual(manifest['compression'], 'zstd')
+        self.assertEqual(manifest['row_count'], 20000)
+        self.assertEqual([column['name'] for column in manifest['columns']], ['symbol', 'close', 'volume'])
+        # The partition rolled over into several bounded files
+        self.assertGreater(len(manifest['files']), 1)
+        self.assertEqual(sum(part['rows'] for part in manifest['files']), 20000)
+        self.assertEqual(self.keys(), sorted([part['key'] for part in manifest['files']] + [prefix + '_manifest.json']))
+        for part in manifest['files']:
+            self.assertEqual(os.path.getsize(self.bucket.path('raw', part['key'])), part['bytes'])
+        with open(self.bucket.path('raw', prefix + '_manifest.json')) as f:
+            self.assertEqual(json.load(f), manifest)
+
+    def test_rewrites_delete_stale_parts(self):
+        first = self.write(20000)
+        other_day = self.write(100, date='2025-06-03')
+        second = self.write(100)
+
+        self.assertEqual(len(second['files']), 1)
+        stale = {part['key'] for part in first['files']} - {part['key'] for part in second['files']}
+        self.assertEqual(set(self.bucket.deleted), stale)
+        # Other partitions are left alone
+        self.assertTrue(all(os.path.exists(self.bucket.path('raw', part['key'])) for part in other_day['files']))
+
+        scan = lake_utils.lake_scan('raw', 'snapshots', market='egypt', root=self.root + '/')
+        counts = duckdb.sql(f"SELECT date, count(*) FROM {scan} GROUP BY date ORDER BY date").fetchall()
+        self.assertEqual([(str(day), rows) for day, rows in counts], [('2025-06-02', 100), ('2025-06-03', 100)])
+
+    def test_empty_partitions_keep_one_file(self):
+        manifest = self.write(0)
+        self.assertEqual(manifest['row_count'], 0)
+        self.assertEqual(len(manifest['files']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
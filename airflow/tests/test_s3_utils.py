@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'plugins'))
+
+from minio import Minio
+
+import s3_utils
+
+
+class ClientCacheTests(unittest.TestCase):
+    def setUp(self):
+        clients = mock.patch.dict(s3_utils._clients, clear=True)
+        clients.start()
+        self.addCleanup(clients.stop)
+
+    def test_clients_are_cached_per_process_and_endpoint(self):
+        minio_env = {'S3_ENDPOINT_URL': 'http://minio:9000', 'AWS_ACCESS_KEY_ID': 'key', 'AWS_SECRET_ACCESS_KEY': 'secret'}
+        with mock.patch.dict(os.environ, minio_env):
+            client = s3_utils.get_s3_client()
+            self.assertIsInstance(client, Minio)
+            self.assertIs(s3_utils.get_s3_client(), client)
+            # Connection pools are not shared with a forked parent
+            with mock.patch.object(s3_utils.os, 'getpid', return_value=os.getpid() + 1):
+                self.assertIsNot(s3_utils.get_s3_client(), client)
+
+        with mock.patch.dict(os.environ, {**minio_env, 'S3_ENDPOINT_URL': 'https://s3.amazonaws.com'}):
+            aws = s3_utils.get_s3_client()
+            self.assertNotIsInstance(aws, Minio)
+            self.assertEqual(aws.meta.config.max_pool_connections, s3_utils.S3_MAX_WORKERS)
+        self.assertEqual(len(s3_utils._clients), 3)
+
+
+@mock.patch.object(s3_utils, 'S3_MAX_WORKERS', 4)
+class BatchTransferTests(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+        self.calls = []
+
+    def transfer(self, bucket, first, second, chunk_size, max_concurrency):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append(max_concurrency)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        return first
+
+    def test_workers_are_clamped_to_the_connection_pool(self):
+        items = [(f'file{i}', f'key{i}') for i in range(20)]
+        result = s3_utils._run_batch(self.transfer, items, 'bucket', 100, None)
+
+        self.assertEqual(result, [first for first, _ in items])
+        self.assertEqual(self.peak, 4)
+        self.assertEqual(set(self.calls), {1})
+
+    def test_few_objects_share_the_connection_budget(self):
+        s3_utils._run_batch(self.transfer, [('a', 'x'), ('b', 'y')], 'bucket', None, None)
+        self.assertEqual(self.calls, [2, 2])
+        self.assertEqual(s3_utils._run_batch(self.transfer, [], 'bucket', None, None), [])
+
+    def test_failures_are_raised_after_every_transfer_finished(self):
+        def flaky(bucket, first, second, chunk_size, max_concurrency):
+            if first == 'bad':
+                raise OSError('reset by peer')
+            return self.transfer(bucket, first, second, chunk_size, max_concurrency)
+
+        with self.assertRaises(OSError):
+            s3_utils._run_batch(flaky, [('a', 'x'), ('bad', 'y'), ('c', 'z')], 'bucket', 2, None)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_single_transfers_are_clamped_too(self):
+        client = mock.Mock()
+        with mock.patch.object(s3_utils, 'get_s3_client', return_value=client):
+            s3_utils.upload_to_s3('file', 'bucket', 'key', max_concurrency=50)
+            s3_utils.download_from_s3('bucket', 'key', 'file', max_concurrency=50)
+        for method in (client.upload_file, client.download_file):
+            self.assertEqual(method.call_args.kwargs['Config'].max_concurrency, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
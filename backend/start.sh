@@ -36,12 +36,22 @@ else
     WORKERS=${GUNICORN_WORKERS}
     TIMEOUT=${GUNICORN_TIMEOUT}
     
+    # DJ_ASGI=true serves the async views from uvicorn workers
+    if [ "${DJ_ASGI:-false}" = "true" ]; then
+        WORKER_CLASS=uvicorn_worker.UvicornWorker
+        APPLICATION=stock_api.asgi:application
+    else
+        WORKER_CLASS=sync
+        APPLICATION=stock_api.wsgi:application
+    fi
+
     exec gunicorn \
         --bind 0.0.0.0:8000 \
         --workers $WORKERS \
+        --worker-class $WORKER_CLASS \
         --timeout $TIMEOUT \
         --access-logfile - \
         --error-logfile - \
         --log-level info \
-        stock_api.wsgi:application
+        $APPLICATION
 fi
\ No newline at end of file
@@ -3,8 +3,10 @@ Django settings for stock_api project.
 """
 
 import os
+import tempfile
 import dj_database_url
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,7 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # Static files serving
+    "stock_api.middleware.WhiteNoiseMiddleware",  # Static files serving
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -197,6 +199,100 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "stocks.renderers.NumpyJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 100,
 }
+
+# Shared market snapshot store (Arrow IPC file memory-mapped by every worker)
+STOCK_SNAPSHOT_DIR = os.getenv(
+    "STOCK_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "stock_snapshots")
+)
+STOCK_SNAPSHOT_TTL = int(os.getenv("STOCK_SNAPSHOT_TTL", "300"))
+if STOCK_SNAPSHOT_TTL <= 0:
+    raise ImproperlyConfigured("STOCK_SNAPSHOT_TTL must be a positive number of seconds")
+# Screener markets served (``?market=``; tvscreener Market names, lowercase)
+# and the one used when the parameter is omitted
+STOCK_MARKETS = [
+    market.strip().lower()
+    for market in os.getenv("STOCK_MARKETS", "egypt").split(",")
+    if market.strip()
+]
+if not STOCK_MARKETS:
+    raise ImproperlyConfigured("STOCK_MARKETS must name at least one market")
+STOCK_DEFAULT_MARKET = os.getenv("STOCK_DEFAULT_MARKET", STOCK_MARKETS[0]).strip().lower()
+if STOCK_DEFAULT_MARKET not in STOCK_MARKETS:
+    raise ImproperlyConfigured(
+        f"STOCK_DEFAULT_MARKET {STOCK_DEFAULT_MARKET!r} is not one of STOCK_MARKETS {STOCK_MARKETS}"
+    )
+
+
+def _parse_market_ttls(value):
+    """Per-market TTL overrides, e.g. "ksa=120,uae=600" """
+    ttls = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        market, _, ttl = item.partition("=")
+        try:
+            if not market.strip():
+                raise ValueError(item)
+            ttls[market.strip().lower()] = int(ttl)
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"STOCK_MARKET_TTLS entry {item.strip()!r} is not <market>=<seconds>"
+            ) from None
+        if ttls[market.strip().lower()] <= 0:
+            raise ImproperlyConfigured(
+                f"STOCK_MARKET_TTLS entry {item.strip()!r} must be a positive number of seconds"
+            )
+    return ttls
+
+
+STOCK_MARKET_TTLS = _parse_market_ttls(os.getenv("STOCK_MARKET_TTLS", ""))
+# Markets refreshed at the same time; each refresh is one upstream call
+STOCK_REFRESH_WORKERS = int(os.getenv("STOCK_REFRESH_WORKERS", "4"))
+# Most rows fetched per market. With STOCK_FETCH_CHUNK_SIZE set, the universe
+# is read in windows of that many rows, STOCK_FETCH_CHUNK_WORKERS at a time,
+# each retried up to STOCK_FETCH_CHUNK_RETRIES times; 0 fetches in one request
+STOCK_FETCH_MAX_ROWS = int(os.getenv("STOCK_FETCH_MAX_ROWS", "500"))
+STOCK_FETCH_CHUNK_SIZE = int(os.getenv("STOCK_FETCH_CHUNK_SIZE", "0"))
+STOCK_FETCH_CHUNK_WORKERS = int(os.getenv("STOCK_FETCH_CHUNK_WORKERS", "4"))
+STOCK_FETCH_CHUNK_RETRIES = int(os.getenv("STOCK_FETCH_CHUNK_RETRIES", "2"))
+# Windows are cut from the name-sorted universe, so chunked fetches read all
+# of it (up to this many rows) before keeping the top STOCK_FETCH_MAX_ROWS
+STOCK_FETCH_UNIVERSE_ROWS = int(os.getenv("STOCK_FETCH_UNIVERSE_ROWS", "20000"))
+# Request only the columns the list, stream and insights read on routine
+# refreshes; every column is fetched again once the stock detail payloads
+# are older than STOCK_DETAIL_TTL seconds (fresher fields are overlaid sooner)
+STOCK_FETCH_PROJECTED = os.getenv("STOCK_FETCH_PROJECTED", "False").lower() in ("true", "1", "yes", "on")
+STOCK_DETAIL_TTL = int(os.getenv("STOCK_DETAIL_TTL", "3600"))
+# Previous snapshot versions kept for ``/api/stocks/?since=<version>`` deltas
+STOCK_SNAPSHOT_HISTORY = int(os.getenv("STOCK_SNAPSHOT_HISTORY", "12"))
+# "thread": each worker runs a refresher thread (one fetch per TTL host-wide)
+# "command": snapshots are refreshed by `manage.py refresh_snapshots` only
+STOCK_SNAPSHOT_REFRESHER = os.getenv("STOCK_SNAPSHOT_REFRESHER", "thread")
+# Set to share in-flight screener fetches between processes via lock files
+STOCK_FETCH_LOCK_DIR = os.getenv("STOCK_FETCH_LOCK_DIR") or None
+
+# Pipeline DuckDB database read by the price history endpoint (read-only)
+STOCK_HISTORY_DB = os.getenv("DUCKDB_PATH", "/opt/airflow/duckdb/stocks.db")
+# Most buckets returned per history request; longer ranges use coarser buckets
+STOCK_HISTORY_MAX_POINTS = int(os.getenv("STOCK_HISTORY_MAX_POINTS", "500"))
+STOCK_HISTORY_CACHE_SIZE = int(os.getenv("STOCK_HISTORY_CACHE_SIZE", "512"))
+
+# Serve the stock endpoints with async views (set when running under ASGI)
+STOCK_ASYNC_VIEWS = os.getenv("DJ_ASGI", "False").lower() in ("true", "1", "yes", "on")
+# Threads running blocking work for the async views, and calls allowed to wait
+STOCK_EXECUTOR_WORKERS = int(os.getenv("STOCK_EXECUTOR_WORKERS", "8"))
+STOCK_EXECUTOR_MAX_PENDING = int(os.getenv("STOCK_EXECUTOR_MAX_PENDING", "64"))
+
+# Quote delta stream (ASGI only): how often the producer checks for a new
+# snapshot, every how many events a full snapshot is sent instead of a
+# delta, and how many events a slow client may lag before it is resynced
+STOCK_STREAM_POLL_INTERVAL = float(os.getenv("STOCK_STREAM_POLL_INTERVAL", "1.0"))
+STOCK_STREAM_RESYNC_EVERY = int(os.getenv("STOCK_STREAM_RESYNC_EVERY", "60"))
+STOCK_STREAM_QUEUE_SIZE = int(os.getenv("STOCK_STREAM_QUEUE_SIZE", "16"))
@@ -0,0 +1,156 @@
+"""
+Async variants of the stock API views, for ASGI servers
+
+Only GET and HEAD are served, like the sync APIViews. DRF's
+authentication, permission, throttling and content negotiation policies
+still apply to each request. Anything that can block is awaited on the
+bounded executor, so a slow call only ever ties up one of its threads
+and never the requests queued behind it. That covers those policy
+checks, looking up the latest snapshot (a stat, possibly a re-map),
+loading a snapshot's payloads, rendering and compressing a new body, and
+price history reads. Only already-rendered bodies are written from the
+event loop.
+"""
+
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException, NotFound, Throttled
+from rest_framework.views import APIView
+
+from .executor import ExecutorSaturated, get_blocking_executor
+from .history import HistoryUnavailable, get_price_history
+from .refresher import get_latest_snapshot
+from .responses import cached_body, json_response, render_body
+from .stock_filter import InvalidQuery
+from .stream import get_broadcaster
+from .views import insights_body, requested_market, stock_detail_body, stock_list_body
+
+
+def error_response(message, status, retry_after=None):
+    headers = {"Retry-After": str(retry_after)} if retry_after else None
+    return json_response({"success": False, "message": message}, status=status, headers=headers)
+
+
+def policy_error_response(exc):
+    """A request refused by a DRF policy, with the sync views' body and status"""
+    wait = exc.wait if isinstance(exc, Throttled) else None
+    headers = {"Retry-After": str(int(wait))} if wait else None
+    return json_response({"detail": exc.detail}, status=exc.status_code, headers=headers)
+
+
+class _APIPolicy(APIView):
+    """The DRF policies the sync views apply, run outside a view class"""
+
+
+def check_api_policy(request, args, kwargs):
+    """
+    Authenticate, permit, throttle and negotiate ``request`` like an
+    APIView would. Returns the DRF Request; raises APIException if refused.
+    """
+    view = _APIPolicy()
+    view.args, view.kwargs, view.headers = args, kwargs, {}
+    drf_request = view.initialize_request(request, *args, **kwargs)
+    view.request = drf_request
+    view.initial(drf_request, *args, **kwargs)
+    return drf_request
+
+
+def latest_snapshot_body(request):
+    """The latest snapshot and the body already rendered for this request, if any"""
+    snapshot = get_latest_snapshot(requested_market(request.GET))
+    return snapshot, cached_body(request, snapshot) if snapshot is not None else None
+
+
+async def snapshot_response(request, build):
+    """
+    Serve the body ``build(snapshot)`` returns for the latest snapshot,
+    rendering it on the executor the first time it is requested
+    """
+    executor = get_blocking_executor()
+    snapshot, body = await executor.run(latest_snapshot_body, request)
+    if snapshot is None:
+        return error_response("Stock data is being prepared, please retry shortly", 503, retry_after=5)
+
+    if body is None:
+        body = await executor.run(render_body, request, snapshot, lambda: build(snapshot))
+    return body.response(request, snapshot)
+
+
+def api_view(handler):
+    """
+    GET/HEAD only, with the DRF policies applied; the handler gets the DRF
+    Request. Maps the errors the stock views share onto responses.
+    """
+
+    @require_safe
+    async def view(request, *args, **kwargs):
+        try:
+            request = await get_blocking_executor().run(check_api_policy, request, args, kwargs)
+            return await handler(request, *args, **kwargs)
+        except InvalidQuery as e:
+            return error_response(str(e), 400)
+        except NotFound as e:
+            return error_response(str(e.detail), 404)
+        except (ExecutorSaturated, HistoryUnavailable) as e:
+            return error_response(str(e), 503, retry_after=5)
+        except APIException as e:
+            return policy_error_response(e)
+        except Exception as e:
+            return error_response(f"Error processing request: {str(e)}", 500)
+
+    view.__name__ = handler.__name__
+    view.__doc__ = handler.__doc__
+    return view
+
+
+@api_view
+async def stock_insights(request):
+    """Async StockInsightsAPIView"""
+    return await snapshot_response(request, insights_body)
+
+
+@api_view
+async def stock_list(request):
+    """Async StockListAPIView; same filters, ordering, projection and pagination"""
+    return await snapshot_response(request, lambda snapshot: stock_list_body(request, snapshot))
+
+
+@api_view
+async def stock_detail(request, symbol):
+    """Async StockDetailAPIView"""
+    return await snapshot_response(request, lambda snapshot: stock_detail_body(snapshot, symbol))
+
+
+def load_history(symbol, query_params):
+    """Cached price history for the request, read from DuckDB on a miss"""
+    price_history = get_price_history()
+    key, history = price_history.lookup(symbol, query_params)
+    return history if history is not None else price_history.load(key)
+
+
+@api_view
+async def stock_history(request, symbol):
+    """Async StockHistoryAPIView"""
+    history = await get_blocking_executor().run(load_history, symbol, request.GET)
+    if not history["count"]:
+        return error_response(f"No price history for {symbol}", 404)
+    return json_response({"success": True, **history})
+
+
+@require_safe
+async def stock_stream(request):
+    """Server-Sent Events: full quotes on connect, then per-snapshot deltas"""
+    try:
+        await get_blocking_executor().run(check_api_policy, request, (), {})
+        market = requested_market(request.GET)
+    except InvalidQuery as e:
+        return error_response(str(e), 400)
+    except ExecutorSaturated as e:
+        return error_response(str(e), 503, retry_after=5)
+    except APIException as e:
+        return policy_error_response(e)
+    response = StreamingHttpResponse(get_broadcaster(market).events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Don't let a reverse proxy buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,242 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands
+
+Builds synthetic frames shaped like a tvscreener ``StockScreener().get()``
+result so the benchmarks run without network access.
+"""
+
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+TEXT_COLUMNS = [
+    "Symbol", "Name", "Description", "Country", "Currency", "Exchange",
+    "Industry", "Sector", "Submarket", "Subtype", "Type", "LogoID",
+]
+
+NUMERIC_COLUMNS = [
+    'Price',
+    'Change %',
+    'Volume',
+    'Market Capitalization',
+    'Price to Earnings Ratio (TTM)',
+    'Technical Rating',
+    'Performance (Week)',
+    'Performance (Month)',
+    'Performance (Year)',
+    'Dividend Yield Forward',
+    'Open',
+    'High',
+    'Low',
+    'Close',
+    'Change',
+    'Change from Open',
+    'Change from Open %',
+    'Gap %',
+    'Volume Price',
+    'Volume Weighted Average Price',
+    'Relative Volume',
+    'Relative Volume at Time',
+    'Performance (YTD)',
+    'Performance (5Y)',
+    'Performance (All)',
+    'Performance (3M)',
+    'Performance (6M)',
+    'All Time High',
+    'All Time Low',
+    '52W High',
+    '52W Low',
+    '1M High',
+    '1M Low',
+    '3M High',
+    '3M Low',
+    '6M High',
+    '6M Low',
+    'Enterprise Value',
+    'Shares Outstanding',
+    'Shares Float',
+    'Price to Book (FY)',
+    'Price to Book (MRQ)',
+    'Price to Sales (FY)',
+    'Price to Revenue Ratio (TTM)',
+    'Price to Free Cash Flow (TTM)',
+    'Enterprise Value EBITDA (TTM)',
+    'Basic EPS (FY)',
+    'Basic EPS (TTM)',
+    'EPS Diluted (FY)',
+    'EPS Diluted (MRQ)',
+    'EPS Diluted (TTM)',
+    'EPS Forecast (MRQ)',
+    'Revenue (Annual YoY Growth)',
+    'Revenue (Quarterly QoQ Growth)',
+    'Revenue (Quarterly YoY Growth)',
+    'Revenue (TTM YoY Growth)',
+    'EPS Diluted (Annual YoY Growth)',
+    'EPS Diluted (Quarterly QoQ Growth)',
+    'EPS Diluted (Quarterly YoY Growth)',
+    'EPS Diluted (TTM YoY Growth)',
+    'EBITDA (Annual YoY Growth)',
+    'EBITDA (Quarterly QoQ Growth)',
+    'EBITDA (Quarterly YoY Growth)',
+    'EBITDA (TTM YoY Growth)',
+    'Gross Margin (FY)',
+    'Gross Margin (TTM)',
+    'Operating Margin (FY)',
+    'Operating Margin (TTM)',
+    'Net Margin (FY)',
+    'Net Margin (TTM)',
+    'Pretax Margin (TTM)',
+    'Free Cash Flow Margin (FY)',
+    'Free Cash Flow Margin (TTM)',
+    'Return on Assets (TTM)',
+    'Return on Equity (TTM)',
+    'Return on Invested Capital (TTM)',
+    'Debt to Equity Ratio (MRQ)',
+    'Current Ratio (MRQ)',
+    'Quick Ratio (MRQ)',
+    'Dividends per Share (FY)',
+    'Dividends per Share (MRQ)',
+    'Dividends per Share (Annual YoY Growth)',
+    'Dividends Paid (FY)',
+    'Relative Strength Index (14)',
+    'Relative Strength Index (7)',
+    'MACD Level (12, 26)',
+    'MACD Signal (12, 26)',
+    'Stochastic %K (14, 3, 3)',
+    'Stochastic %D (14, 3, 3)',
+    'Stochastic RSI Fast (3, 3, 14, 14)',
+    'Stochastic RSI Slow (3, 3, 14, 14)',
+    'Williams Percent Range (14)',
+    'Average Directional Index (14)',
+    'Positive Directional Indicator (14)',
+    'Negative Directional Indicator (14)',
+    'Commodity Channel Index (20)',
+    'Ultimate Oscillator (7, 14, 28)',
+    'Awesome Oscillator',
+    'Momentum (10)',
+    'Rate of Change (9)',
+    'Bull Bear Power',
+    'Simple Moving Average (5)',
+    'Simple Moving Average (10)',
+    'Simple Moving Average (20)',
+    'Simple Moving Average (30)',
+    'Simple Moving Average (50)',
+    'Simple Moving Average (100)',
+    'Simple Moving Average (200)',
+    'Exponential Moving Average (5)',
+    'Exponential Moving Average (10)',
+    'Exponential Moving Average (20)',
+    'Exponential Moving Average (30)',
+    'Exponential Moving Average (50)',
+    'Exponential Moving Average (100)',
+    'Exponential Moving Average (200)',
+    'Hull Moving Average (9)',
+    'Volume Weighted Moving Average (20)',
+    'Bollinger Upper Band (20)',
+    'Bollinger Lower Band (20)',
+    'Ichimoku Conversion Line (9, 26, 52, 26)',
+    'Ichimoku Base Line (9, 26, 52, 26)',
+    'Ichimoku Leading Span A (9, 26, 52, 26)',
+    'Ichimoku Leading Span B (9, 26, 52, 26)',
+    'Parabolic SAR',
+    'Average True Range (14)',
+    'Average Day Range (14)',
+    'Volatility',
+    'Volatility Week',
+    'Volatility Month',
+    'Aroon Up (14)',
+    'Aroon Down (14)',
+    'Money Flow (14)',
+    'Chaikin Money Flow (20)',
+    'Oscillators Rating',
+    'Moving Averages Rating',
+    '1 Year Beta',
+    'Weekly Performance',
+    'Monthly Performance',
+    'Yearly Performance',
+    'Change 1M, %',
+]
+
+SECTORS = [
+    "Finance", "Consumer Non-Durables", "Process Industries", "Utilities",
+    "Communications", "Energy Minerals", "Health Technology", "Non-Energy Minerals",
+    "Producer Manufacturing", "Retail Trade", "Transportation", "Industrial Services",
+]
+
+
+def make_screener_frame(rows=500, seed=0, nan_ratio=0.05):
+    """Return a synthetic screener frame with ``rows`` stocks"""
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i:05d}" for i in range(rows)]
+    sectors = rng.choice(SECTORS, size=rows)
+
+    data = {
+        "Symbol": symbols,
+        "Name": [f"{s} Holding Co." for s in symbols],
+        "Description": [f"{s} Holding Company S.A.E." for s in symbols],
+        "Country": "Egypt",
+        "Currency": "EGP",
+        "Exchange": "EGX",
+        "Industry": [f"{s} Industry {i % 3}" for i, s in enumerate(sectors)],
+        "Sector": sectors,
+        "Submarket": "",
+        "Subtype": "common",
+        "Type": "stock",
+        "LogoID": [s.lower() for s in symbols],
+    }
+
+    for column in NUMERIC_COLUMNS:
+        values = rng.normal(loc=20.0, scale=30.0, size=rows)
+        values[rng.random(rows) < nan_ratio] = np.nan
+        data[column] = values
+
+    data["Volume"] = np.floor(rng.lognormal(mean=11, sigma=2, size=rows))
+    data["Market Capitalization"] = rng.lognormal(mean=21, sigma=2, size=rows)
+    data["Price"] = np.abs(data["Price"]) + 0.5
+
+    return pd.DataFrame(data, columns=TEXT_COLUMNS + NUMERIC_COLUMNS)
+
+
+def measure(func, *args, repeat=5, **kwargs):
+    """Run ``func`` and return (best seconds, peak traced bytes, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def memory_usage():
+    """Return (RSS, PSS) in bytes for the current process; PSS is None off Linux"""
+    rss = pss = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "Rss":
+                    rss = int(value.split()[0]) * 1024
+                elif key == "Pss":
+                    pss = int(value.split()[0]) * 1024
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return rss, pss
+
+
+def format_bytes(value):
+    if value is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            return f"{value:.1f} {unit}"
+        value /= 1024
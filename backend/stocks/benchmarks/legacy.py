@@ -0,0 +1,380 @@
+"""
+Reference implementations replaced by vectorized code paths
+
+Kept verbatim so the benchmarks can compare before and after on the same
+input and check the new paths for parity.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def prepare_stocks_data(df):
+    """Row-by-row StockDataFetcher._prepare_stocks_data (iterrows + row.get)"""
+    stocks_list = []
+    for _, row in df.iterrows():
+        stock_data = {
+            'symbol': str(row.get('Symbol', '')),
+            'name': str(row.get('Name', '')),
+            'price': float(row.get('Price', 0)) if not pd.isna(row.get('Price', 0)) else 0,
+            'change_percent': float(row.get('Change %', 0)) if not pd.isna(row.get('Change %', 0)) else 0,
+            'volume': int(row.get('Volume', 0)) if not pd.isna(row.get('Volume', 0)) else 0,
+            'market_capitalization': float(row.get('Market Capitalization', 0)) if not pd.isna(row.get('Market Capitalization', 0)) else 0,
+            'price_to_earnings_ratio_ttm': float(row.get('Price to Earnings Ratio (TTM)', 0)) if not pd.isna(row.get('Price to Earnings Ratio (TTM)', 0)) else 0,
+            'technical_rating': float(row.get('Technical Rating', 0)) if not pd.isna(row.get('Technical Rating', 0)) else 0,
+            'weekly_performance': float(row.get('Performance (Week)', 0)) if not pd.isna(row.get('Performance (Week)', 0)) else 0,
+            'monthly_performance': float(row.get('Performance (Month)', 0)) if not pd.isna(row.get('Performance (Month)', 0)) else 0,
+            'yearly_performance': float(row.get('Performance (Year)', 0)) if not pd.isna(row.get('Performance (Year)', 0)) else 0,
+            'dividend_yield_forward': float(row.get('Dividend Yield Forward', 0)) if not pd.isna(row.get('Dividend Yield Forward', 0)) else 0,
+            'sector': str(row.get('Sector', '')),
+            'industry': str(row.get('Industry', '')),
+            'country': str(row.get('Country', 'Egypt')),
+            'currency': str(row.get('Currency', 'EGP')),
+            'exchange': str(row.get('Exchange', 'EGX')),
+        }
+        stocks_list.append(stock_data)
+    return stocks_list
+
+
+class LegacyInsights:
+    """StockDataFetcher.process_stock_insights built from per-category helpers"""
+
+    @staticmethod
+    def process_stock_insights(stocks_df):
+        """Process stock data to generate insights"""
+        if stocks_df.empty:
+            return {}
+
+        # Clean data - replace inf and nan values
+        stocks_df = stocks_df.replace([np.inf, -np.inf], np.nan)
+
+        insights = {
+            "timestamp": datetime.now().isoformat(),
+            "total_stocks": len(stocks_df),
+            "market_overview": {
+                "total_market_cap": (
+                    float(stocks_df["Market Capitalization"].sum())
+                    if "Market Capitalization" in stocks_df
+                    else 0
+                ),
+                "average_pe_ratio": (
+                    float(stocks_df["Price to Earnings Ratio (TTM)"].mean())
+                    if "Price to Earnings Ratio (TTM)" in stocks_df
+                    else 0
+                ),
+                "average_volume": (
+                    float(stocks_df["Volume"].mean()) if "Volume" in stocks_df else 0
+                ),
+            },
+            # Top Bullish Stocks (based on multiple indicators)
+            "top_bullish": LegacyInsights._get_bullish_stocks(stocks_df),
+            # Top Bearish Stocks
+            "top_bearish": LegacyInsights._get_bearish_stocks(stocks_df),
+            # Best for Short Term (1 week)
+            "best_short_term": LegacyInsights._get_short_term_picks(stocks_df),
+            # Best for Medium Term (1 month)
+            "best_medium_term": LegacyInsights._get_medium_term_picks(stocks_df),
+            # Best for Long Term (1 year)
+            "best_long_term": LegacyInsights._get_long_term_picks(stocks_df),
+            # Overpriced Stocks
+            "overpriced": LegacyInsights._get_overpriced_stocks(stocks_df),
+            # Underpriced Stocks
+            "underpriced": LegacyInsights._get_underpriced_stocks(stocks_df),
+            # Volume Leaders
+            "volume_leaders": LegacyInsights._get_volume_leaders(stocks_df),
+            # Momentum Stocks
+            "momentum_stocks": LegacyInsights._get_momentum_stocks(stocks_df),
+            # Dividend Stocks
+            "dividend_stocks": LegacyInsights._get_dividend_stocks(stocks_df),
+            # Growth Stocks
+            "growth_stocks": LegacyInsights._get_growth_stocks(stocks_df),
+            # Top Positive Movers
+            "top_positive_movers": LegacyInsights._get_top_positive_movers(stocks_df),
+            # Top Negative Movers
+            "top_negative_movers": LegacyInsights._get_top_negative_movers(stocks_df),
+            # Top Sectors Change
+            "top_sectors_change": LegacyInsights._get_top_sectors_change(stocks_df),
+        }
+
+        return insights
+
+    @staticmethod
+    def _get_bullish_stocks(df, limit=10):
+        """Identify bullish stocks based on technical indicators"""
+        bullish_df = df.copy()
+
+        # Calculate bullish score
+        bullish_score = 0
+        if "Relative Strength Index (14)" in df.columns:
+            bullish_score += (df["Relative Strength Index (14)"] > 50).astype(int)
+        if "MACD Level (12, 26)" in df.columns and "MACD Signal (12, 26)" in df.columns:
+            bullish_score += (
+                df["MACD Level (12, 26)"] > df["MACD Signal (12, 26)"]
+            ).astype(int)
+        if "Change %" in df.columns:
+            bullish_score += (df["Change %"] > 0).astype(int)
+        if "Technical Rating" in df.columns:
+            bullish_score += (df["Technical Rating"] > 0).astype(int)
+
+        bullish_df["bullish_score"] = bullish_score
+        top_bullish = bullish_df.nlargest(limit, "bullish_score")
+
+        return LegacyInsights._format_stock_list(
+            top_bullish, ["Symbol", "Name", "Price", "Change %", "Technical Rating"]
+        )
+
+    @staticmethod
+    def _get_bearish_stocks(df, limit=10):
+        """Identify bearish stocks"""
+        bearish_df = df.copy()
+
+        # Calculate bearish score
+        bearish_score = 0
+        if "Relative Strength Index (14)" in df.columns:
+            bearish_score += (df["Relative Strength Index (14)"] < 50).astype(int)
+        if "MACD Level (12, 26)" in df.columns and "MACD Signal (12, 26)" in df.columns:
+            bearish_score += (
+                df["MACD Level (12, 26)"] < df["MACD Signal (12, 26)"]
+            ).astype(int)
+        if "Change %" in df.columns:
+            bearish_score += (df["Change %"] < 0).astype(int)
+        if "Technical Rating" in df.columns:
+            bearish_score += (df["Technical Rating"] < 0).astype(int)
+
+        bearish_df["bearish_score"] = bearish_score
+        top_bearish = bearish_df.nlargest(limit, "bearish_score")
+
+        return LegacyInsights._format_stock_list(
+            top_bearish, ["Symbol", "Name", "Price", "Change %", "Technical Rating"]
+        )
+
+    @staticmethod
+    def _get_short_term_picks(df, limit=10):
+        """Best stocks for short term (1 week)"""
+        if (
+            "Weekly Performance" in df.columns
+            and "Relative Strength Index (7)" in df.columns
+        ):
+            short_term = df.nlargest(limit, "Weekly Performance")
+            return LegacyInsights._format_stock_list(
+                short_term,
+                [
+                    "Symbol",
+                    "Name",
+                    "Price",
+                    "Weekly Performance",
+                    "Relative Strength Index (7)",
+                ],
+            )
+        return []
+
+    @staticmethod
+    def _get_medium_term_picks(df, limit=10):
+        """Best stocks for medium term (1 month)"""
+        if "Monthly Performance" in df.columns:
+            medium_term = df.nlargest(limit, "Monthly Performance")
+            return LegacyInsights._format_stock_list(
+                medium_term,
+                ["Symbol", "Name", "Price", "Monthly Performance", "Change 1M, %"],
+            )
+        return []
+
+    @staticmethod
+    def _get_long_term_picks(df, limit=10):
+        """Best stocks for long term (1 year)"""
+        long_term_df = df.copy()
+
+        # Calculate long term score based on fundamentals
+        long_score = 0
+        if "Return on Equity (TTM)" in df.columns:
+            long_score += (df["Return on Equity (TTM)"] > 15).astype(int)
+        if "EPS Diluted (TTM YoY Growth)" in df.columns:
+            long_score += (df["EPS Diluted (TTM YoY Growth)"] > 0).astype(int)
+        if "Revenue (TTM YoY Growth)" in df.columns:
+            long_score += (df["Revenue (TTM YoY Growth)"] > 0).astype(int)
+        if "Yearly Performance" in df.columns:
+            long_score += (df["Yearly Performance"] > 0).astype(int)
+
+        long_term_df["long_score"] = long_score
+        top_long = long_term_df.nlargest(limit, "long_score")
+
+        return LegacyInsights._format_stock_list(
+            top_long,
+            ["Symbol", "Name", "Price", "Yearly Performance", "Return on Equity (TTM)"],
+        )
+
+    @staticmethod
+    def _get_overpriced_stocks(df, limit=10):
+        """Identify overpriced stocks based on valuation metrics"""
+        if "Price to Earnings Ratio (TTM)" in df.columns:
+            # Filter out negative and extremely high P/E ratios
+            filtered_df = df[
+                (df["Price to Earnings Ratio (TTM)"] > 0)
+                & (df["Price to Earnings Ratio (TTM)"] < 1000)
+            ]
+            overpriced = filtered_df.nlargest(limit, "Price to Earnings Ratio (TTM)")
+            return LegacyInsights._format_stock_list(
+                overpriced,
+                [
+                    "Symbol",
+                    "Name",
+                    "Price",
+                    "Price to Earnings Ratio (TTM)",
+                    "Price to Book (MRQ)",
+                ],
+            )
+        return []
+
+    @staticmethod
+    def _get_underpriced_stocks(df, limit=10):
+        """Identify underpriced stocks"""
+        if (
+            "Price to Earnings Ratio (TTM)" in df.columns
+            and "Price to Book (MRQ)" in df.columns
+        ):
+            # Filter for positive P/E and P/B less than 3
+            filtered_df = df[
+                (df["Price to Earnings Ratio (TTM)"] > 0)
+                & (df["Price to Earnings Ratio (TTM)"] < 15)
+                & (df["Price to Book (MRQ)"] > 0)
+                & (df["Price to Book (MRQ)"] < 3)
+            ]
+            underpriced = filtered_df.nsmallest(limit, "Price to Earnings Ratio (TTM)")
+            return LegacyInsights._format_stock_list(
+                underpriced,
+                [
+                    "Symbol",
+                    "Name",
+                    "Price",
+                    "Price to Earnings Ratio (TTM)",
+                    "Price to Book (MRQ)",
+                ],
+            )
+        return []
+
+    @staticmethod
+    def _get_volume_leaders(df, limit=10):
+        """Get stocks with highest trading volume"""
+        if "Volume" in df.columns:
+            volume_leaders = df.nlargest(limit, "Volume")
+            return LegacyInsights._format_stock_list(
+                volume_leaders, ["Symbol", "Name", "Price", "Volume", "Relative Volume"]
+            )
+        return []
+
+    @staticmethod
+    def _get_momentum_stocks(df, limit=10):
+        """Get stocks with strong momentum"""
+        if "Momentum (10)" in df.columns:
+            momentum = df.nlargest(limit, "Momentum (10)")
+            return LegacyInsights._format_stock_list(
+                momentum, ["Symbol", "Name", "Price", "Momentum (10)", "Change %"]
+            )
+        return []
+
+    @staticmethod
+    def _get_dividend_stocks(df, limit=10):
+        """Get stocks with best dividend yields"""
+        if "Dividend Yield Forward" in df.columns:
+            dividend_df = df[df["Dividend Yield Forward"] > 0]
+            dividend_stocks = dividend_df.nlargest(limit, "Dividend Yield Forward")
+            return LegacyInsights._format_stock_list(
+                dividend_stocks,
+                [
+                    "Symbol",
+                    "Name",
+                    "Price",
+                    "Dividend Yield Forward",
+                    "Dividends per Share (FY)",
+                ],
+            )
+        return []
+
+    @staticmethod
+    def _get_growth_stocks(df, limit=10):
+        """Get stocks with highest growth potential"""
+        growth_df = df.copy()
+
+        # Calculate growth score
+        growth_score = 0
+        if "Revenue (TTM YoY Growth)" in df.columns:
+            growth_score += (df["Revenue (TTM YoY Growth)"] > 10).astype(int)
+        if "EPS Diluted (TTM YoY Growth)" in df.columns:
+            growth_score += (df["EPS Diluted (TTM YoY Growth)"] > 10).astype(int)
+        if "EBITDA (TTM YoY Growth)" in df.columns:
+            growth_score += (df["EBITDA (TTM YoY Growth)"] > 10).astype(int)
+
+        growth_df["growth_score"] = growth_score
+        top_growth = growth_df.nlargest(limit, "growth_score")
+
+        return LegacyInsights._format_stock_list(
+            top_growth,
+            [
+                "Symbol",
+                "Name",
+                "Price",
+                "Revenue (TTM YoY Growth)",
+                "EPS Diluted (TTM YoY Growth)",
+            ],
+        )
+
+    @staticmethod
+    def _get_top_positive_movers(df, limit=10):
+        """Get stocks with highest positive change (daily top gainers)"""
+        if "Change %" in df.columns:
+            positive_change = df[df["Change %"] > 0].nlargest(limit, "Change %")
+            return LegacyInsights._format_stock_list(
+                positive_change, ["Symbol", "Name", "Price", "Change %"]
+            )
+        return []
+
+    @staticmethod
+    def _get_top_negative_movers(df, limit=10):
+        """Get stocks with highest negative change (daily top losers)"""
+        if "Change %" in df.columns:
+            negative_change = df[df["Change %"] < 0].nsmallest(limit, "Change %")  # most negative = largest fall
+            return LegacyInsights._format_stock_list(
+                negative_change, ["Symbol", "Name", "Price", "Change %"]
+            )
+        return []
+
+    @staticmethod
+    def _get_top_sectors_change(df, limit=10):
+        """Get top sectors by average change percentage"""
+        if "Sector" not in df.columns or "Change %" not in df.columns:
+            return []
+
+        # Group by sector and calculate average change
+        sector_performance = df.groupby('Sector')['Change %'].mean().reset_index()
+        sector_performance = sector_performance.sort_values('Change %', ascending=False).head(limit)
+
+        sectors = []
+        for _, row in sector_performance.iterrows():
+            sectors.append({
+                'sector': str(row['Sector']),
+                'change': float(row['Change %']) if not pd.isna(row['Change %']) else 0.0
+            })
+
+        return sectors
+
+    @staticmethod
+    def _format_stock_list(df, columns):
+        """Format stock data for API response"""
+        stocks = []
+        available_cols = [col for col in columns if col in df.columns]
+
+        for _, row in df.iterrows():
+            stock_data = {}
+            for col in available_cols:
+                val = row[col]
+                if pd.isna(val):
+                    stock_data[col] = None
+                elif isinstance(val, (np.integer, np.floating)):
+                    stock_data[col] = float(val) if not np.isnan(val) else None
+                else:
+                    stock_data[col] = str(val)
+            stocks.append(stock_data)
+
+        return stocks
@@ -0,0 +1,33 @@
+"""
+WSGI and ASGI entry points used by ``benchmark_concurrency``
+
+Price history reads are replaced by a stand-in that blocks for
+BENCHMARK_UPSTREAM_LATENCY seconds, the way a slow upstream or database
+call holds the thread serving the request. Everything else is the real
+application.
+"""
+
+import os
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stock_api.settings")
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+wsgi_application = get_wsgi_application()
+asgi_application = get_asgi_application()
+
+from stocks.history import PriceHistory  # noqa: E402
+
+LATENCY = float(os.getenv("BENCHMARK_UPSTREAM_LATENCY", "0.5"))
+
+
+def _slow_load(self, symbol, start, end, interval):
+    time.sleep(LATENCY)
+    bar = {"date": "2025-01-01", "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1}
+    return {"symbol": symbol, "interval": "day", "start": bar["date"], "end": bar["date"], "count": 1, "data": [bar]}
+
+
+PriceHistory.version = lambda self: 0
+PriceHistory._load = _slow_load
@@ -0,0 +1,46 @@
+"""
+Row-level differences between two snapshots
+
+Both sides are frames of converted field columns indexed by symbol. Rows
+are aligned with one hash lookup of the symbols and compared a column at a
+time over whole NumPy arrays, so diffing the full market costs a handful of
+vectorized comparisons rather than a Python loop over every row and field.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def keyed_frame(columns):
+    """
+    Frame over converted ``{field: column}`` values indexed by symbol. The
+    first row per symbol wins and rows without a symbol are dropped.
+    """
+    frame = pd.DataFrame(columns)
+    frame = frame[(frame['symbol'] != '') & ~frame['symbol'].duplicated()]
+    return frame.set_index(pd.Index(frame['symbol'], name=None))
+
+
+def diff(previous, current, names):
+    """
+    Compare ``names`` between two keyed frames. Returns masks over
+    ``current`` of the added and changed rows, and the removed symbols
+    in their ``previous`` order.
+    """
+    positions = previous.index.get_indexer(current.index)
+    present = positions >= 0
+    matched = positions[present]
+    differs = np.zeros(int(present.sum()), dtype=bool)
+    for name in names:
+        differs |= previous[name].to_numpy()[matched] != current[name].to_numpy()[present]
+
+    changed = np.zeros(len(current), dtype=bool)
+    changed[present] = differs
+    removed = previous.index[current.index.get_indexer(previous.index) < 0]
+    return ~present, changed, removed.tolist()
+
+
+def records(frame, names):
+    """Rows of a keyed frame as dicts of ``names``"""
+    columns = [frame[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
@@ -0,0 +1,58 @@
+"""
+Compact dtype layout for screener frames
+
+tvscreener returns every numeric column as float64 and every text column as
+strings, most of them repeating a handful of values. Before a frame is
+published, float columns whose values survive a float32 round trip exactly
+are stored as float32 and the low-cardinality text columns as categoricals.
+Infinities are replaced with NaN here, once, so readers never have to copy
+a column just to clean it. Values are never rounded: a column with a single
+value float32 can't hold keeps float64, so payloads built from the compact
+frame are identical to those built from the raw one.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Text columns with few distinct values, stored as categoricals
+CATEGORY_COLUMNS = ("Sector", "Industry", "Exchange", "Currency", "Country")
+
+
+def compact_floats(block):
+    """
+    Clean inf to NaN in a 2-D float64 ``block`` (in place) and return a
+    mask of the columns that float32 holds exactly, with their float32 copy
+    """
+    block[np.isinf(block)] = np.nan
+    with np.errstate(over="ignore"):
+        narrow = block.astype(np.float32)
+    # Overflowed or rounded values compare unequal, keeping their column float64
+    exact = ((narrow == block) | np.isnan(block)).all(axis=0)
+    return exact, narrow
+
+
+def normalize_frame(stocks_df):
+    """Screener frame with compact dtypes and no infinities; ``stocks_df`` is left as is"""
+    float_columns = pd.Index([
+        column for column, dtype in stocks_df.dtypes.items()
+        if column not in CATEGORY_COLUMNS and pd.api.types.is_float_dtype(dtype)
+    ])
+    # One copy of every float column, sanitized and tested in a single pass
+    block = stocks_df[float_columns].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    exact, narrow = compact_floats(block)
+
+    others = stocks_df[stocks_df.columns.difference(float_columns, sort=False)]
+    categories = [column for column in CATEGORY_COLUMNS if column in others.columns]
+    if categories:
+        others = others.astype(dict.fromkeys(categories, "category"))
+    frame = pd.concat([
+        pd.DataFrame(narrow[:, exact], index=stocks_df.index, columns=float_columns[exact], copy=False),
+        pd.DataFrame(block[:, ~exact], index=stocks_df.index, columns=float_columns[~exact], copy=False),
+        others,
+    ], axis=1)
+    return frame[stocks_df.columns]
+
+
+def column_bytes(df):
+    """Bytes held by each column, counting string and categorical contents"""
+    return df.memory_usage(index=False, deep=True)
@@ -0,0 +1,58 @@
+"""
+Bounded thread pool for blocking work awaited by the async views
+
+Work that may block (building payloads, rendering bodies, DuckDB reads)
+runs on a fixed number of threads. A request arriving while every thread
+is busy and the backlog is full is refused rather than queued without
+limit, so a slow dependency cannot pile up unbounded waiting requests.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class ExecutorSaturated(Exception):
+    """Every worker is busy and the backlog is full"""
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor admitting at most ``max_workers + max_pending`` calls"""
+
+    def __init__(self, max_workers=8, max_pending=64):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stocks-blocking")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    async def run(self, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)`` on a worker thread"""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated("Server is busy, please retry shortly")
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        # Free the slot when the call finishes, even if the request was cancelled
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor():
+    """Process-wide executor for the async views"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(
+                    max_workers=settings.STOCK_EXECUTOR_WORKERS,
+                    max_pending=settings.STOCK_EXECUTOR_MAX_PENDING,
+                )
+    return _executor
@@ -0,0 +1,282 @@
+"""
+Single source of truth for screener-backed stock fields
+
+Each Field names the tvscreener column it reads, the API/model field it is
+exposed as, its type and the default used for missing, NaN or infinite
+values. The detail payload and the list payload are generated from
+STOCK_FIELDS; the Stock model declares a column for each of them, in the
+same order. A FieldConverter compiled from a list of fields converts a
+whole frame in one vectorized pass.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Field:
+    """One stock field read from a screener column"""
+
+    def __init__(self, name, column, kind=float, default=None):
+        self.name = name
+        self.column = column
+        self.kind = kind
+        if default is None:
+            default = '' if kind is str else kind(0)
+        self.default = default
+
+    def __repr__(self):
+        return f"Field({self.name!r}, {self.column!r}, {self.kind.__name__})"
+
+
+class FieldConverter:
+    """Converts screener frames to typed columns / records for a fixed field list"""
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.names = [field.name for field in self.fields]
+        self._numeric = [i for i, field in enumerate(self.fields) if field.kind is not str]
+        self._text = [i for i, field in enumerate(self.fields) if field.kind is str]
+        self._numeric_columns = [self.fields[i].column for i in self._numeric]
+        self._numeric_defaults = np.array(
+            [self.fields[i].default for i in self._numeric], dtype=np.float64
+        )
+
+    def columns(self, df):
+        """Return {field name: NumPy column} with types applied and bad values defaulted"""
+        columns = {}
+
+        # All numeric fields are converted and sanitized as one 2-D block
+        block = df.reindex(columns=self._numeric_columns).to_numpy(dtype=np.float64, na_value=np.nan)
+        block = np.where(np.isfinite(block), block, self._numeric_defaults)
+        for j, i in enumerate(self._numeric):
+            field = self.fields[i]
+            columns[field.name] = block[:, j].astype(np.int64) if field.kind is int else block[:, j]
+
+        for i in self._text:
+            field = self.fields[i]
+            if field.column in df.columns:
+                values = df[field.column].to_numpy(dtype=object, copy=True)
+                values[pd.isna(values)] = field.default
+                columns[field.name] = values.astype(str)
+            else:
+                columns[field.name] = np.full(len(df), field.default)
+
+        return {name: columns[name] for name in self.names}
+
+    def records(self, df):
+        """Convert a screener frame to a list of dicts, one per row"""
+        columns = [values.tolist() for values in self.columns(df).values()]
+        names = self.names
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+# Every screener-backed stock field, in detail payload / model order
+STOCK_FIELDS = [
+    # Basic Information
+    Field('symbol', 'Symbol', str),
+    Field('name', 'Name', str),
+    Field('description', 'Description', str),
+    Field('country', 'Country', str, 'Egypt'),
+    Field('currency', 'Currency', str, 'EGP'),
+    Field('exchange', 'Exchange', str, 'EGX'),
+    Field('industry', 'Industry', str),
+    Field('sector', 'Sector', str),
+    Field('submarket', 'Submarket', str),
+    Field('subtype', 'Subtype', str),
+    Field('type_field', 'Type', str),
+    Field('logoid', 'LogoID', str),
+
+    # Price Information
+    Field('price', 'Price'),
+    Field('open_price', 'Open'),
+    Field('high', 'High'),
+    Field('low', 'Low'),
+    Field('close_price', 'Close'),
+    Field('change', 'Change'),
+    Field('change_percent', 'Change %'),
+    Field('change_from_open', 'Change from Open'),
+    Field('change_from_open_percent', 'Change from Open %'),
+    Field('gap_percent', 'Gap %'),
+
+    # Volume Information
+    Field('volume', 'Volume', int),
+    Field('volume_price', 'Volume Price'),
+    Field('volume_weighted_average_price', 'Volume Weighted Average Price'),
+    Field('relative_volume', 'Relative Volume'),
+    Field('relative_volume_at_time', 'Relative Volume at Time'),
+
+    # Performance Metrics
+    Field('weekly_performance', 'Performance (Week)'),
+    Field('monthly_performance', 'Performance (Month)'),
+    Field('yearly_performance', 'Performance (Year)'),
+    Field('ytd_performance', 'Performance (YTD)'),
+    Field('five_year_performance', 'Performance (5Y)'),
+    Field('all_time_performance', 'Performance (All)'),
+    Field('three_month_performance', 'Performance (3M)'),
+    Field('six_month_performance', 'Performance (6M)'),
+
+    # High/Low Records
+    Field('all_time_high', 'All Time High'),
+    Field('all_time_low', 'All Time Low'),
+    Field('fifty_two_week_high', '52W High'),
+    Field('fifty_two_week_low', '52W Low'),
+    Field('one_month_high', '1M High'),
+    Field('one_month_low', '1M Low'),
+    Field('three_month_high', '3M High'),
+    Field('three_month_low', '3M Low'),
+    Field('six_month_high', '6M High'),
+    Field('six_month_low', '6M Low'),
+
+    # Market Capitalization
+    Field('market_capitalization', 'Market Capitalization'),
+    Field('enterprise_value', 'Enterprise Value'),
+    Field('shares_outstanding', 'Shares Outstanding'),
+    Field('shares_float', 'Shares Float'),
+
+    # Valuation Ratios
+    Field('price_to_earnings_ratio_ttm', 'Price to Earnings Ratio (TTM)'),
+    Field('price_to_book_fy', 'Price to Book (FY)'),
+    Field('price_to_book_mrq', 'Price to Book (MRQ)'),
+    Field('price_to_sales_fy', 'Price to Sales (FY)'),
+    Field('price_to_revenue_ratio_ttm', 'Price to Revenue Ratio (TTM)'),
+    Field('price_to_free_cash_flow_ttm', 'Price to Free Cash Flow (TTM)'),
+    Field('enterprise_value_ebitda_ttm', 'Enterprise Value EBITDA (TTM)'),
+
+    # Financial Metrics
+    Field('basic_eps_fy', 'Basic EPS (FY)'),
+    Field('basic_eps_ttm', 'Basic EPS (TTM)'),
+    Field('eps_diluted_fy', 'EPS Diluted (FY)'),
+    Field('eps_diluted_mrq', 'EPS Diluted (MRQ)'),
+    Field('eps_diluted_ttm', 'EPS Diluted (TTM)'),
+    Field('eps_forecast_mrq', 'EPS Forecast (MRQ)'),
+
+    # Growth Metrics
+    Field('revenue_annual_yoy_growth', 'Revenue (Annual YoY Growth)'),
+    Field('revenue_quarterly_qoq_growth', 'Revenue (Quarterly QoQ Growth)'),
+    Field('revenue_quarterly_yoy_growth', 'Revenue (Quarterly YoY Growth)'),
+    Field('revenue_ttm_yoy_growth', 'Revenue (TTM YoY Growth)'),
+    Field('eps_diluted_annual_yoy_growth', 'EPS Diluted (Annual YoY Growth)'),
+    Field('eps_diluted_quarterly_qoq_growth', 'EPS Diluted (Quarterly QoQ Growth)'),
+    Field('eps_diluted_quarterly_yoy_growth', 'EPS Diluted (Quarterly YoY Growth)'),
+    Field('eps_diluted_ttm_yoy_growth', 'EPS Diluted (TTM YoY Growth)'),
+    Field('ebitda_annual_yoy_growth', 'EBITDA (Annual YoY Growth)'),
+    Field('ebitda_quarterly_qoq_growth', 'EBITDA (Quarterly QoQ Growth)'),
+    Field('ebitda_quarterly_yoy_growth', 'EBITDA (Quarterly YoY Growth)'),
+    Field('ebitda_ttm_yoy_growth', 'EBITDA (TTM YoY Growth)'),
+
+    # Profitability Metrics
+    Field('gross_margin_fy', 'Gross Margin (FY)'),
+    Field('gross_margin_ttm', 'Gross Margin (TTM)'),
+    Field('operating_margin_fy', 'Operating Margin (FY)'),
+    Field('operating_margin_ttm', 'Operating Margin (TTM)'),
+    Field('net_margin_fy', 'Net Margin (FY)'),
+    Field('net_margin_ttm', 'Net Margin (TTM)'),
+    Field('pretax_margin_ttm', 'Pretax Margin (TTM)'),
+    Field('free_cash_flow_margin_fy', 'Free Cash Flow Margin (FY)'),
+    Field('free_cash_flow_margin_ttm', 'Free Cash Flow Margin (TTM)'),
+
+    # Return Metrics
+    Field('return_on_assets_ttm', 'Return on Assets (TTM)'),
+    Field('return_on_equity_ttm', 'Return on Equity (TTM)'),
+    Field('return_on_invested_capital_ttm', 'Return on Invested Capital (TTM)'),
+
+    # Debt Metrics
+    Field('debt_to_equity_ratio_mrq', 'Debt to Equity Ratio (MRQ)'),
+    Field('current_ratio_mrq', 'Current Ratio (MRQ)'),
+    Field('quick_ratio_mrq', 'Quick Ratio (MRQ)'),
+
+    # Dividend Information
+    Field('dividend_yield_forward', 'Dividend Yield Forward'),
+    Field('dividends_per_share_fy', 'Dividends per Share (FY)'),
+    Field('dividends_per_share_mrq', 'Dividends per Share (MRQ)'),
+    Field('dividends_per_share_annual_yoy_growth', 'Dividends per Share (Annual YoY Growth)'),
+    Field('dividends_paid_fy', 'Dividends Paid (FY)'),
+
+    # Technical Indicators
+    Field('relative_strength_index_14', 'Relative Strength Index (14)'),
+    Field('relative_strength_index_7', 'Relative Strength Index (7)'),
+    Field('macd_level_12_26', 'MACD Level (12, 26)'),
+    Field('macd_signal_12_26', 'MACD Signal (12, 26)'),
+    Field('stochastic_k_14_3_3', 'Stochastic %K (14, 3, 3)'),
+    Field('stochastic_d_14_3_3', 'Stochastic %D (14, 3, 3)'),
+    Field('stochastic_rsi_fast_3_3_14_14', 'Stochastic RSI Fast (3, 3, 14, 14)'),
+    Field('stochastic_rsi_slow_3_3_14_14', 'Stochastic RSI Slow (3, 3, 14, 14)'),
+    Field('williams_percent_range_14', 'Williams Percent Range (14)'),
+    Field('average_directional_index_14', 'Average Directional Index (14)'),
+    Field('positive_directional_indicator_14', 'Positive Directional Indicator (14)'),
+    Field('negative_directional_indicator_14', 'Negative Directional Indicator (14)'),
+    Field('commodity_channel_index_20', 'Commodity Channel Index (20)'),
+    Field('ultimate_oscillator_7_14_28', 'Ultimate Oscillator (7, 14, 28)'),
+    Field('awesome_oscillator', 'Awesome Oscillator'),
+    Field('momentum_10', 'Momentum (10)'),
+    Field('rate_of_change_9', 'Rate of Change (9)'),
+    Field('bull_bear_power', 'Bull Bear Power'),
+
+    # Moving Averages
+    Field('simple_moving_average_5', 'Simple Moving Average (5)'),
+    Field('simple_moving_average_10', 'Simple Moving Average (10)'),
+    Field('simple_moving_average_20', 'Simple Moving Average (20)'),
+    Field('simple_moving_average_30', 'Simple Moving Average (30)'),
+    Field('simple_moving_average_50', 'Simple Moving Average (50)'),
+    Field('simple_moving_average_100', 'Simple Moving Average (100)'),
+    Field('simple_moving_average_200', 'Simple Moving Average (200)'),
+    Field('exponential_moving_average_5', 'Exponential Moving Average (5)'),
+    Field('exponential_moving_average_10', 'Exponential Moving Average (10)'),
+    Field('exponential_moving_average_20', 'Exponential Moving Average (20)'),
+    Field('exponential_moving_average_30', 'Exponential Moving Average (30)'),
+    Field('exponential_moving_average_50', 'Exponential Moving Average (50)'),
+    Field('exponential_moving_average_100', 'Exponential Moving Average (100)'),
+    Field('exponential_moving_average_200', 'Exponential Moving Average (200)'),
+    Field('hull_moving_average_9', 'Hull Moving Average (9)'),
+    Field('volume_weighted_moving_average_20', 'Volume Weighted Moving Average (20)'),
+
+    # Bollinger Bands
+    Field('bollinger_upper_band_20', 'Bollinger Upper Band (20)'),
+    Field('bollinger_lower_band_20', 'Bollinger Lower Band (20)'),
+
+    # Ichimoku Cloud
+    Field('ichimoku_conversion_line_9_26_52_26', 'Ichimoku Conversion Line (9, 26, 52, 26)'),
+    Field('ichimoku_base_line_9_26_52_26', 'Ichimoku Base Line (9, 26, 52, 26)'),
+    Field('ichimoku_leading_span_a_9_26_52_26', 'Ichimoku Leading Span A (9, 26, 52, 26)'),
+    Field('ichimoku_leading_span_b_9_26_52_26', 'Ichimoku Leading Span B (9, 26, 52, 26)'),
+
+    # Other Technical Indicators
+    Field('parabolic_sar', 'Parabolic SAR'),
+    Field('average_true_range_14', 'Average True Range (14)'),
+    Field('average_day_range_14', 'Average Day Range (14)'),
+    Field('volatility', 'Volatility'),
+    Field('volatility_week', 'Volatility Week'),
+    Field('volatility_month', 'Volatility Month'),
+    Field('aroon_up_14', 'Aroon Up (14)'),
+    Field('aroon_down_14', 'Aroon Down (14)'),
+    Field('money_flow_14', 'Money Flow (14)'),
+    Field('chaikin_money_flow_20', 'Chaikin Money Flow (20)'),
+
+    # Ratings
+    Field('technical_rating', 'Technical Rating'),
+    Field('oscillators_rating', 'Oscillators Rating'),
+    Field('moving_averages_rating', 'Moving Averages Rating'),
+
+    # Beta
+    Field('one_year_beta', '1 Year Beta'),
+
+]
+
+STOCK_FIELDS_BY_NAME = {field.name: field for field in STOCK_FIELDS}
+
+# Fields served by the stock list endpoint, in response order
+STOCK_LIST_FIELDS = [
+    STOCK_FIELDS_BY_NAME[name]
+    for name in (
+        'symbol', 'name', 'price', 'change_percent', 'volume', 'market_capitalization',
+        'price_to_earnings_ratio_ttm', 'technical_rating', 'weekly_performance',
+        'monthly_performance', 'yearly_performance', 'dividend_yield_forward',
+        'sector', 'industry', 'country', 'currency', 'exchange',
+    )
+]
+
+# Screener columns the stock list reads
+STOCK_LIST_COLUMNS = [field.column for field in STOCK_LIST_FIELDS]
+
+STOCK_DETAIL_CONVERTER = FieldConverter(STOCK_FIELDS)
+STOCK_LIST_CONVERTER = FieldConverter(STOCK_LIST_FIELDS)
@@ -0,0 +1,171 @@
+"""
+Price history served from the pipeline's DuckDB database
+
+Daily rows in raw_stock_data are downsampled to OHLCV buckets in SQL, at
+the finest interval that fits the point cap. The database is opened
+read-only and only for the duration of a cache miss, so the pipeline can
+keep writing to it between requests (a connection held open would keep
+the pipeline's writer locked out). Each miss runs two parameterized
+queries over the symbol's rows and writes nothing, not even a temp table. Results are cached per query and
+dropped as soon as the database file changes.
+"""
+
+import os
+import threading
+from datetime import date
+
+import duckdb
+from django.conf import settings
+
+from .lru import LRUCache
+from .stock_filter import InvalidQuery
+
+# Bucket intervals from finest to coarsest
+INTERVALS = ("day", "week", "month")
+# One symbol's daily rows in the requested range, read by every history query
+HISTORY_ROWS = """
+    SELECT date, open, high, low, close, volume
+    FROM raw_stock_data
+    WHERE symbol = $symbol
+      AND ($start IS NULL OR date >= $start)
+      AND ($end IS NULL OR date <= $end)
+"""
+
+
+class HistoryUnavailable(Exception):
+    """The history database is missing or locked by a writer"""
+
+
+class PriceHistory:
+    """OHLCV history per symbol, downsampled and cached"""
+
+    def __init__(self, db_path, max_points=500, cache_size=512):
+        self.db_path = db_path
+        self.max_points = max_points
+        self._cache = LRUCache(cache_size)
+
+    def version(self):
+        """Changes whenever the pipeline writes to the database"""
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            raise HistoryUnavailable("Price history has not been loaded yet")
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def normalize(self, symbol, query_params):
+        """Cache key for a history request; validates start, end and interval"""
+
+        def day(name):
+            value = query_params.get(name)
+            if not value:
+                return None
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                raise InvalidQuery(f"'{name}' must be a date (YYYY-MM-DD)")
+
+        start, end = day("start"), day("end")
+        if start and end and start > end:
+            raise InvalidQuery("'start' must not be after 'end'")
+
+        interval = query_params.get("interval") or "auto"
+        if interval != "auto" and interval not in INTERVALS:
+            raise InvalidQuery(f"'interval' must be one of auto, {', '.join(INTERVALS)}")
+        return (symbol.upper(), start, end, interval)
+
+    def lookup(self, symbol, query_params):
+        """Cache key for a history request and its cached result, or None"""
+        key = (self.version(), *self.normalize(symbol, query_params))
+        return key, self._cache.get(key)
+
+    def load(self, key):
+        """Query the database for a key returned by lookup(); blocks on DuckDB"""
+        return self._cache.get_or_set(key, lambda: self._load(*key[1:]))
+
+    def get(self, symbol, query_params):
+        key, history = self.lookup(symbol, query_params)
+        return history if history is not None else self.load(key)
+
+    def _load(self, symbol, start, end, interval):
+        try:
+            conn = duckdb.connect(self.db_path, read_only=True)
+        except duckdb.Error as e:
+            # A pipeline task holds the write lock; the next request retries
+            raise HistoryUnavailable("Price history is being updated, please retry shortly") from e
+        params = {"symbol": symbol, "start": start, "end": end}
+        try:
+            interval = self._fitting_interval(conn, interval, params)
+            # Keep the latest buckets if even monthly ones exceed the cap
+            rows = conn.execute(
+                f"""
+                WITH history AS ({HISTORY_ROWS})
+                SELECT * FROM (
+                    SELECT
+                        date_trunc('{interval}', date)::DATE AS bucket,
+                        arg_min(open, date) AS open,
+                        max(high) AS high,
+                        min(low) AS low,
+                        arg_max(close, date) AS close,
+                        sum(volume) AS volume
+                    FROM history
+                    GROUP BY bucket
+                    ORDER BY bucket DESC
+                    LIMIT {int(self.max_points)}
+                )
+                ORDER BY bucket
+                """,
+                params,
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {
+            "symbol": symbol,
+            "interval": interval,
+            "start": rows[0][0].isoformat() if rows else None,
+            "end": rows[-1][0].isoformat() if rows else None,
+            "count": len(rows),
+            "data": [
+                {
+                    "date": bucket.isoformat(),
+                    "open": open_,
+                    "high": high,
+                    "low": low,
+                    "close": close,
+                    "volume": volume,
+                }
+                for bucket, open_, high, low, close, volume in rows
+            ],
+        }
+
+    def _fitting_interval(self, conn, interval, params):
+        """The requested interval, coarsened until its buckets fit the cap"""
+        candidates = INTERVALS if interval == "auto" else INTERVALS[INTERVALS.index(interval):]
+        counts = conn.execute(
+            f"WITH history AS ({HISTORY_ROWS}) SELECT "
+            + ", ".join(f"count(DISTINCT date_trunc('{unit}', date))" for unit in candidates)
+            + " FROM history",
+            params,
+        ).fetchone()
+        for unit, count in zip(candidates, counts):
+            if count <= self.max_points:
+                return unit
+        return candidates[-1]
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_price_history():
+    """Process-wide price history reader"""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = PriceHistory(
+                    settings.STOCK_HISTORY_DB,
+                    max_points=settings.STOCK_HISTORY_MAX_POINTS,
+                    cache_size=settings.STOCK_HISTORY_CACHE_SIZE,
+                )
+    return _history
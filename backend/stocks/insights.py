@@ -0,0 +1,318 @@
+"""
+Single-pass insights engine
+
+Extracts the columns the insight categories read once as contiguous float
+arrays, scores every row in one pass and picks each category's rows with a
+partial sort. Only the selected rows are ever sliced out of the frame.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# Columns read by the scores, filters and rankings below
+INSIGHT_COLUMNS = [
+    "Market Capitalization",
+    "Price to Earnings Ratio (TTM)",
+    "Price to Book (MRQ)",
+    "Volume",
+    "Change %",
+    "Technical Rating",
+    "Relative Strength Index (14)",
+    "Relative Strength Index (7)",
+    "MACD Level (12, 26)",
+    "MACD Signal (12, 26)",
+    "Momentum (10)",
+    "Weekly Performance",
+    "Monthly Performance",
+    "Yearly Performance",
+    "Return on Equity (TTM)",
+    "EPS Diluted (TTM YoY Growth)",
+    "Revenue (TTM YoY Growth)",
+    "EBITDA (TTM YoY Growth)",
+    "Dividend Yield Forward",
+]
+
+# Columns copied into the insight payloads and grouped on
+OUTPUT_COLUMNS = [
+    "Symbol",
+    "Name",
+    "Price",
+    "Sector",
+    "Change 1M, %",
+    "Relative Volume",
+    "Dividends per Share (FY)",
+]
+
+# Every screener column the engine reads, for column-projected fetches
+SCREENER_COLUMNS = list(dict.fromkeys(OUTPUT_COLUMNS + INSIGHT_COLUMNS))
+
+
+def top_k(values, k, largest=True, candidates=None):
+    """
+    Positions of the ``k`` largest (or smallest) ``values`` among the
+    ``candidates`` positions, in DataFrame.nlargest/nsmallest order: ties
+    keep row order and NaN rows only pad the result when too few values
+    remain.
+    """
+    positions = np.arange(len(values)) if candidates is None else candidates
+    selected = values[positions]
+    missing = np.isnan(selected)
+    valid = positions[~missing]
+    keys = -selected[~missing] if largest else selected[~missing]
+
+    count = min(k, len(keys))
+    if count == 0:
+        order = np.empty(0, dtype=np.intp)
+    elif count < len(keys):
+        kth = keys[np.argpartition(keys, count - 1)[count - 1]]
+        order = np.flatnonzero(keys <= kth)
+        order = order[np.argsort(keys[order], kind="stable")][:count]
+    else:
+        order = np.argsort(keys, kind="stable")
+
+    result = valid[order]
+    if len(result) < k:
+        result = np.concatenate([result, positions[missing][:k - len(result)]])
+    return result
+
+
+def numeric_rows(dtypes):
+    """
+    Whether every column is a plain NumPy int or float, i.e. whether a row of
+    the frame holds NumPy numbers rather than interleaved Python objects
+    """
+    return len(dtypes) > 0 and all(
+        isinstance(dtype, np.dtype) and dtype.kind in "iuf" for dtype in dtypes
+    )
+
+
+def _format_values(values, numeric):
+    if numeric:
+        # NaN is rendered as null by the JSON renderer
+        return values.tolist()
+    # Mixed frames interleave to object rows, whose values serialize as strings
+    return [None if missing else str(val) for val, missing in zip(values.tolist(), pd.isna(values).tolist())]
+
+
+class InsightsEngine:
+    """Compute every insight category of a screener frame in one pass"""
+
+    def __init__(self, stocks_df, limit=10):
+        self.df = stocks_df
+        self.limit = limit
+        self.size = len(stocks_df)
+        self.numeric_rows = numeric_rows(stocks_df.dtypes)
+        self._float_columns = {}
+        self.columns = {}
+        for column in INSIGHT_COLUMNS:
+            if column in stocks_df.columns:
+                values = stocks_df[column].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+                values[np.isinf(values)] = np.nan
+                self.columns[column] = values
+
+    def run(self):
+        if self.df.empty:
+            return {}
+
+        scores = self._scores()
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "total_stocks": self.size,
+            "market_overview": self._market_overview(),
+            # Top Bullish Stocks (based on multiple indicators)
+            "top_bullish": self._stocks(
+                top_k(scores["bullish"], self.limit),
+                ["Symbol", "Name", "Price", "Change %", "Technical Rating"],
+            ),
+            # Top Bearish Stocks
+            "top_bearish": self._stocks(
+                top_k(scores["bearish"], self.limit),
+                ["Symbol", "Name", "Price", "Change %", "Technical Rating"],
+            ),
+            # Best for Short Term (1 week)
+            "best_short_term": self._ranked(
+                "Weekly Performance",
+                ["Symbol", "Name", "Price", "Weekly Performance", "Relative Strength Index (7)"],
+                requires=["Relative Strength Index (7)"],
+            ),
+            # Best for Medium Term (1 month)
+            "best_medium_term": self._ranked(
+                "Monthly Performance",
+                ["Symbol", "Name", "Price", "Monthly Performance", "Change 1M, %"],
+            ),
+            # Best for Long Term (1 year)
+            "best_long_term": self._stocks(
+                top_k(scores["long"], self.limit),
+                ["Symbol", "Name", "Price", "Yearly Performance", "Return on Equity (TTM)"],
+            ),
+            # Overpriced Stocks
+            "overpriced": self._ranked(
+                "Price to Earnings Ratio (TTM)",
+                ["Symbol", "Name", "Price", "Price to Earnings Ratio (TTM)", "Price to Book (MRQ)"],
+                where=self._overpriced_mask,
+            ),
+            # Underpriced Stocks
+            "underpriced": self._ranked(
+                "Price to Earnings Ratio (TTM)",
+                ["Symbol", "Name", "Price", "Price to Earnings Ratio (TTM)", "Price to Book (MRQ)"],
+                requires=["Price to Book (MRQ)"],
+                where=self._underpriced_mask,
+                largest=False,
+            ),
+            # Volume Leaders
+            "volume_leaders": self._ranked(
+                "Volume", ["Symbol", "Name", "Price", "Volume", "Relative Volume"]
+            ),
+            # Momentum Stocks
+            "momentum_stocks": self._ranked(
+                "Momentum (10)", ["Symbol", "Name", "Price", "Momentum (10)", "Change %"]
+            ),
+            # Dividend Stocks
+            "dividend_stocks": self._ranked(
+                "Dividend Yield Forward",
+                ["Symbol", "Name", "Price", "Dividend Yield Forward", "Dividends per Share (FY)"],
+                where=lambda c: c["Dividend Yield Forward"] > 0,
+            ),
+            # Growth Stocks
+            "growth_stocks": self._stocks(
+                top_k(scores["growth"], self.limit),
+                ["Symbol", "Name", "Price", "Revenue (TTM YoY Growth)", "EPS Diluted (TTM YoY Growth)"],
+            ),
+            # Top Positive Movers
+            "top_positive_movers": self._ranked(
+                "Change %",
+                ["Symbol", "Name", "Price", "Change %"],
+                where=lambda c: c["Change %"] > 0,
+            ),
+            # Top Negative Movers (most negative = largest fall)
+            "top_negative_movers": self._ranked(
+                "Change %",
+                ["Symbol", "Name", "Price", "Change %"],
+                where=lambda c: c["Change %"] < 0,
+                largest=False,
+            ),
+            # Top Sectors Change
+            "top_sectors_change": self._top_sectors_change(),
+        }
+
+    def _scores(self):
+        """Bullish, bearish, long term and growth scores from a single sweep"""
+        c = self.columns
+        scores = {name: np.zeros(self.size, dtype=np.int64) for name in ("bullish", "bearish", "long", "growth")}
+
+        if "Relative Strength Index (14)" in c:
+            scores["bullish"] += c["Relative Strength Index (14)"] > 50
+            scores["bearish"] += c["Relative Strength Index (14)"] < 50
+        if "MACD Level (12, 26)" in c and "MACD Signal (12, 26)" in c:
+            scores["bullish"] += c["MACD Level (12, 26)"] > c["MACD Signal (12, 26)"]
+            scores["bearish"] += c["MACD Level (12, 26)"] < c["MACD Signal (12, 26)"]
+        if "Change %" in c:
+            scores["bullish"] += c["Change %"] > 0
+            scores["bearish"] += c["Change %"] < 0
+        if "Technical Rating" in c:
+            scores["bullish"] += c["Technical Rating"] > 0
+            scores["bearish"] += c["Technical Rating"] < 0
+
+        if "Return on Equity (TTM)" in c:
+            scores["long"] += c["Return on Equity (TTM)"] > 15
+        if "EPS Diluted (TTM YoY Growth)" in c:
+            scores["long"] += c["EPS Diluted (TTM YoY Growth)"] > 0
+            scores["growth"] += c["EPS Diluted (TTM YoY Growth)"] > 10
+        if "Revenue (TTM YoY Growth)" in c:
+            scores["long"] += c["Revenue (TTM YoY Growth)"] > 0
+            scores["growth"] += c["Revenue (TTM YoY Growth)"] > 10
+        if "Yearly Performance" in c:
+            scores["long"] += c["Yearly Performance"] > 0
+        if "EBITDA (TTM YoY Growth)" in c:
+            scores["growth"] += c["EBITDA (TTM YoY Growth)"] > 10
+
+        # Scores are small counts; float keys share top_k's NaN handling
+        return {name: score.astype(np.float64) for name, score in scores.items()}
+
+    @staticmethod
+    def _overpriced_mask(c):
+        # Filter out negative and extremely high P/E ratios
+        pe = c["Price to Earnings Ratio (TTM)"]
+        return (pe > 0) & (pe < 1000)
+
+    @staticmethod
+    def _underpriced_mask(c):
+        # Filter for positive P/E and P/B less than 3
+        pe, pb = c["Price to Earnings Ratio (TTM)"], c["Price to Book (MRQ)"]
+        return (pe > 0) & (pe < 15) & (pb > 0) & (pb < 3)
+
+    def _ranked(self, column, output, requires=(), where=None, largest=True):
+        """Top rows by one column, optionally within a filtered subset"""
+        if column not in self.columns or any(name not in self.columns for name in requires):
+            return []
+        candidates = np.flatnonzero(where(self.columns)) if where is not None else None
+        return self._stocks(top_k(self.columns[column], self.limit, largest, candidates), output)
+
+    def _stocks(self, positions, columns):
+        """
+        Format the selected rows column by column. Values are floats when the
+        whole frame is numeric and strings otherwise; missing values render
+        as null.
+        """
+        available = [col for col in columns if col in self.df.columns]
+        if not available:
+            return [{} for _ in range(len(positions))]
+        values = [
+            _format_values(self._selected_values(col, positions), self.numeric_rows)
+            for col in available
+        ]
+        return [dict(zip(available, row)) for row in zip(*values)]
+
+    def _selected_values(self, column, positions):
+        """Values of ``column`` at ``positions`` with inf cleaned as NaN"""
+        series = self.df[column]
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = self._float_columns.get(column)
+            if values is None:
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+                values[np.isinf(values)] = np.nan
+                self._float_columns[column] = values
+            values = values[positions]
+        else:
+            series = series.take(positions)
+            if series.dtype == object:
+                # Only mixed columns can still hold infinities
+                series = series.replace([np.inf, -np.inf], np.nan)
+            values = series.to_numpy(dtype=np.float64 if self.numeric_rows else object)
+        return values if self.numeric_rows else values.astype(object)
+
+    def _market_overview(self):
+        def aggregate(column, how):
+            if column not in self.columns:
+                return 0
+            # The extracted float column already has inf cleaned; no copy of the frame's
+            return float(getattr(pd.Series(self.columns[column], copy=False), how)())
+
+        return {
+            "total_market_cap": aggregate("Market Capitalization", "sum"),
+            "average_pe_ratio": aggregate("Price to Earnings Ratio (TTM)", "mean"),
+            "average_volume": aggregate("Volume", "mean"),
+        }
+
+    def _top_sectors_change(self):
+        """Get top sectors by average change percentage"""
+        if "Sector" not in self.df.columns or "Change %" not in self.columns:
+            return []
+
+        # Group by sector and calculate average change
+        frame = pd.DataFrame({
+            "Sector": self.df["Sector"],
+            "Change %": pd.Series(self.columns["Change %"], index=self.df.index),
+        })
+        sector_performance = frame.groupby('Sector')['Change %'].mean().reset_index()
+        sector_performance = sector_performance.sort_values('Change %', ascending=False).head(self.limit)
+
+        return [
+            {'sector': str(sector), 'change': float(change) if not pd.isna(change) else 0.0}
+            for sector, change in zip(
+                sector_performance['Sector'].tolist(), sector_performance['Change %'].tolist()
+            )
+        ]
@@ -0,0 +1,41 @@
+"""
+Bounded, thread-safe LRU mapping used for per-snapshot query caches
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Keep the ``maxsize`` most recently used entries"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, build):
+        """Cached value for ``key``, calling ``build()`` outside the lock on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.set(key, value)
+        return value
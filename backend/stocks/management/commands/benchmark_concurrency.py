@@ -0,0 +1,180 @@
+import datetime
+import http.client
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.benchmarks import make_screener_frame
+from stocks.snapshot import SnapshotStore
+
+# (label, DJ_ASGI, gunicorn worker class, application)
+SERVERS = [
+    ("wsgi, sync views", "false", "sync", "wsgi_application"),
+    ("asgi, sync views", "false", "uvicorn_worker.UvicornWorker", "asgi_application"),
+    ("asgi, async views", "true", "uvicorn_worker.UvicornWorker", "asgi_application"),
+]
+
+FAST_PATH = "/api/stocks/?fields=symbol,name,price"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port, path, timeout):
+    """Status of one GET, or None if the request failed or timed out"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    except OSError:
+        return None
+    finally:
+        conn.close()
+
+
+def _wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError("Server exited before it was ready")
+        if _get(port, FAST_PATH, timeout=1) == 200:
+            return
+        time.sleep(0.2)
+    raise CommandError("Server did not become ready")
+
+
+def _run_load(port, slow_clients, fast_clients, duration, timeout):
+    """
+    ``slow_clients`` loop on uncached history requests, each blocking on the
+    slow upstream, while ``fast_clients`` loop on an already-rendered list
+    """
+    stop = time.monotonic() + duration
+    counter = itertools.count()
+    fast_latencies, slow_done, failures = [], [], []
+    lock = threading.Lock()
+
+    def slow_client():
+        while time.monotonic() < stop:
+            # A new range every time, so each request misses the cache
+            start = datetime.date(2000, 1, 1) + datetime.timedelta(days=next(counter))
+            status = _get(port, f"/api/stocks/SYM00001/history/?start={start}", timeout)
+            with lock:
+                (slow_done if status == 200 else failures).append(status)
+
+    def fast_client():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            status = _get(port, FAST_PATH, timeout)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    fast_latencies.append(elapsed)
+                else:
+                    failures.append(status)
+
+    threads = [threading.Thread(target=slow_client) for _ in range(slow_clients)]
+    threads += [threading.Thread(target=fast_client) for _ in range(fast_clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    fast_latencies.sort()
+
+    def percentile(p):
+        if not fast_latencies:
+            return float("nan")
+        return fast_latencies[min(len(fast_latencies) - 1, int(len(fast_latencies) * p))] * 1000
+
+    return {
+        "fast_rps": len(fast_latencies) / elapsed,
+        "fast_p50": percentile(0.50),
+        "fast_p99": percentile(0.99),
+        "slow_rps": len(slow_done) / elapsed,
+        "failures": len(failures),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test concurrent request capacity while a dependency is slow: '
+        'gunicorn sync workers vs uvicorn workers with sync and async views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes (GUNICORN_WORKERS)')
+        parser.add_argument('--latency', type=float, default=0.5, help='Simulated upstream latency (seconds)')
+        parser.add_argument('--slow-clients', type=int, default=32)
+        parser.add_argument('--fast-clients', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--executor-workers', type=int, default=32, help='STOCK_EXECUTOR_WORKERS')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Client timeout (seconds)')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            SnapshotStore(directory).publish(make_screener_frame(500))
+            env = {
+                **os.environ,
+                "STOCK_SNAPSHOT_DIR": directory,
+                "STOCK_SNAPSHOT_REFRESHER": "command",
+                "DJ_DEBUG": "False",
+                "BENCHMARK_UPSTREAM_LATENCY": str(options['latency']),
+                "STOCK_EXECUTOR_WORKERS": str(options['executor_workers']),
+            }
+
+            self.stdout.write(
+                f"{options['workers']} workers, upstream latency {options['latency']}s, "
+                f"{options['slow_clients']} slow + {options['fast_clients']} fast clients "
+                f"for {options['duration']}s"
+            )
+            self.stdout.write(
+                f"{'server':<20}{'fast req/s':>12}{'fast p50 ms':>13}{'fast p99 ms':>13}"
+                f"{'slow req/s':>12}{'failed':>8}"
+            )
+            for label, asgi, worker_class, application in SERVERS:
+                port = _free_port()
+                process = subprocess.Popen(
+                    [
+                        sys.executable, "-m", "gunicorn",
+                        "--bind", f"127.0.0.1:{port}",
+                        "--workers", str(options['workers']),
+                        "--worker-class", worker_class,
+                        "--timeout", "120",
+                        "--log-level", "warning",
+                        f"stocks.benchmarks.slow_upstream:{application}",
+                    ],
+                    cwd=settings.BASE_DIR,
+                    env={**env, "DJ_ASGI": asgi},
+                )
+                try:
+                    _wait_until_ready(port, process)
+                    result = _run_load(
+                        port,
+                        options['slow_clients'],
+                        options['fast_clients'],
+                        options['duration'],
+                        options['timeout'],
+                    )
+                finally:
+                    process.terminate()
+                    process.wait()
+
+                self.stdout.write(
+                    f"{label:<20}{result['fast_rps']:>12.1f}{result['fast_p50']:>13.1f}"
+                    f"{result['fast_p99']:>13.1f}{result['slow_rps']:>12.1f}{result['failures']:>8}"
+                )
@@ -0,0 +1,43 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from stocks.benchmarks import format_bytes, legacy, make_screener_frame, measure
+from stocks.insights import InsightsEngine
+from stocks.renderers import render_json
+
+COLUMNS = ["Symbol", "Name", "Price", "Change %", "Technical Rating"]
+
+
+def format_stock_list(df, columns):
+    """Every row of ``df`` through the insights engine's formatter, engine setup included"""
+    return InsightsEngine(df)._stocks(np.arange(len(df)), columns)
+
+
+class Command(BaseCommand):
+    help = 'Compare the iterrows insight list formatter with the insights engine (setup included)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'frame':>8} {'rows':>6} {'iterrows':>10} {'bulk':>10} {'speedup':>8} {'peak old':>10} {'peak new':>10}"
+        )
+        full = make_screener_frame(max(options['rows']))
+        frames = {
+            'mixed': full,
+            'numeric': full.select_dtypes('number'),
+        }
+        for label, frame in frames.items():
+            for rows in options['rows']:
+                df = frame.iloc[:rows]
+                old_time, old_peak, old = measure(
+                    legacy.LegacyInsights._format_stock_list, df, COLUMNS, repeat=options['repeat']
+                )
+                new_time, new_peak, new = measure(format_stock_list, df, COLUMNS, repeat=options['repeat'])
+                assert render_json(old) == render_json(new), 'formatted lists differ from the reference implementation'
+                self.stdout.write(
+                    f"{label:>8} {rows:>6} {old_time * 1000:>8.2f}ms {new_time * 1000:>8.2f}ms "
+                    f"{old_time / new_time:>7.1f}x {format_bytes(old_peak):>10} {format_bytes(new_peak):>10}"
+                )
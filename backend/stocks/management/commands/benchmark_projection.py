@@ -0,0 +1,63 @@
+import gzip
+import json
+import time
+
+import numpy as np
+import tvscreener as tvs
+from django.core.management.base import BaseCommand
+from tvscreener.core.base import ScreenerDataFrame
+from tvscreener.util import get_columns_to_request
+
+from stocks.refresher import PROJECTED_COLUMNS
+from stocks.stock_fetcher import screener_fields
+
+TEXT_FIELDS = {"name", "description", "country", "currency", "exchange", "industry", "sector", "type", "subtype"}
+
+
+def make_response(columns, rows, seed=0):
+    """Screener response body shaped like TradingView's for ``columns``"""
+    rng = np.random.default_rng(seed)
+    data = []
+    for i in range(rows):
+        values = [
+            f"{name} {i}" if name in TEXT_FIELDS else round(float(value), 4)
+            for name, value in zip(columns, rng.normal(20.0, 30.0, size=len(columns)))
+        ]
+        data.append({"s": f"EGX:SYM{i:05d}", "d": values})
+    return json.dumps({"totalCount": rows, "data": data}).encode()
+
+
+def parse_response(body, columns):
+    """What tvscreener does with a response: decode and build the frame"""
+    data = [[d["s"]] + d["d"] for d in json.loads(body)["data"]]
+    return ScreenerDataFrame(data, columns)
+
+
+class Command(BaseCommand):
+    help = 'Compare full and column-projected screener responses (synthetic payloads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        variants = {
+            "full": get_columns_to_request(tvs.StockField),
+            "projected": get_columns_to_request(screener_fields(PROJECTED_COLUMNS)),
+        }
+        for label, columns in variants.items():
+            body = make_response(list(columns), options['rows'])
+            compressed = len(gzip.compress(body))
+
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                frame = parse_response(body, columns)
+                timings.append(time.perf_counter() - started)
+            memory = frame.memory_usage(deep=True).sum()
+
+            self.stdout.write(
+                f"{label:<10}{len(columns):>4} columns  {len(body) / 1024:>7.0f} KiB "
+                f"({compressed / 1024:.0f} KiB gzip)  parse p50 "
+                f"{np.percentile(timings, 50) * 1000:>6.1f}ms  frame {memory / 1024:>6.0f} KiB"
+            )
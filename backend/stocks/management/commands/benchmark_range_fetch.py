@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from stocks.benchmarks import make_screener_frame
+from stocks.range_fetch import RangeFetchError, fetch_ranges
+
+
+class StubUpstream:
+    """
+    Screener stand-in serving rows ``[start, end)`` of a fixed universe. Each
+    request costs a round trip plus time per row (download and parse), fails
+    with probability ``failure_rate``, and with ``shift`` a new listing is
+    inserted at the top after the first request, moving every row down one.
+    """
+
+    def __init__(self, universe, rtt, per_row, failure_rate=0.0, shift=False, seed=0):
+        self.frame = make_screener_frame(universe)
+        self.rtt = rtt
+        self.per_row = per_row
+        self.failure_rate = failure_rate
+        self.shift = shift
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch_range(self, start, end):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.failure_rate
+            if self.shift and self.requests == 2:
+                listing = self.frame.iloc[:1].assign(Symbol="NEW00000")
+                self.frame = pd.concat([listing, self.frame], ignore_index=True)
+            rows = self.frame.iloc[start:end]
+        time.sleep(self.rtt + self.per_row * len(rows))
+        if fail:
+            raise ConnectionError("simulated upstream failure")
+        return rows.reset_index(drop=True)
+
+
+class Command(BaseCommand):
+    help = 'Compare one large screener request with chunked parallel range fetches (stub upstream)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--universe', type=int, default=2000, help='Rows in the simulated market')
+        parser.add_argument('--max-rows', type=int, default=5000)
+        parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[0, 250, 500, 1000],
+                            help='0 fetches everything in one request')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rtt', type=float, default=0.15, help='Round trip per request (seconds)')
+        parser.add_argument('--per-row-ms', type=float, default=0.4, help='Download and parse cost per row')
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument('--shift', action='store_true', help='Insert a listing after the first request')
+        parser.add_argument('--verbose', action='store_true', help='Print every chunk')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"universe {options['universe']} rows, rtt {options['rtt'] * 1000:.0f}ms, "
+            f"{options['per_row_ms']}ms/row, {options['workers']} workers, "
+            f"failure rate {options['failure_rate']:.0%}"
+        )
+        for chunk_size in options['chunk_sizes']:
+            upstream = StubUpstream(
+                options['universe'],
+                rtt=options['rtt'],
+                per_row=options['per_row_ms'] / 1000,
+                failure_rate=options['failure_rate'],
+                shift=options['shift'],
+            )
+            label = f"chunks of {chunk_size}" if chunk_size else "single request"
+            try:
+                frame, report = fetch_ranges(
+                    upstream.fetch_range,
+                    chunk_size=chunk_size or options['max_rows'],
+                    max_rows=options['max_rows'],
+                    max_workers=options['workers'] if chunk_size else 1,
+                    retries=3,
+                    backoff=0.05,
+                )
+            except RangeFetchError as e:
+                self.stdout.write(f"{label:<18}failed: {e}")
+                continue
+            self.stdout.write(f"{label:<18}{report.summary()}")
+            if options['verbose']:
+                for chunk in report.chunks:
+                    self.stdout.write(
+                        f"    [{chunk.start:>5}, {chunk.end:>5})  {chunk.rows:>5} rows  "
+                        f"{chunk.attempts} attempt(s)  {chunk.seconds * 1000:>7.1f}ms"
+                    )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from stocks.benchmarks import format_bytes, legacy, make_screener_frame, measure
+from stocks.renderers import NumpyJSONRenderer
+from stocks.stock_fetcher import StockDataFetcher
+
+
+class Command(BaseCommand):
+    help = 'Compare the stdlib-backed and NumPy-aware JSON renderers on API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        df = make_screener_frame(options['rows'])
+        # The stdlib renderer is strict, so it needs the NaN-free legacy insights
+        payloads = {
+            'insights': (
+                {'success': True, 'data': legacy.LegacyInsights.process_stock_insights(df)},
+                {'success': True, 'data': StockDataFetcher.process_stock_insights(df)},
+            ),
+            'stock list': (
+                {'success': True, 'data': StockDataFetcher._prepare_stocks_data(df)},
+                {'success': True, 'data': StockDataFetcher._prepare_stocks_data(df)},
+            ),
+            'stock details': (
+                {'success': True, 'data': StockDataFetcher._prepare_all_comprehensive_stock_data(df)},
+                {'success': True, 'data': StockDataFetcher._prepare_all_comprehensive_stock_data(df)},
+            ),
+        }
+
+        self.stdout.write(
+            f"{'payload':>14} {'size':>10} {'stdlib':>10} {'numpy':>10} {'speedup':>8} {'peak old':>10} {'peak new':>10}"
+        )
+        old_renderer, new_renderer = JSONRenderer(), NumpyJSONRenderer()
+        for label, (old_data, new_data) in payloads.items():
+            old_time, old_peak, old = measure(old_renderer.render, old_data, repeat=options['repeat'])
+            new_time, new_peak, new = measure(new_renderer.render, new_data, repeat=options['repeat'])
+            self.stdout.write(
+                f"{label:>14} {format_bytes(len(new)):>10} {old_time * 1000:>8.2f}ms {new_time * 1000:>8.2f}ms "
+                f"{old_time / new_time:>7.1f}x {format_bytes(old_peak):>10} {format_bytes(new_peak):>10}"
+            )
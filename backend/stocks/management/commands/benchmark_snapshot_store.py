@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from stocks.benchmarks import format_bytes, make_screener_frame, memory_usage
+from stocks.refresher import refresh_snapshot
+from stocks.snapshot import SnapshotStore
+
+
+def _stub_fetch(calls, rows, latency):
+    """Stand-in for StockDataFetcher.fetch_egypt_stocks that counts upstream calls"""
+    with calls.get_lock():
+        calls.value += 1
+    time.sleep(latency)
+    return make_screener_frame(rows)
+
+
+def _warm_up(directory):
+    """Touch the pandas/Arrow code paths so lazy imports don't count as snapshot memory"""
+    store = SnapshotStore(directory, name=f'warmup{os.getpid()}')
+    store.publish(make_screener_frame(10))
+    store.current().frame["Price"].sum()
+
+
+def _refresher(calls, rows, latency, directory):
+    """The refresh_snapshots process publishing the snapshot the workers read"""
+    store = SnapshotStore(directory, ttl=300)
+    refresh_snapshot(store, fetch=lambda columns: _stub_fetch(calls, rows, latency), force=True)
+
+
+def _locmem_worker(calls, barrier, results, rows, latency, requests, directory):
+    """One gunicorn worker with its own per-process cache (the old behaviour)"""
+    _warm_up(directory)
+    rss_before, pss_before = memory_usage()
+    barrier.wait()
+    cached = None
+    for _ in range(requests):
+        if cached is None:
+            cached = _stub_fetch(calls, rows, latency)
+        cached["Price"].sum()
+    rss, pss = memory_usage()
+    results.put((rss - rss_before, (pss - pss_before) if pss is not None else None))
+
+
+def _shared_worker(calls, barrier, results, rows, latency, requests, directory):
+    """One gunicorn worker reading the shared memory-mapped snapshot"""
+    _warm_up(directory)
+    store = SnapshotStore(directory, ttl=300)
+    rss_before, pss_before = memory_usage()
+    barrier.wait()
+    for _ in range(requests):
+        snapshot = store.current()
+        while snapshot is None:
+            # Requests get a 503 until the refresher publishes the first snapshot
+            time.sleep(0.01)
+            snapshot = store.current()
+        snapshot.frame["Price"].sum()
+    rss, pss = memory_usage()
+    results.put((rss - rss_before, (pss - pss_before) if pss is not None else None))
+
+
+class Command(BaseCommand):
+    help = 'Compare per-worker memory and upstream calls: LocMem cache vs shared snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.5, help='Simulated upstream latency (seconds)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests served by each worker')
+
+    def handle(self, *args, **options):
+        ctx = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f"{'mode':<8} {'workers':>7} {'upstream calls':>15} {'RSS/worker':>12} {'PSS/worker':>12}"
+        )
+
+        for workers in options['workers']:
+            for mode in ('locmem', 'shared'):
+                calls = ctx.Value('i', 0)
+                barrier = ctx.Barrier(workers)
+                results = ctx.Queue()
+                common = (calls, barrier, results, options['rows'], options['latency'], options['requests'])
+
+                with tempfile.TemporaryDirectory() as directory:
+                    target = _locmem_worker if mode == 'locmem' else _shared_worker
+                    procs = [ctx.Process(target=target, args=common + (directory,)) for _ in range(workers)]
+                    if mode == 'shared':
+                        procs.append(ctx.Process(
+                            target=_refresher, args=(calls, options['rows'], options['latency'], directory)
+                        ))
+                    for proc in procs:
+                        proc.start()
+                    samples = [results.get() for _ in range(workers)]
+                    for proc in procs:
+                        proc.join()
+
+                rss = sum(s[0] for s in samples) / workers
+                pss_values = [s[1] for s in samples if s[1] is not None]
+                pss = sum(pss_values) / len(pss_values) if pss_values else None
+                self.stdout.write(
+                    f"{mode:<8} {workers:>7} {calls.value:>15} {format_bytes(rss):>12} {format_bytes(pss):>12}"
+                )
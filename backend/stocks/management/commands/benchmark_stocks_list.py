@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from stocks.benchmarks import format_bytes, legacy, make_screener_frame, measure
+from stocks.stock_fetcher import StockDataFetcher
+
+
+class Command(BaseCommand):
+    help = 'Compare the iterrows and vectorized stock list builders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[500, 5000, 50000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'rows':>7} {'iterrows':>10} {'vectorized':>11} {'speedup':>8} {'peak old':>10} {'peak new':>10}"
+        )
+        for rows in options['rows']:
+            df = make_screener_frame(rows)
+            old_time, old_peak, old = measure(legacy.prepare_stocks_data, df, repeat=options['repeat'])
+            new_time, new_peak, new = measure(StockDataFetcher._prepare_stocks_data, df, repeat=options['repeat'])
+            assert len(old) == len(new)
+            self.stdout.write(
+                f"{rows:>7} {old_time * 1000:>8.1f}ms {new_time * 1000:>9.1f}ms {old_time / new_time:>7.1f}x "
+                f"{format_bytes(old_peak):>10} {format_bytes(new_peak):>10}"
+            )
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from stocks.refresher import SnapshotRefresher, refresh_snapshots
+from stocks.snapshot import get_snapshot_store
+
+
+class Command(BaseCommand):
+    help = 'Keep the shared market snapshots fresh (run alongside the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Refresh a single time and exit')
+        parser.add_argument(
+            '--market', action='append', dest='markets',
+            help='Market to refresh (repeatable; default: every market in STOCK_MARKETS)',
+        )
+
+    def handle(self, *args, **options):
+        stores = [get_snapshot_store(market) for market in options['markets'] or settings.STOCK_MARKETS]
+
+        if options['once']:
+            # Markets are fetched concurrently, STOCK_REFRESH_WORKERS at a time
+            for name, snapshot in refresh_snapshots(stores, force=True).items():
+                if snapshot is None:
+                    self.stderr.write(f'{name}: no snapshot could be published')
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{name}: snapshot v{snapshot.version} is {snapshot.age:.0f}s old'
+                    ))
+            return
+
+        for store in stores:
+            self.stdout.write(f'Refreshing {store.path} every {store.ttl}s')
+        refresher = SnapshotRefresher(stores, max_workers=settings.STOCK_REFRESH_WORKERS)
+        try:
+            refresher.run()
+        except KeyboardInterrupt:
+            refresher.stop()
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.benchmarks import format_bytes, make_screener_frame
+from stocks.dtypes import column_bytes, normalize_frame
+from stocks.stock_fetcher import StockDataFetcher
+
+
+class Command(BaseCommand):
+    help = 'Print per-column memory of a screener frame before and after dtype normalization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--market', help='Market to fetch (default: STOCK_DEFAULT_MARKET)')
+        parser.add_argument('--synthetic', type=int, metavar='ROWS',
+                            help='Use a synthetic frame of ROWS stocks instead of fetching')
+        parser.add_argument('--top', type=int, default=0, help='Only list the N largest columns (0: all)')
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            raw = make_screener_frame(options['synthetic'])
+            source = f"synthetic frame, {len(raw)} rows"
+        else:
+            market = options['market'] or settings.STOCK_DEFAULT_MARKET
+            raw = StockDataFetcher._fetch_market_stocks(market)
+            if raw is None or raw.empty:
+                raise CommandError(f"No data fetched for {market}")
+            source = f"{market}, {len(raw)} rows"
+
+        frame = normalize_frame(raw)
+        before = column_bytes(raw)
+        after = column_bytes(frame)
+
+        rows = before.sort_values(ascending=False).index
+        if options['top']:
+            rows = rows[:options['top']]
+        self.stdout.write(f"{source}, {len(raw.columns)} columns")
+        self.stdout.write(f"{'column':<44}{'before':>22}{'after':>24}")
+        for column in rows:
+            self.stdout.write(
+                f"{str(column)[:43]:<44}{str(raw[column].dtype)[:10]:>10} {format_bytes(before[column]):>11}"
+                f"{str(frame[column].dtype)[:10]:>12} {format_bytes(after[column]):>11}"
+            )
+
+        float32 = sum(str(dtype) == 'float32' for dtype in frame.dtypes)
+        self.stdout.write(
+            f"total {format_bytes(before.sum())} -> {format_bytes(after.sum())} "
+            f"({1 - after.sum() / before.sum():.0%} smaller); "
+            f"{float32} float32 columns, "
+            f"{sum(dtype.name == 'category' for dtype in frame.dtypes)} categorical"
+        )
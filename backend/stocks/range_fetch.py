@@ -0,0 +1,167 @@
+"""
+Chunked, parallel screener range fetching
+
+The screener returns rows ``[start, end)`` of a sorted universe per request.
+Instead of one large request capped at a fixed range, the universe is read
+in fixed-size windows fetched concurrently, each retried on its own. A
+window that comes back short marks the end of the universe, so no windows
+past it are requested. Rows are concatenated in window order and checked
+for duplicates and gaps, which appear when the universe shifts under the
+sort between requests.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class RangeFetchError(Exception):
+    """A window could not be fetched within its retries"""
+
+
+class ChunkStats:
+    """Timing and outcome of one window"""
+
+    def __init__(self, start, end, rows, attempts, seconds):
+        self.start = start
+        self.end = end
+        self.rows = rows
+        self.attempts = attempts
+        self.seconds = seconds
+
+    @property
+    def short(self):
+        return self.rows < self.end - self.start
+
+    def __repr__(self):
+        return (
+            f"ChunkStats([{self.start}, {self.end}) rows={self.rows} "
+            f"attempts={self.attempts} {self.seconds * 1000:.0f}ms)"
+        )
+
+
+class RangeFetchReport:
+    """Per-window latency and integrity of one chunked fetch"""
+
+    def __init__(self, chunk_size, max_rows):
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.chunks = []
+        self.rows = 0
+        self.duplicates = 0
+        # Estimated from gaps and duplicates; rows can't be counted directly
+        self.missing = 0
+        self.truncated = False
+        self.seconds = 0.0
+
+    @property
+    def retries(self):
+        return sum(chunk.attempts - 1 for chunk in self.chunks)
+
+    def latency_ms(self, q):
+        """Window latency percentile ``q`` (0-100) in milliseconds"""
+        if not self.chunks:
+            return 0.0
+        return float(np.percentile([chunk.seconds for chunk in self.chunks], q)) * 1000
+
+    def summary(self):
+        return (
+            f"{self.rows} rows in {len(self.chunks)} chunks of {self.chunk_size} "
+            f"in {self.seconds:.2f}s (chunk p50 {self.latency_ms(50):.0f}ms, "
+            f"max {self.latency_ms(100):.0f}ms), {self.retries} retries, "
+            f"{self.duplicates} duplicates, {self.missing} missing"
+            + (f", truncated at {self.max_rows}" if self.truncated else "")
+        )
+
+
+def _fetch_window(fetch_range, start, end, retries, backoff):
+    started = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            frame = fetch_range(start, end)
+            break
+        except Exception as e:
+            if attempts > retries:
+                raise RangeFetchError(
+                    f"Rows [{start}, {end}) failed after {attempts} attempts: {e}"
+                ) from e
+            time.sleep(backoff * 2 ** (attempts - 1))
+    if frame is None:
+        frame = pd.DataFrame()
+    return frame, ChunkStats(start, end, len(frame), attempts, time.perf_counter() - started)
+
+
+def fetch_ranges(fetch_range, chunk_size, max_rows, max_workers=4, retries=2, backoff=0.5, key='Symbol'):
+    """
+    Fetch up to ``max_rows`` rows with ``fetch_range(start, end)`` in windows
+    of ``chunk_size``, at most ``max_workers`` at a time. Rows repeated
+    across windows (by ``key``) are dropped. Returns ``(frame, report)``;
+    raises RangeFetchError if a window still fails after ``retries``.
+    """
+    report = RangeFetchReport(chunk_size, max_rows)
+    started = time.perf_counter()
+    windows = iter(range(0, max_rows, chunk_size))
+    frames = {}
+    end_of_universe = max_rows
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screener-range") as pool:
+        pending = {}
+
+        def submit_next():
+            for start in windows:
+                if start >= end_of_universe:
+                    return
+                end = min(start + chunk_size, max_rows)
+                future = pool.submit(_fetch_window, fetch_range, start, end, retries, backoff)
+                pending[future] = start
+                return
+
+        for _ in range(max_workers):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                try:
+                    frame, stats = future.result()
+                except RangeFetchError:
+                    for other in pending:
+                        other.cancel()
+                    raise
+                frames[start] = frame
+                report.chunks.append(stats)
+                logger.debug("Fetched %r", stats)
+                if stats.short:
+                    # Nothing lies past a short window; stop scheduling beyond it
+                    end_of_universe = min(end_of_universe, stats.end)
+                submit_next()
+
+    report.chunks.sort(key=lambda chunk: chunk.start)
+    ordered = [frames[chunk.start] for chunk in report.chunks]
+    for i, chunk in enumerate(report.chunks):
+        # A short window followed by rows means rows vanished mid-fetch
+        if chunk.short and any(later.rows for later in report.chunks[i + 1:]):
+            report.missing += (chunk.end - chunk.start) - chunk.rows
+    report.truncated = bool(report.chunks) and report.chunks[-1].end == max_rows and not report.chunks[-1].short
+
+    non_empty = [frame for frame in ordered if len(frame)]
+    stocks_df = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame()
+    if key in stocks_df.columns:
+        duplicated = stocks_df[key].duplicated().to_numpy()
+        report.duplicates = int(duplicated.sum())
+        if report.duplicates:
+            # Each row pushed across a window boundary hid another one
+            report.missing += report.duplicates
+            stocks_df = stocks_df[~duplicated].reset_index(drop=True)
+
+    report.rows = len(stocks_df)
+    report.seconds = time.perf_counter() - started
+    return stocks_df, report
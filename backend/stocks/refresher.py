@@ -0,0 +1,221 @@
+"""
+Background snapshot refresher
+
+Fetches the screener on a fixed cadence, precomputes the payloads served by
+the views and publishes them with the snapshot. Requests only ever read the
+latest completed snapshot, so they never wait on the upstream. Each market
+has its own snapshot store and TTL; markets that are due are refreshed
+concurrently on a bounded pool, so adding one barely adds refresh latency.
+
+With STOCK_FETCH_PROJECTED, routine refreshes request only the columns the
+list, stream and insights read. The stock detail payloads need every
+column, so they are rebuilt from a full fetch every STOCK_DETAIL_TTL
+seconds; in between, the fetched fields are overlaid onto the previous ones.
+Frames are normalized to compact dtypes (see dtypes.py) before publishing.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .dtypes import normalize_frame
+from .fields import STOCK_LIST_COLUMNS
+from .insights import SCREENER_COLUMNS
+from .snapshot import get_snapshot_store
+from .stock_fetcher import StockDataFetcher, details_fetched_at
+
+logger = logging.getLogger(__name__)
+
+# Payloads precomputed at publish time, keyed by artifact name
+SNAPSHOT_ARTIFACTS = {
+    "insights": StockDataFetcher.process_stock_insights,
+    "stocks_list": StockDataFetcher._prepare_stocks_data,
+    "stock_details": StockDataFetcher._prepare_all_comprehensive_stock_data,
+}
+
+# Screener columns each artifact reads (None: every column)
+ARTIFACT_COLUMNS = {
+    "insights": SCREENER_COLUMNS,
+    "stocks_list": STOCK_LIST_COLUMNS,
+    "stock_details": None,
+}
+# Columns requested by projected refreshes
+PROJECTED_COLUMNS = list(dict.fromkeys(
+    column for columns in ARTIFACT_COLUMNS.values() if columns for column in columns
+))
+
+# Delay before retrying after a failed or empty upstream fetch
+RETRY_INTERVAL = 30
+# Shortest wait between refreshes of one market, whatever its TTL
+MIN_REFRESH_INTERVAL = 1
+
+
+def snapshot_artifact(snapshot, name):
+    """Return a precomputed payload for the snapshot, building it if missing"""
+    return snapshot.derive(name, lambda snap: SNAPSHOT_ARTIFACTS[name](snap.frame))
+
+
+def needs_full_fetch(snapshot):
+    """Whether the next refresh must fetch every column to rebuild the detail payloads"""
+    if not settings.STOCK_FETCH_PROJECTED or snapshot is None:
+        return True
+    return time.time() - details_fetched_at(snapshot) >= settings.STOCK_DETAIL_TTL
+
+
+def refresh_snapshot(store, fetch=None, force=False):
+    """
+    Fetch, precompute and publish a new snapshot unless another process is
+    already doing so or the current one is still fresh. Returns the latest
+    snapshot (possibly unchanged). ``fetch(columns)`` defaults to the
+    store's market; ``columns`` is None when every column is needed.
+    """
+    with store.refresh_lock(blocking=False) as acquired:
+        snapshot = store.current()
+        if not acquired or (not force and store.is_fresh(snapshot)):
+            return snapshot
+
+        started = time.perf_counter()
+        full = needs_full_fetch(snapshot)
+        columns = None if full else PROJECTED_COLUMNS
+        if fetch is not None:
+            stocks_df = fetch(columns)
+        else:
+            stocks_df = StockDataFetcher.fetch_market_stocks(store.name, columns)
+        if stocks_df is None or stocks_df.empty:
+            logger.warning("Snapshot refresh for %s returned no data", store.name)
+            return snapshot
+
+        # Published and read back with float32/categorical columns and no infinities
+        stocks_df = normalize_frame(stocks_df)
+        fetched_at = time.time()
+        artifacts = {
+            name: build(stocks_df)
+            for name, build in SNAPSHOT_ARTIFACTS.items()
+            if full or ARTIFACT_COLUMNS[name] is not None
+        }
+        if full:
+            artifacts["details_fetched_at"] = fetched_at
+        else:
+            artifacts["stock_details"] = StockDataFetcher._refresh_comprehensive_stock_data(
+                snapshot_artifact(snapshot, "stock_details"), stocks_df
+            )
+            artifacts["details_fetched_at"] = details_fetched_at(snapshot)
+        snapshot = store.publish(stocks_df, fetched_at=fetched_at, artifacts=artifacts)
+        logger.info(
+            "Published %s snapshot v%s (%d rows, %d columns%s) in %.2fs",
+            store.name, snapshot.version, len(stocks_df), len(stocks_df.columns),
+            "" if full else ", projected", time.perf_counter() - started,
+        )
+        return snapshot
+
+
+def refresh_snapshots(stores, force=False, max_workers=None):
+    """
+    Refresh several markets concurrently, at most ``max_workers`` at a time.
+    Returns {market: latest snapshot or None}.
+    """
+    stores = list(stores)
+    if not stores:
+        return {}
+    max_workers = min(len(stores), max_workers or settings.STOCK_REFRESH_WORKERS)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot-refresh") as pool:
+        futures = {store.name: pool.submit(refresh_snapshot, store, force=force) for store in stores}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception:
+            logger.exception("Snapshot refresh for %s failed", name)
+            results[name] = None
+    return results
+
+
+def next_delay(store):
+    """Sleep until the store's snapshot expires, or retry shortly if there is none"""
+    snapshot = store.current()
+    remaining = store.ttl - snapshot.age if snapshot is not None else 0
+    if remaining > 0:
+        return remaining
+    # A TTL of zero must not turn the refresher into a busy loop on the upstream
+    return max(MIN_REFRESH_INTERVAL, min(RETRY_INTERVAL, store.ttl))
+
+
+class SnapshotRefresher(threading.Thread):
+    """
+    Daemon thread keeping a set of snapshot stores fresh. Each market is
+    scheduled on its own TTL; due markets are refreshed on a pool of
+    ``max_workers`` threads, so one slow market never delays the others.
+    """
+
+    def __init__(self, stores, max_workers=4):
+        super().__init__(name="snapshot-refresher", daemon=True)
+        self.stores = list(stores)
+        self.max_workers = max(1, min(max_workers, len(self.stores)))
+        self._due = {store.name: 0.0 for store in self.stores}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="snapshot-refresh") as pool:
+            while not self._stop_event.is_set():
+                self._wake.clear()
+                now = time.monotonic()
+                with self._lock:
+                    for store in self.stores:
+                        if store.name not in self._running and self._due[store.name] <= now:
+                            self._running.add(store.name)
+                            pool.submit(self._refresh, store)
+                    waits = [due - now for name, due in self._due.items() if name not in self._running]
+                # Woken early when a refresh finishes and its market is rescheduled
+                self._wake.wait(max(0.0, min(waits)) if waits else None)
+
+    def _refresh(self, store):
+        try:
+            refresh_snapshot(store)
+        except Exception:
+            logger.exception("Snapshot refresh for %s failed", store.name)
+        finally:
+            delay = next_delay(store)
+            with self._lock:
+                self._due[store.name] = time.monotonic() + delay
+                self._running.discard(store.name)
+            self._wake.set()
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def start_refresher():
+    """Start the in-process refresher for every configured market once per process"""
+    global _refresher
+    refresher = _refresher
+    if refresher is not None and refresher.is_alive():
+        return refresher
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            stores = [get_snapshot_store(market) for market in settings.STOCK_MARKETS]
+            _refresher = SnapshotRefresher(stores, max_workers=settings.STOCK_REFRESH_WORKERS)
+            _refresher.start()
+    return _refresher
+
+
+def get_latest_snapshot(name=None):
+    """
+    Latest completed snapshot of a market (the default market if None) for
+    the views, or None while its very first one is still being fetched.
+    Never blocks on the upstream.
+    """
+    store = get_snapshot_store(name)
+    if settings.STOCK_SNAPSHOT_REFRESHER == "thread":
+        start_refresher()
+    return store.current()
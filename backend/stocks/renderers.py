@@ -0,0 +1,46 @@
+"""
+NumPy-aware JSON rendering
+
+orjson serializes NumPy scalars and arrays natively and writes NaN and
+infinities as null, so payloads built from screener frames can be rendered
+without converting every value to a Python float first.
+"""
+
+import orjson
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Line/paragraph separators are valid JSON but not valid JavaScript
+_UNSAFE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+_fallback_encoder = encoders.JSONEncoder()
+
+
+def _default(value):
+    """Types orjson does not know (Decimal, lazy strings, pandas scalars, ...)"""
+    if hasattr(value, "item") and callable(value.item):
+        return value.item()
+    return _fallback_encoder.default(value)
+
+
+def render_json(data, indent=False):
+    """Serialize ``data`` to JSON bytes; NaN/inf become null"""
+    content = orjson.dumps(
+        data, default=_default, option=(OPTIONS | orjson.OPT_INDENT_2) if indent else OPTIONS
+    )
+    for separator, escaped in _UNSAFE_SEPARATORS:
+        if separator in content:
+            content = content.replace(separator, escaped)
+    return content
+
+
+class NumpyJSONRenderer(JSONRenderer):
+    """DRF JSON renderer backed by orjson, NumPy-aware and NaN-tolerant"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return render_json(data, indent=bool(indent))
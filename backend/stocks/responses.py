@@ -0,0 +1,139 @@
+"""
+Pre-serialized, pre-compressed API responses
+
+A successful body only depends on the snapshot and the request, so it is
+rendered and compressed once per snapshot version and then served as bytes.
+Strong validators let clients revalidate with 304 Not Modified until the
+next snapshot is published.
+"""
+
+import gzip
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+from .lru import LRUCache
+from .renderers import render_json
+
+try:
+    import brotli
+except ImportError:  # gzip is always available; brotli is optional
+    brotli = None
+
+
+# Bodies are compressed on the request path the first time they are served
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# Distinct bodies (endpoint, host and query) kept per snapshot
+RESPONSE_CACHE_SIZE = 256
+
+
+class PrecompressedBody:
+    """A rendered JSON body with its encoded variants and validators"""
+
+    def __init__(self, content, version, last_modified):
+        self.last_modified = int(last_modified)
+        digest = hashlib.sha1(content).hexdigest()[:16]
+        etag = f"v{version}-{digest}"
+        # Each content-coding is a distinct representation with its own strong ETag
+        self.variants = {None: (content, f'"{etag}"')}
+        self.variants["gzip"] = (
+            gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0),
+            f'"{etag}-gzip"',
+        )
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(content, quality=BROTLI_QUALITY), f'"{etag}-br"')
+        self.etags = {tag for _, tag in self.variants.values()}
+
+    def negotiate(self, accept_encoding):
+        """Preferred encoding accepted by the client, or None for identity"""
+        accepted = {}
+        for part in accept_encoding.split(","):
+            coding, _, params = part.partition(";")
+            coding = coding.strip().lower()
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if coding:
+                accepted[coding] = quality
+
+        wildcard = accepted.get("*", 0.0)
+        for coding in ("br", "gzip"):
+            if coding in self.variants and accepted.get(coding, wildcard) > 0:
+                return coding
+        return None
+
+    def not_modified(self, request):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return not tags.isdisjoint(self.etags)
+
+        if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+        return if_modified_since is not None and self.last_modified <= if_modified_since
+
+    def response(self, request, snapshot):
+        encoding = self.negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        content, etag = self.variants[encoding]
+
+        if self.not_modified(request):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type="application/json")
+            if encoding is not None:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(self.last_modified)
+        response["Vary"] = "Accept-Encoding"
+        # Let clients keep the body but revalidate it on every use
+        response["Cache-Control"] = "no-cache"
+        response["X-Snapshot-Version"] = snapshot.tag
+        response["X-Snapshot-Age"] = f"{snapshot.age:.1f}"
+        return response
+
+
+def request_key(request):
+    """Cache key for everything in the request that can change the body"""
+    query = tuple(sorted((key, tuple(values)) for key, values in request.GET.lists()))
+    return (request.scheme, request.get_host(), request.path, query)
+
+
+def cached_body(request, snapshot):
+    """The body already rendered for this request and snapshot, or None"""
+    bodies = snapshot.derived("responses")
+    return bodies.get(request_key(request)) if bodies is not None else None
+
+
+def render_body(request, snapshot, build):
+    """Render and compress the body ``build()`` returns and cache it for the snapshot"""
+    bodies = snapshot.derive("responses", lambda snap: LRUCache(RESPONSE_CACHE_SIZE))
+    return bodies.get_or_set(
+        request_key(request),
+        lambda: PrecompressedBody(render_json(build()), snapshot.version, snapshot.fetched_at),
+    )
+
+
+def cached_json_response(request, snapshot, build):
+    """
+    Serve the body ``build()`` returns for this request, rendering and
+    compressing it only on the first request per snapshot
+    """
+    body = cached_body(request, snapshot) or render_body(request, snapshot, build)
+    return body.response(request, snapshot)
+
+
+def json_response(data, status=200, headers=None):
+    """Plain JSON response rendered like the API's renderer, for the async views"""
+    response = HttpResponse(render_json(data), content_type="application/json", status=status)
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
@@ -0,0 +1,79 @@
+"""
+Single-flight call coalescing
+
+Concurrent callers asking for the same key share one in-progress call
+instead of each hitting the upstream. Optionally a lock file extends this
+across processes: a process that waited on another's flight reuses the
+result it published rather than repeating the call.
+"""
+
+import fcntl
+import os
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls per key across threads (and optionally processes)"""
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, reuse=None):
+        """
+        Run ``func`` once for all concurrent callers of ``key`` and return its
+        result to each of them. With ``lock_dir`` set, processes also take
+        turns on a lock file; after waiting, ``reuse()`` is consulted and a
+        non-None value it returns is used instead of calling ``func`` again.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, func, reuse)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _run(self, key, func, reuse):
+        if self.lock_dir is None:
+            return func()
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        with open(os.path.join(self.lock_dir, f"{key}.flight.lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is mid-flight: wait for it, then try its result
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if reuse is not None:
+                    result = reuse()
+                    if result is not None:
+                        return result
+            try:
+                return func()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
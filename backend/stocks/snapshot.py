@@ -0,0 +1,281 @@
+"""
+Shared market snapshot store
+
+One process fetches the screener frame and publishes it as an Arrow IPC file.
+Every worker memory-maps the same file read-only, so N gunicorn workers share
+a single copy of the data in the page cache instead of N LocMem copies.
+"""
+
+import fcntl
+import glob
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+
+from .lru import LRUCache
+from .renderers import render_json
+
+
+ARTIFACT_PREFIX = b"artifact:"
+
+
+class Snapshot:
+    """A published, read-only market snapshot"""
+
+    def __init__(self, version, fetched_at, table, artifacts=None, market=None, epoch=""):
+        self.market = market
+        self.version = version
+        self.epoch = epoch
+        self.fetched_at = fetched_at
+        self.table = table
+        self.artifacts = artifacts or {}
+        self._frame = None
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    @property
+    def tag(self):
+        """
+        Version sent to clients. The store's epoch changes whenever numbering
+        restarts (e.g. a wiped snapshot directory), so a tag is never reused.
+        """
+        return f"{self.epoch}-{self.version}" if self.epoch else str(self.version)
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was fetched from the upstream"""
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def frame(self):
+        """DataFrame view over the mapped table (numeric columns are zero-copy)"""
+        if self._frame is None:
+            with self._lock:
+                if self._frame is None:
+                    self._frame = self.table.to_pandas(split_blocks=True)
+        return self._frame
+
+    def derived(self, name):
+        """The memoized value for ``name``, or None; never builds or blocks"""
+        return self._derived.get(name)
+
+    def derive(self, name, builder):
+        """
+        Compute a value from this snapshot once per process and memoize it.
+        Artifacts precomputed by the publisher are loaded instead of rebuilt.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._derived:
+                payload = self.artifacts.get(name)
+                if payload is not None:
+                    self._derived[name] = orjson.loads(payload)
+                else:
+                    self._derived[name] = builder(self)
+            return self._derived[name]
+
+
+class SnapshotStore:
+    """
+    Arrow IPC snapshot file shared by all workers on the host. The last
+    ``history`` versions are also kept as ``<name>.v<version>.arrow`` hard
+    links, so readers can diff against a recent snapshot by version.
+    """
+
+    def __init__(self, directory, name="egypt", ttl=300, history=12):
+        self.directory = directory
+        self.name = name
+        self.ttl = ttl
+        self.history = history
+        self.path = os.path.join(directory, f"{name}.arrow")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self._current = None
+        self._stat_key = None
+        self._lock = threading.Lock()
+        self._versions = LRUCache(max(history, 1))
+
+    def current(self):
+        """Return the latest published snapshot, remapping it if the file changed"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat_key == self._stat_key:
+            return self._current
+
+        with self._lock:
+            if stat_key != self._stat_key:
+                self._current = self._read()
+                self._stat_key = stat_key
+            return self._current
+
+    def version_path(self, version):
+        return os.path.join(self.directory, f"{self.name}.v{version}.arrow")
+
+    def at(self, version, epoch):
+        """
+        The snapshot published as ``version`` in ``epoch``, or None once it
+        has fallen out of the retained history or numbering has restarted
+        """
+        current = self.current()
+        if current is None or current.epoch != epoch:
+            return None
+        if current.version == version:
+            return current
+        if not 0 < current.version - version < self.history:
+            return None
+
+        snapshot = self._versions.get(version)
+        if snapshot is None:
+            try:
+                snapshot = self._read(self.version_path(version))
+            except FileNotFoundError:
+                return None
+            if snapshot.epoch != epoch:
+                return None  # Left over from before the store was reset
+            self._versions.set(version, snapshot)
+        return snapshot
+
+    def is_fresh(self, snapshot):
+        return snapshot is not None and snapshot.age < self.ttl
+
+    @contextmanager
+    def refresh_lock(self, blocking=True):
+        """
+        Exclusive host-wide lock serializing writers of this snapshot.
+        Yields False instead of waiting when ``blocking`` is off and the lock is held.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def publish(self, stocks_df, fetched_at=None, artifacts=None):
+        """
+        Write a new snapshot version atomically and return it. ``artifacts``
+        are JSON-serializable values derived from the frame, stored with it so
+        readers don't have to recompute them.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.current()
+        if previous is not None and previous.epoch:
+            epoch, version = previous.epoch, previous.version + 1
+        else:
+            # Numbering (re)starts: a new epoch keeps old tags from matching
+            epoch, version = secrets.token_hex(4), (previous.version + 1 if previous else 1)
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+
+        metadata = {
+            b"version": str(version).encode(),
+            b"epoch": epoch.encode(),
+            b"fetched_at": repr(fetched_at).encode(),
+        }
+        for name, value in (artifacts or {}).items():
+            metadata[ARTIFACT_PREFIX + name.encode()] = render_json(value)
+        table = _frame_to_table(stocks_df).replace_schema_metadata(metadata)
+
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        if self.history:
+            # Same inode as the current file; costs no extra space until replaced
+            version_path = self.version_path(version)
+            if os.path.exists(version_path):
+                os.remove(version_path)  # Left over from a store that was reset
+            os.link(tmp_path, version_path)
+        # Readers holding the old mapping keep the previous inode alive
+        os.replace(tmp_path, self.path)
+        self._prune(version)
+        return self.current()
+
+    def _prune(self, version):
+        """Remove retained versions older than the last ``history``"""
+        pattern = re.compile(rf"{re.escape(self.name)}\.v(\d+)\.arrow$")
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self.name)}.v*.arrow")):
+            match = pattern.search(path)
+            if match and int(match.group(1)) <= version - self.history:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Pruned by another publisher
+
+    def _read(self, path=None):
+        source = pa.memory_map(path or self.path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        artifacts = {
+            key[len(ARTIFACT_PREFIX):].decode(): value
+            for key, value in metadata.items()
+            if key.startswith(ARTIFACT_PREFIX)
+        }
+        return Snapshot(
+            version=int(metadata.get(b"version", b"0")),
+            epoch=metadata.get(b"epoch", b"").decode(),
+            fetched_at=float(metadata.get(b"fetched_at", b"0")),
+            table=table.replace_schema_metadata(None),
+            artifacts=artifacts,
+            market=self.name,
+        )
+
+
+def _frame_to_table(stocks_df):
+    """
+    Convert a screener frame to Arrow keeping float NaN as NaN rather than
+    null, so numeric columns can later be mapped back without a copy.
+    Categoricals become dictionary arrays and read back as categoricals.
+    """
+    arrays = []
+    for column in stocks_df.columns:
+        values = stocks_df[column]
+        if pd.api.types.is_float_dtype(values.dtype) or pd.api.types.is_integer_dtype(values.dtype):
+            arrays.append(pa.array(np.asarray(values), from_pandas=False))
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            arrays.append(pa.array(values, from_pandas=True))
+        else:
+            arrays.append(pa.array(values.astype(object), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in stocks_df.columns])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_snapshot_store(name=None):
+    """Process-wide snapshot store for the given market (default market if None)"""
+    name = name or settings.STOCK_DEFAULT_MARKET
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(name)
+            if store is None:
+                store = SnapshotStore(
+                    settings.STOCK_SNAPSHOT_DIR,
+                    name=name,
+                    ttl=settings.STOCK_MARKET_TTLS.get(name, settings.STOCK_SNAPSHOT_TTL),
+                    history=settings.STOCK_SNAPSHOT_HISTORY,
+                )
+                _stores[name] = store
+    return store
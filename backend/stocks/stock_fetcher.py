@@ -2,608 +2,203 @@
 Stock data fetcher using tvscreener
 """
 
+import logging
+
 import tvscreener as tvs
 import pandas as pd
-import numpy as np
-from datetime import datetime
+from django.conf import settings
+from .fields import STOCK_DETAIL_CONVERTER, STOCK_FIELDS, STOCK_LIST_CONVERTER, FieldConverter
+from .insights import InsightsEngine
+from .range_fetch import fetch_ranges
+from .singleflight import SingleFlight
+from .snapshot import get_snapshot_store
 
+logger = logging.getLogger(__name__)
 
-class StockDataFetcher:
-    @staticmethod
-    def fetch_egypt_stocks():
-        """Fetch Egyptian stock market data"""
-        try:
-            ss = tvs.StockScreener()
-            ss.set_markets(tvs.Market.EGYPT)
-            ss.set_range(0, 500)
-            stocks_df = ss.get()
-            return stocks_df
-        except Exception as e:
-            print(f"Error fetching stock data: {e}")
-            return pd.DataFrame()
+# Concurrent fetches share one upstream call; STOCK_FETCH_LOCK_DIR extends
+# this across worker processes
+_fetch_flight = SingleFlight(lock_dir=getattr(settings, "STOCK_FETCH_LOCK_DIR", None))
 
-    @staticmethod
-    def process_stock_insights(stocks_df):
-        """Process stock data to generate insights"""
-        if stocks_df.empty:
-            return {}
 
-        # Clean data - replace inf and nan values
-        stocks_df = stocks_df.replace([np.inf, -np.inf], np.nan)
+def details_fetched_at(snapshot):
+    """
+    When the snapshot's detail payloads were last built from a full fetch.
+    Projected refreshes carry it over; snapshots without it were full.
+    """
+    return snapshot.derive("details_fetched_at", lambda snap: snap.fetched_at)
 
-        insights = {
-            "timestamp": datetime.now().isoformat(),
-            "total_stocks": len(stocks_df),
-            "market_overview": {
-                "total_market_cap": (
-                    float(stocks_df["Market Capitalization"].sum())
-                    if "Market Capitalization" in stocks_df
-                    else 0
-                ),
-                "average_pe_ratio": (
-                    float(stocks_df["Price to Earnings Ratio (TTM)"].mean())
-                    if "Price to Earnings Ratio (TTM)" in stocks_df
-                    else 0
-                ),
-                "average_volume": (
-                    float(stocks_df["Volume"].mean()) if "Volume" in stocks_df else 0
-                ),
-            },
-            # Top Bullish Stocks (based on multiple indicators)
-            "top_bullish": StockDataFetcher._get_bullish_stocks(stocks_df),
-            # Top Bearish Stocks
-            "top_bearish": StockDataFetcher._get_bearish_stocks(stocks_df),
-            # Best for Short Term (1 week)
-            "best_short_term": StockDataFetcher._get_short_term_picks(stocks_df),
-            # Best for Medium Term (1 month)
-            "best_medium_term": StockDataFetcher._get_medium_term_picks(stocks_df),
-            # Best for Long Term (1 year)
-            "best_long_term": StockDataFetcher._get_long_term_picks(stocks_df),
-            # Overpriced Stocks
-            "overpriced": StockDataFetcher._get_overpriced_stocks(stocks_df),
-            # Underpriced Stocks
-            "underpriced": StockDataFetcher._get_underpriced_stocks(stocks_df),
-            # Volume Leaders
-            "volume_leaders": StockDataFetcher._get_volume_leaders(stocks_df),
-            # Momentum Stocks
-            "momentum_stocks": StockDataFetcher._get_momentum_stocks(stocks_df),
-            # Dividend Stocks
-            "dividend_stocks": StockDataFetcher._get_dividend_stocks(stocks_df),
-            # Growth Stocks
-            "growth_stocks": StockDataFetcher._get_growth_stocks(stocks_df),
-            # Top Positive Movers
-            "top_positive_movers": StockDataFetcher._get_top_positive_movers(stocks_df),
-            # Top Negative Movers
-            "top_negative_movers": StockDataFetcher._get_top_negative_movers(stocks_df),
-            # Top Sectors Change
-            "top_sectors_change": StockDataFetcher._get_top_sectors_change(stocks_df),
-        }
 
-        return insights
+def _reuse_fresh_snapshot(market):
+    """Full frame of a snapshot published while we waited on another process"""
+    store = get_snapshot_store(market)
+    snapshot = store.current()
+    if not store.is_fresh(snapshot) or details_fetched_at(snapshot) != snapshot.fetched_at:
+        return None
+    return snapshot.frame
 
-    @staticmethod
-    def _prepare_stocks_data(df):
-        """Prepare all stocks data for frontend with proper field mapping"""
-        stocks_list = []
-        for _, row in df.iterrows():  # Limit to 200 stocks for performance
-            stock_data = {
-                'symbol': str(row.get('Symbol', '')),
-                'name': str(row.get('Name', '')),
-                'price': float(row.get('Price', 0)) if not pd.isna(row.get('Price', 0)) else 0,
-                'change_percent': float(row.get('Change %', 0)) if not pd.isna(row.get('Change %', 0)) else 0,
-                'volume': int(row.get('Volume', 0)) if not pd.isna(row.get('Volume', 0)) else 0,
-                'market_capitalization': float(row.get('Market Capitalization', 0)) if not pd.isna(row.get('Market Capitalization', 0)) else 0,
-                'price_to_earnings_ratio_ttm': float(row.get('Price to Earnings Ratio (TTM)', 0)) if not pd.isna(row.get('Price to Earnings Ratio (TTM)', 0)) else 0,
-                'technical_rating': float(row.get('Technical Rating', 0)) if not pd.isna(row.get('Technical Rating', 0)) else 0,
-                'weekly_performance': float(row.get('Performance (Week)', 0)) if not pd.isna(row.get('Performance (Week)', 0)) else 0,
-                'monthly_performance': float(row.get('Performance (Month)', 0)) if not pd.isna(row.get('Performance (Month)', 0)) else 0,
-                'yearly_performance': float(row.get('Performance (Year)', 0)) if not pd.isna(row.get('Performance (Year)', 0)) else 0,
-                'dividend_yield_forward': float(row.get('Dividend Yield Forward', 0)) if not pd.isna(row.get('Dividend Yield Forward', 0)) else 0,
-                'sector': str(row.get('Sector', '')),
-                'industry': str(row.get('Industry', '')),
-                'country': str(row.get('Country', 'Egypt')),
-                'currency': str(row.get('Currency', 'EGP')),
-                'exchange': str(row.get('Exchange', 'EGX')),
-            }
-            stocks_list.append(stock_data)
-        return stocks_list
 
-    @staticmethod
-    def _prepare_comprehensive_stock_data(df, symbol):
-        """Prepare comprehensive stock data for a specific symbol with all available attributes"""
-        # Find the specific stock by symbol
-        stock_row = df[df['Symbol'] == symbol]
-        if stock_row.empty:
-            return None
-        
-        row = stock_row.iloc[0]
-        
-        def safe_float(value, default=0):
-            """Safely convert to float, handling NaN and inf values"""
-            if pd.isna(value) or np.isinf(value):
-                return default
-            return float(value)
-        
-        def safe_int(value, default=0):
-            """Safely convert to int, handling NaN and inf values"""
-            if pd.isna(value) or np.isinf(value):
-                return default
-            return int(value)
-        
-        def safe_str(value, default=''):
-            """Safely convert to string"""
-            if pd.isna(value):
-                return default
-            return str(value)
-        
-        # Comprehensive stock data mapping
-        stock_data = {
-            # Basic Information
-            'symbol': safe_str(row.get('Symbol', '')),
-            'name': safe_str(row.get('Name', '')),
-            'description': safe_str(row.get('Description', '')),
-            'country': safe_str(row.get('Country', 'Egypt')),
-            'currency': safe_str(row.get('Currency', 'EGP')),
-            'exchange': safe_str(row.get('Exchange', 'EGX')),
-            'industry': safe_str(row.get('Industry', '')),
-            'sector': safe_str(row.get('Sector', '')),
-            'submarket': safe_str(row.get('Submarket', '')),
-            'subtype': safe_str(row.get('Subtype', '')),
-            'type_field': safe_str(row.get('Type', '')),
-            'logoid': safe_str(row.get('LogoID', '')),
-            
-            # Price Information
-            'price': safe_float(row.get('Price', 0)),
-            'open_price': safe_float(row.get('Open', 0)),
-            'high': safe_float(row.get('High', 0)),
-            'low': safe_float(row.get('Low', 0)),
-            'close_price': safe_float(row.get('Close', 0)),
-            'change': safe_float(row.get('Change', 0)),
-            'change_percent': safe_float(row.get('Change %', 0)),
-            'change_from_open': safe_float(row.get('Change from Open', 0)),
-            'change_from_open_percent': safe_float(row.get('Change from Open %', 0)),
-            'gap_percent': safe_float(row.get('Gap %', 0)),
-            
-            # Volume Information
-            'volume': safe_int(row.get('Volume', 0)),
-            'volume_price': safe_float(row.get('Volume Price', 0)),
-            'volume_weighted_average_price': safe_float(row.get('Volume Weighted Average Price', 0)),
-            'relative_volume': safe_float(row.get('Relative Volume', 0)),
-            'relative_volume_at_time': safe_float(row.get('Relative Volume at Time', 0)),
-            
-            # Performance Metrics
-            'weekly_performance': safe_float(row.get('Performance (Week)', 0)),
-            'monthly_performance': safe_float(row.get('Performance (Month)', 0)),
-            'yearly_performance': safe_float(row.get('Performance (Year)', 0)),
-            'ytd_performance': safe_float(row.get('Performance (YTD)', 0)),
-            'five_year_performance': safe_float(row.get('Performance (5Y)', 0)),
-            'all_time_performance': safe_float(row.get('Performance (All)', 0)),
-            'three_month_performance': safe_float(row.get('Performance (3M)', 0)),
-            'six_month_performance': safe_float(row.get('Performance (6M)', 0)),
-            
-            # High/Low Records
-            'all_time_high': safe_float(row.get('All Time High', 0)),
-            'all_time_low': safe_float(row.get('All Time Low', 0)),
-            'fifty_two_week_high': safe_float(row.get('52W High', 0)),
-            'fifty_two_week_low': safe_float(row.get('52W Low', 0)),
-            'one_month_high': safe_float(row.get('1M High', 0)),
-            'one_month_low': safe_float(row.get('1M Low', 0)),
-            'three_month_high': safe_float(row.get('3M High', 0)),
-            'three_month_low': safe_float(row.get('3M Low', 0)),
-            'six_month_high': safe_float(row.get('6M High', 0)),
-            'six_month_low': safe_float(row.get('6M Low', 0)),
-            
-            # Market Capitalization
-            'market_capitalization': safe_float(row.get('Market Capitalization', 0)),
-            'enterprise_value': safe_float(row.get('Enterprise Value', 0)),
-            'shares_outstanding': safe_float(row.get('Shares Outstanding', 0)),
-            'shares_float': safe_float(row.get('Shares Float', 0)),
-            
-            # Valuation Ratios
-            'price_to_earnings_ratio_ttm': safe_float(row.get('Price to Earnings Ratio (TTM)', 0)),
-            'price_to_book_fy': safe_float(row.get('Price to Book (FY)', 0)),
-            'price_to_book_mrq': safe_float(row.get('Price to Book (MRQ)', 0)),
-            'price_to_sales_fy': safe_float(row.get('Price to Sales (FY)', 0)),
-            'price_to_revenue_ratio_ttm': safe_float(row.get('Price to Revenue Ratio (TTM)', 0)),
-            'price_to_free_cash_flow_ttm': safe_float(row.get('Price to Free Cash Flow (TTM)', 0)),
-            'enterprise_value_ebitda_ttm': safe_float(row.get('Enterprise Value EBITDA (TTM)', 0)),
-            
-            # Financial Metrics
-            'basic_eps_fy': safe_float(row.get('Basic EPS (FY)', 0)),
-            'basic_eps_ttm': safe_float(row.get('Basic EPS (TTM)', 0)),
-            'eps_diluted_fy': safe_float(row.get('EPS Diluted (FY)', 0)),
-            'eps_diluted_mrq': safe_float(row.get('EPS Diluted (MRQ)', 0)),
-            'eps_diluted_ttm': safe_float(row.get('EPS Diluted (TTM)', 0)),
-            'eps_forecast_mrq': safe_float(row.get('EPS Forecast (MRQ)', 0)),
-            
-            # Growth Metrics
-            'revenue_annual_yoy_growth': safe_float(row.get('Revenue (Annual YoY Growth)', 0)),
-            'revenue_quarterly_qoq_growth': safe_float(row.get('Revenue (Quarterly QoQ Growth)', 0)),
-            'revenue_quarterly_yoy_growth': safe_float(row.get('Revenue (Quarterly YoY Growth)', 0)),
-            'revenue_ttm_yoy_growth': safe_float(row.get('Revenue (TTM YoY Growth)', 0)),
-            'eps_diluted_annual_yoy_growth': safe_float(row.get('EPS Diluted (Annual YoY Growth)', 0)),
-            'eps_diluted_quarterly_qoq_growth': safe_float(row.get('EPS Diluted (Quarterly QoQ Growth)', 0)),
-            'eps_diluted_quarterly_yoy_growth': safe_float(row.get('EPS Diluted (Quarterly YoY Growth)', 0)),
-            'eps_diluted_ttm_yoy_growth': safe_float(row.get('EPS Diluted (TTM YoY Growth)', 0)),
-            'ebitda_annual_yoy_growth': safe_float(row.get('EBITDA (Annual YoY Growth)', 0)),
-            'ebitda_quarterly_qoq_growth': safe_float(row.get('EBITDA (Quarterly QoQ Growth)', 0)),
-            'ebitda_quarterly_yoy_growth': safe_float(row.get('EBITDA (Quarterly YoY Growth)', 0)),
-            'ebitda_ttm_yoy_growth': safe_float(row.get('EBITDA (TTM YoY Growth)', 0)),
-            
-            # Profitability Metrics
-            'gross_margin_fy': safe_float(row.get('Gross Margin (FY)', 0)),
-            'gross_margin_ttm': safe_float(row.get('Gross Margin (TTM)', 0)),
-            'operating_margin_fy': safe_float(row.get('Operating Margin (FY)', 0)),
-            'operating_margin_ttm': safe_float(row.get('Operating Margin (TTM)', 0)),
-            'net_margin_fy': safe_float(row.get('Net Margin (FY)', 0)),
-            'net_margin_ttm': safe_float(row.get('Net Margin (TTM)', 0)),
-            'pretax_margin_ttm': safe_float(row.get('Pretax Margin (TTM)', 0)),
-            'free_cash_flow_margin_fy': safe_float(row.get('Free Cash Flow Margin (FY)', 0)),
-            'free_cash_flow_margin_ttm': safe_float(row.get('Free Cash Flow Margin (TTM)', 0)),
-            
-            # Return Metrics
-            'return_on_assets_ttm': safe_float(row.get('Return on Assets (TTM)', 0)),
-            'return_on_equity_ttm': safe_float(row.get('Return on Equity (TTM)', 0)),
-            'return_on_invested_capital_ttm': safe_float(row.get('Return on Invested Capital (TTM)', 0)),
-            
-            # Debt Metrics
-            'debt_to_equity_ratio_mrq': safe_float(row.get('Debt to Equity Ratio (MRQ)', 0)),
-            'current_ratio_mrq': safe_float(row.get('Current Ratio (MRQ)', 0)),
-            'quick_ratio_mrq': safe_float(row.get('Quick Ratio (MRQ)', 0)),
-            
-            # Dividend Information
-            'dividend_yield_forward': safe_float(row.get('Dividend Yield Forward', 0)),
-            'dividends_per_share_fy': safe_float(row.get('Dividends per Share (FY)', 0)),
-            'dividends_per_share_mrq': safe_float(row.get('Dividends per Share (MRQ)', 0)),
-            'dividends_per_share_annual_yoy_growth': safe_float(row.get('Dividends per Share (Annual YoY Growth)', 0)),
-            'dividends_paid_fy': safe_float(row.get('Dividends Paid (FY)', 0)),
-            
-            # Technical Indicators
-            'relative_strength_index_14': safe_float(row.get('Relative Strength Index (14)', 0)),
-            'relative_strength_index_7': safe_float(row.get('Relative Strength Index (7)', 0)),
-            'macd_level_12_26': safe_float(row.get('MACD Level (12, 26)', 0)),
-            'macd_signal_12_26': safe_float(row.get('MACD Signal (12, 26)', 0)),
-            'stochastic_k_14_3_3': safe_float(row.get('Stochastic %K (14, 3, 3)', 0)),
-            'stochastic_d_14_3_3': safe_float(row.get('Stochastic %D (14, 3, 3)', 0)),
-            'stochastic_rsi_fast_3_3_14_14': safe_float(row.get('Stochastic RSI Fast (3, 3, 14, 14)', 0)),
-            'stochastic_rsi_slow_3_3_14_14': safe_float(row.get('Stochastic RSI Slow (3, 3, 14, 14)', 0)),
-            'williams_percent_range_14': safe_float(row.get('Williams Percent Range (14)', 0)),
-            'average_directional_index_14': safe_float(row.get('Average Directional Index (14)', 0)),
-            'positive_directional_indicator_14': safe_float(row.get('Positive Directional Indicator (14)', 0)),
-            'negative_directional_indicator_14': safe_float(row.get('Negative Directional Indicator (14)', 0)),
-            'commodity_channel_index_20': safe_float(row.get('Commodity Channel Index (20)', 0)),
-            'ultimate_oscillator_7_14_28': safe_float(row.get('Ultimate Oscillator (7, 14, 28)', 0)),
-            'awesome_oscillator': safe_float(row.get('Awesome Oscillator', 0)),
-            'momentum_10': safe_float(row.get('Momentum (10)', 0)),
-            'rate_of_change_9': safe_float(row.get('Rate of Change (9)', 0)),
-            'bull_bear_power': safe_float(row.get('Bull Bear Power', 0)),
-            
-            # Moving Averages
-            'simple_moving_average_5': safe_float(row.get('Simple Moving Average (5)', 0)),
-            'simple_moving_average_10': safe_float(row.get('Simple Moving Average (10)', 0)),
-            'simple_moving_average_20': safe_float(row.get('Simple Moving Average (20)', 0)),
-            'simple_moving_average_30': safe_float(row.get('Simple Moving Average (30)', 0)),
-            'simple_moving_average_50': safe_float(row.get('Simple Moving Average (50)', 0)),
-            'simple_moving_average_100': safe_float(row.get('Simple Moving Average (100)', 0)),
-            'simple_moving_average_200': safe_float(row.get('Simple Moving Average (200)', 0)),
-            'exponential_moving_average_5': safe_float(row.get('Exponential Moving Average (5)', 0)),
-            'exponential_moving_average_10': safe_float(row.get('Exponential Moving Average (10)', 0)),
-            'exponential_moving_average_20': safe_float(row.get('Exponential Moving Average (20)', 0)),
-            'exponential_moving_average_30': safe_float(row.get('Exponential Moving Average (30)', 0)),
-            'exponential_moving_average_50': safe_float(row.get('Exponential Moving Average (50)', 0)),
-            'exponential_moving_average_100': safe_float(row.get('Exponential Moving Average (100)', 0)),
-            'exponential_moving_average_200': safe_float(row.get('Exponential Moving Average (200)', 0)),
-            'hull_moving_average_9': safe_float(row.get('Hull Moving Average (9)', 0)),
-            'volume_weighted_moving_average_20': safe_float(row.get('Volume Weighted Moving Average (20)', 0)),
-            
-            # Bollinger Bands
-            'bollinger_upper_band_20': safe_float(row.get('Bollinger Upper Band (20)', 0)),
-            'bollinger_lower_band_20': safe_float(row.get('Bollinger Lower Band (20)', 0)),
-            
-            # Ichimoku Cloud
-            'ichimoku_conversion_line_9_26_52_26': safe_float(row.get('Ichimoku Conversion Line (9, 26, 52, 26)', 0)),
-            'ichimoku_base_line_9_26_52_26': safe_float(row.get('Ichimoku Base Line (9, 26, 52, 26)', 0)),
-            'ichimoku_leading_span_a_9_26_52_26': safe_float(row.get('Ichimoku Leading Span A (9, 26, 52, 26)', 0)),
-            'ichimoku_leading_span_b_9_26_52_26': safe_float(row.get('Ichimoku Leading Span B (9, 26, 52, 26)', 0)),
-            
-            # Other Technical Indicators
-            'parabolic_sar': safe_float(row.get('Parabolic SAR', 0)),
-            'average_true_range_14': safe_float(row.get('Average True Range (14)', 0)),
-            'average_day_range_14': safe_float(row.get('Average Day Range (14)', 0)),
-            'volatility': safe_float(row.get('Volatility', 0)),
-            'volatility_week': safe_float(row.get('Volatility Week', 0)),
-            'volatility_month': safe_float(row.get('Volatility Month', 0)),
-            'aroon_up_14': safe_float(row.get('Aroon Up (14)', 0)),
-            'aroon_down_14': safe_float(row.get('Aroon Down (14)', 0)),
-            'money_flow_14': safe_float(row.get('Money Flow (14)', 0)),
-            'chaikin_money_flow_20': safe_float(row.get('Chaikin Money Flow (20)', 0)),
-            
-            # Ratings
-            'technical_rating': safe_float(row.get('Technical Rating', 0)),
-            'oscillators_rating': safe_float(row.get('Oscillators Rating', 0)),
-            'moving_averages_rating': safe_float(row.get('Moving Averages Rating', 0)),
-            
-            # Beta
-            'one_year_beta': safe_float(row.get('1 Year Beta', 0)),
-        }
-        
-        return stock_data
-
-    @staticmethod
-    def _get_bullish_stocks(df, limit=10):
-        """Identify bullish stocks based on technical indicators"""
-        bullish_df = df.copy()
-
-        # Calculate bullish score
-        bullish_score = 0
-        if "Relative Strength Index (14)" in df.columns:
-            bullish_score += (df["Relative Strength Index (14)"] > 50).astype(int)
-        if "MACD Level (12, 26)" in df.columns and "MACD Signal (12, 26)" in df.columns:
-            bullish_score += (
-                df["MACD Level (12, 26)"] > df["MACD Signal (12, 26)"]
-            ).astype(int)
-        if "Change %" in df.columns:
-            bullish_score += (df["Change %"] > 0).astype(int)
-        if "Technical Rating" in df.columns:
-            bullish_score += (df["Technical Rating"] > 0).astype(int)
-
-        bullish_df["bullish_score"] = bullish_score
-        top_bullish = bullish_df.nlargest(limit, "bullish_score")
+# tvscreener reorders every frame by these, so they are always requested
+_REQUIRED_FIELDS = (tvs.StockField.NAME, tvs.StockField.DESCRIPTION)
+_FIELDS_BY_LABEL = {field.label: field for field in tvs.StockField}
 
-        return StockDataFetcher._format_stock_list(
-            top_bullish, ["Symbol", "Name", "Price", "Change %", "Technical Rating"]
-        )
 
-    @staticmethod
-    def _get_bearish_stocks(df, limit=10):
-        """Identify bearish stocks"""
-        bearish_df = df.copy()
+def screener_fields(columns):
+    """
+    StockFields to request for frame ``columns`` (screener labels). Columns
+    this tvscreener version doesn't know are skipped: a full fetch wouldn't
+    return them either.
+    """
+    fields = dict.fromkeys(_REQUIRED_FIELDS)
+    for column in columns:
+        field = _FIELDS_BY_LABEL.get(column)
+        if field is not None:
+            fields[field] = None
+    return list(fields)
 
-        # Calculate bearish score
-        bearish_score = 0
-        if "Relative Strength Index (14)" in df.columns:
-            bearish_score += (df["Relative Strength Index (14)"] < 50).astype(int)
-        if "MACD Level (12, 26)" in df.columns and "MACD Signal (12, 26)" in df.columns:
-            bearish_score += (
-                df["MACD Level (12, 26)"] < df["MACD Signal (12, 26)"]
-            ).astype(int)
-        if "Change %" in df.columns:
-            bearish_score += (df["Change %"] < 0).astype(int)
-        if "Technical Rating" in df.columns:
-            bearish_score += (df["Technical Rating"] < 0).astype(int)
 
-        bearish_df["bearish_score"] = bearish_score
-        top_bearish = bearish_df.nlargest(limit, "bearish_score")
+def screener_market(market):
+    """tvscreener Market for a market name such as ``egypt`` or ``ksa``"""
+    try:
+        return tvs.Market[market.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown screener market '{market}'") from None
 
-        return StockDataFetcher._format_stock_list(
-            top_bearish, ["Symbol", "Name", "Price", "Change %", "Technical Rating"]
-        )
-
-    @staticmethod
-    def _get_short_term_picks(df, limit=10):
-        """Best stocks for short term (1 week)"""
-        if (
-            "Weekly Performance" in df.columns
-            and "Relative Strength Index (7)" in df.columns
-        ):
-            short_term = df.nlargest(limit, "Weekly Performance")
-            return StockDataFetcher._format_stock_list(
-                short_term,
-                [
-                    "Symbol",
-                    "Name",
-                    "Price",
-                    "Weekly Performance",
-                    "Relative Strength Index (7)",
-                ],
-            )
-        return []
 
+class StockDataFetcher:
     @staticmethod
-    def _get_medium_term_picks(df, limit=10):
-        """Best stocks for medium term (1 month)"""
-        if "Monthly Performance" in df.columns:
-            medium_term = df.nlargest(limit, "Monthly Performance")
-            return StockDataFetcher._format_stock_list(
-                medium_term,
-                ["Symbol", "Name", "Price", "Monthly Performance", "Change 1M, %"],
+    def fetch_market_stocks(market, columns=None):
+        """
+        Fetch one market's stock data, coalescing concurrent callers.
+        ``columns`` limits the request to those screener columns; None
+        fetches every column.
+        """
+        if columns is None:
+            return _fetch_flight.do(
+                market,
+                lambda: StockDataFetcher._fetch_market_stocks(market),
+                reuse=lambda: _reuse_fresh_snapshot(market),
             )
-        return []
-
-    @staticmethod
-    def _get_long_term_picks(df, limit=10):
-        """Best stocks for long term (1 year)"""
-        long_term_df = df.copy()
-
-        # Calculate long term score based on fundamentals
-        long_score = 0
-        if "Return on Equity (TTM)" in df.columns:
-            long_score += (df["Return on Equity (TTM)"] > 15).astype(int)
-        if "EPS Diluted (TTM YoY Growth)" in df.columns:
-            long_score += (df["EPS Diluted (TTM YoY Growth)"] > 0).astype(int)
-        if "Revenue (TTM YoY Growth)" in df.columns:
-            long_score += (df["Revenue (TTM YoY Growth)"] > 0).astype(int)
-        if "Yearly Performance" in df.columns:
-            long_score += (df["Yearly Performance"] > 0).astype(int)
-
-        long_term_df["long_score"] = long_score
-        top_long = long_term_df.nlargest(limit, "long_score")
-
-        return StockDataFetcher._format_stock_list(
-            top_long,
-            ["Symbol", "Name", "Price", "Yearly Performance", "Return on Equity (TTM)"],
+        fields = screener_fields(columns)
+        # A fresh snapshot may be full, but never reuse it for a narrower request's key
+        return _fetch_flight.do(
+            f"{market}.projected", lambda: StockDataFetcher._fetch_market_stocks(market, fields)
         )
 
     @staticmethod
-    def _get_overpriced_stocks(df, limit=10):
-        """Identify overpriced stocks based on valuation metrics"""
-        if "Price to Earnings Ratio (TTM)" in df.columns:
-            # Filter out negative and extremely high P/E ratios
-            filtered_df = df[
-                (df["Price to Earnings Ratio (TTM)"] > 0)
-                & (df["Price to Earnings Ratio (TTM)"] < 1000)
-            ]
-            overpriced = filtered_df.nlargest(limit, "Price to Earnings Ratio (TTM)")
-            return StockDataFetcher._format_stock_list(
-                overpriced,
-                [
-                    "Symbol",
-                    "Name",
-                    "Price",
-                    "Price to Earnings Ratio (TTM)",
-                    "Price to Book (MRQ)",
-                ],
-            )
-        return []
-
-    @staticmethod
-    def _get_underpriced_stocks(df, limit=10):
-        """Identify underpriced stocks"""
-        if (
-            "Price to Earnings Ratio (TTM)" in df.columns
-            and "Price to Book (MRQ)" in df.columns
-        ):
-            # Filter for positive P/E and P/B less than 3
-            filtered_df = df[
-                (df["Price to Earnings Ratio (TTM)"] > 0)
-                & (df["Price to Earnings Ratio (TTM)"] < 15)
-                & (df["Price to Book (MRQ)"] > 0)
-                & (df["Price to Book (MRQ)"] < 3)
-            ]
-            underpriced = filtered_df.nsmallest(limit, "Price to Earnings Ratio (TTM)")
-            return StockDataFetcher._format_stock_list(
-                underpriced,
-                [
-                    "Symbol",
-                    "Name",
-                    "Price",
-                    "Price to Earnings Ratio (TTM)",
-                    "Price to Book (MRQ)",
-                ],
-            )
-        return []
-
-    @staticmethod
-    def _get_volume_leaders(df, limit=10):
-        """Get stocks with highest trading volume"""
-        if "Volume" in df.columns:
-            volume_leaders = df.nlargest(limit, "Volume")
-            return StockDataFetcher._format_stock_list(
-                volume_leaders, ["Symbol", "Name", "Price", "Volume", "Relative Volume"]
-            )
-        return []
-
-    @staticmethod
-    def _get_momentum_stocks(df, limit=10):
-        """Get stocks with strong momentum"""
-        if "Momentum (10)" in df.columns:
-            momentum = df.nlargest(limit, "Momentum (10)")
-            return StockDataFetcher._format_stock_list(
-                momentum, ["Symbol", "Name", "Price", "Momentum (10)", "Change %"]
-            )
-        return []
+    def fetch_egypt_stocks():
+        """Fetch Egyptian stock market data, coalescing concurrent callers"""
+        return StockDataFetcher.fetch_market_stocks("egypt")
 
     @staticmethod
-    def _get_dividend_stocks(df, limit=10):
-        """Get stocks with best dividend yields"""
-        if "Dividend Yield Forward" in df.columns:
-            dividend_df = df[df["Dividend Yield Forward"] > 0]
-            dividend_stocks = dividend_df.nlargest(limit, "Dividend Yield Forward")
-            return StockDataFetcher._format_stock_list(
-                dividend_stocks,
-                [
-                    "Symbol",
-                    "Name",
-                    "Price",
-                    "Dividend Yield Forward",
-                    "Dividends per Share (FY)",
-                ],
-            )
-        return []
+    def _fetch_market_stocks(market, fields=None):
+        """
+        Fetch one market's stock data from the screener, in a single request
+        or in parallel range windows when STOCK_FETCH_CHUNK_SIZE is set.
+        ``fields`` are the StockFields to request, or None for all of them.
+        """
+        max_rows = settings.STOCK_FETCH_MAX_ROWS
+        try:
+            if settings.STOCK_FETCH_CHUNK_SIZE:
+                return StockDataFetcher._fetch_market_chunks(market, max_rows, fields)
+
+            stocks_df = StockDataFetcher._fetch_market_range(market, 0, max_rows, fields=fields)
+            if len(stocks_df) >= max_rows:
+                logger.warning(
+                    "%s returned %d rows, the STOCK_FETCH_MAX_ROWS limit; the universe may be truncated",
+                    market, len(stocks_df),
+                )
+            return stocks_df
+        except Exception:
+            logger.exception("Fetching %s stock data failed", market)
+            return pd.DataFrame()
 
     @staticmethod
-    def _get_growth_stocks(df, limit=10):
-        """Get stocks with highest growth potential"""
-        growth_df = df.copy()
-
-        # Calculate growth score
-        growth_score = 0
-        if "Revenue (TTM YoY Growth)" in df.columns:
-            growth_score += (df["Revenue (TTM YoY Growth)"] > 10).astype(int)
-        if "EPS Diluted (TTM YoY Growth)" in df.columns:
-            growth_score += (df["EPS Diluted (TTM YoY Growth)"] > 10).astype(int)
-        if "EBITDA (TTM YoY Growth)" in df.columns:
-            growth_score += (df["EBITDA (TTM YoY Growth)"] > 10).astype(int)
-
-        growth_df["growth_score"] = growth_score
-        top_growth = growth_df.nlargest(limit, "growth_score")
-
-        return StockDataFetcher._format_stock_list(
-            top_growth,
-            [
-                "Symbol",
-                "Name",
-                "Price",
-                "Revenue (TTM YoY Growth)",
-                "EPS Diluted (TTM YoY Growth)",
-            ],
+    def _fetch_market_range(market, start, end, sort_by=None, fields=None):
+        """Rows [start, end) of one market, by market cap unless ``sort_by`` is given"""
+        ss = tvs.StockScreener()
+        ss.set_markets(screener_market(market))
+        if fields is not None:
+            ss.specific_fields = fields
+        if sort_by is not None:
+            ss.sort_by(sort_by, ascending=True)
+        ss.set_range(start, end)
+        return ss.get()
+
+    @staticmethod
+    def _fetch_market_chunks(market, max_rows, fields=None):
+        """
+        Fetch one market in STOCK_FETCH_CHUNK_SIZE windows, several at a time,
+        and keep its ``max_rows`` largest stocks by market cap
+        """
+        stocks_df, report = fetch_ranges(
+            # Windows are cut from a name-sorted universe, which price moves
+            # between requests can't reshuffle the way market cap can
+            lambda start, end: StockDataFetcher._fetch_market_range(
+                market, start, end, sort_by=tvs.StockField.NAME, fields=fields
+            ),
+            chunk_size=settings.STOCK_FETCH_CHUNK_SIZE,
+            # The top max_rows by market cap can sit anywhere in the name order
+            max_rows=max(max_rows, settings.STOCK_FETCH_UNIVERSE_ROWS),
+            max_workers=settings.STOCK_FETCH_CHUNK_WORKERS,
+            retries=settings.STOCK_FETCH_CHUNK_RETRIES,
         )
+        log = logger.warning if report.missing or report.truncated else logger.info
+        log("Fetched %s: %s", market, report.summary())
 
-    @staticmethod
-    def _get_top_positive_movers(df, limit=10):
-        """Get stocks with highest positive change (daily top gainers)"""
-        if "Change %" in df.columns:
-            positive_change = df[df["Change %"] > 0].nlargest(limit, "Change %")
-            return StockDataFetcher._format_stock_list(
-                positive_change, ["Symbol", "Name", "Price", "Change %"]
+        # Restore the single-request order and cut: market cap, largest first
+        if 'Market Capitalization' in stocks_df.columns:
+            stocks_df = stocks_df.sort_values(
+                'Market Capitalization', ascending=False, kind='stable', na_position='last'
             )
-        return []
+        if len(stocks_df) > max_rows:
+            logger.info("Keeping the top %d of %d %s stocks by market cap", max_rows, len(stocks_df), market)
+        return stocks_df.iloc[:max_rows].reset_index(drop=True)
 
     @staticmethod
-    def _get_top_negative_movers(df, limit=10):
-        """Get stocks with highest negative change (daily top losers)"""
-        if "Change %" in df.columns:
-            negative_change = df[df["Change %"] < 0].nsmallest(limit, "Change %")  # most negative = largest fall
-            return StockDataFetcher._format_stock_list(
-                negative_change, ["Symbol", "Name", "Price", "Change %"]
-            )
-        return []
+    def process_stock_insights(stocks_df):
+        """Process stock data to generate insights"""
+        return InsightsEngine(stocks_df).run()
 
     @staticmethod
-    def _get_top_sectors_change(df, limit=10):
-        """Get top sectors by average change percentage"""
-        if "Sector" not in df.columns or "Change %" not in df.columns:
-            return []
-
-        # Group by sector and calculate average change
-        sector_performance = df.groupby('Sector')['Change %'].mean().reset_index()
-        sector_performance = sector_performance.sort_values('Change %', ascending=False).head(limit)
-
-        sectors = []
-        for _, row in sector_performance.iterrows():
-            sectors.append({
-                'sector': str(row['Sector']),
-                'change': float(row['Change %']) if not pd.isna(row['Change %']) else 0.0
-            })
-
-        return sectors
+    def _prepare_stocks_data(df):
+        """Prepare all stocks data for frontend with proper field mapping"""
+        return STOCK_LIST_CONVERTER.records(df)
 
     @staticmethod
-    def _format_stock_list(df, columns):
-        """Format stock data for API response"""
-        stocks = []
-        available_cols = [col for col in columns if col in df.columns]
-
-        for _, row in df.iterrows():
-            stock_data = {}
-            for col in available_cols:
-                val = row[col]
-                if pd.isna(val):
-                    stock_data[col] = None
-                elif isinstance(val, (np.integer, np.floating)):
-                    stock_data[col] = float(val) if not np.isnan(val) else None
-                else:
-                    stock_data[col] = str(val)
-            stocks.append(stock_data)
+    def _prepare_comprehensive_stock_data(df, symbol):
+        """Prepare comprehensive stock data for a specific symbol with all available attributes"""
+        # Find the specific stock by symbol
+        stock_row = df[df['Symbol'] == symbol]
+        if stock_row.empty:
+            return None
+        
+        return STOCK_DETAIL_CONVERTER.records(stock_row.iloc[:1])[0]
 
-        return stocks
+    @staticmethod
+    def _prepare_all_comprehensive_stock_data(df):
+        """Comprehensive stock data for every symbol, keyed by symbol (first row wins)"""
+        if 'Symbol' not in df.columns:
+            return {}
+        df = df[df['Symbol'].notna() & ~df['Symbol'].duplicated()]
+        records = STOCK_DETAIL_CONVERTER.records(df)
+        return dict(zip(df['Symbol'].tolist(), records))
+
+    @staticmethod
+    def _refresh_comprehensive_stock_data(details, df):
+        """
+        Detail payloads from a previous full fetch, with every field whose
+        column is in ``df`` replaced by the fresh value. Symbols no longer
+        in ``df`` are dropped; new ones get the fields ``df`` has.
+        """
+        if 'Symbol' not in df.columns:
+            return {}
+        df = df[df['Symbol'].notna() & ~df['Symbol'].duplicated()]
+        fields = [field for field in STOCK_FIELDS if field.column in df.columns]
+        fresh = FieldConverter(fields).records(df)
+        defaults = {field.name: field.default for field in STOCK_FIELDS}
+
+        refreshed = {}
+        for symbol, values in zip(df['Symbol'].tolist(), fresh):
+            # Copy: the previous snapshot still serves its own payloads
+            refreshed[symbol] = {**details.get(symbol, defaults), **values}
+        return refreshed
@@ -0,0 +1,155 @@
+"""
+In-memory screener filter engine
+
+Built once per snapshot over the precomputed stock list. Text filters run
+against lowercase columns and sector/industry inverted indexes, market-cap
+ranges are answered from a sorted array, orderings come from argsort
+indexes built on first use, and results are cached per normalized query.
+"""
+
+import numpy as np
+
+from .fields import STOCK_LIST_FIELDS
+from .lru import LRUCache
+
+DEFAULT_ORDERING = '-market_capitalization'
+ORDERING_FIELDS = frozenset(field.name for field in STOCK_LIST_FIELDS if field.kind in (int, float))
+LIST_FIELDS = [field.name for field in STOCK_LIST_FIELDS]
+
+
+class InvalidQuery(ValueError):
+    """A list query parameter that cannot be applied"""
+
+
+class InvertedIndex:
+    """Positions of the rows holding each distinct lowercase value"""
+
+    def __init__(self, values):
+        keys, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        self.size = len(values)
+        self.postings = {
+            key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(keys.tolist())
+        }
+
+    def containing(self, term):
+        """Mask of the rows whose value contains ``term``"""
+        mask = np.zeros(self.size, dtype=bool)
+        for key, positions in self.postings.items():
+            if term in key:
+                mask[positions] = True
+        return mask
+
+
+class StockListFilter:
+    """Filter and order one snapshot's stock list"""
+
+    CACHE_SIZE = 256
+
+    def __init__(self, stocks_data):
+        self.stocks = stocks_data
+        self.size = len(stocks_data)
+
+        self.symbols = np.array([stock['symbol'].lower() for stock in stocks_data], dtype=str)
+        self.names = np.array([stock['name'].lower() for stock in stocks_data], dtype=str)
+        self.sectors = InvertedIndex([stock['sector'].lower() for stock in stocks_data])
+        self.industries = InvertedIndex([stock['industry'].lower() for stock in stocks_data])
+
+        market_caps = self._numeric('market_capitalization')
+        self.market_cap_order = np.argsort(market_caps, kind="stable")
+        self.sorted_market_caps = market_caps[self.market_cap_order]
+        self.has_market_cap = market_caps != 0
+
+        self._orderings = {}
+        self._cache = LRUCache(self.CACHE_SIZE)
+
+    def _numeric(self, name):
+        return np.array([stock[name] for stock in self.stocks], dtype=np.float64)
+
+    def ordering(self, ordering):
+        """
+        Row positions sorted by a numeric field, ``-field`` for descending.
+        Ties keep screener order, as a stable list.sort would.
+        """
+        order = self._orderings.get(ordering)
+        if order is None:
+            descending = ordering.startswith('-')
+            name = ordering[1:] if descending else ordering
+            if name not in ORDERING_FIELDS:
+                raise InvalidQuery(f"Cannot order by '{name}'")
+            values = self._numeric(name)
+            order = np.argsort(-values if descending else values, kind="stable")
+            self._orderings[ordering] = order
+        return order
+
+    @staticmethod
+    def normalize(query_params):
+        """
+        Cache key for the filters and ordering in ``query_params``. Empty
+        values mean no filter; text filters are case-insensitive.
+        """
+        def text(name):
+            value = query_params.get(name)
+            return value.lower() if value else None
+
+        def number(name):
+            value = query_params.get(name)
+            if not value:
+                return None
+            try:
+                return float(value)
+            except ValueError:
+                raise InvalidQuery(f"'{name}' must be a number")
+
+        return (
+            text('sector'),
+            text('industry'),
+            number('min_market_cap'),
+            number('max_market_cap'),
+            text('search'),
+            query_params.get('ordering') or DEFAULT_ORDERING,
+        )
+
+    @staticmethod
+    def projection(query_params):
+        """Fields requested with ``fields=a,b``, or None for all of them"""
+        value = query_params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in LIST_FIELDS]
+        if unknown:
+            raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def apply(self, query_params):
+        """Stocks matching the filters, ordered by ``ordering`` (market cap, descending, by default)"""
+        key = self.normalize(query_params)
+        positions = self._cache.get_or_set(key, lambda: self._evaluate(*key))
+        return [self.stocks[i] for i in positions]
+
+    def _evaluate(self, sector, industry, min_cap, max_cap, search, ordering):
+        order = self.ordering(ordering)
+        if not any(value is not None for value in (sector, industry, min_cap, max_cap, search)):
+            return order.tolist()
+
+        mask = np.ones(self.size, dtype=bool)
+        if sector is not None:
+            mask &= self.sectors.containing(sector)
+        if industry is not None:
+            mask &= self.industries.containing(industry)
+        if min_cap is not None or max_cap is not None:
+            mask &= self._market_cap_range(min_cap, max_cap)
+        if search is not None:
+            mask &= (np.char.find(self.symbols, search) != -1) | (np.char.find(self.names, search) != -1)
+
+        return order[mask[order]].tolist()
+
+    def _market_cap_range(self, min_cap, max_cap):
+        """Mask of stocks with a non-zero market cap inside [min_cap, max_cap]"""
+        lo = 0 if min_cap is None else np.searchsorted(self.sorted_market_caps, min_cap, side="left")
+        hi = self.size if max_cap is None else np.searchsorted(self.sorted_market_caps, max_cap, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.market_cap_order[lo:hi]] = True
+        return mask & self.has_market_cap
@@ -0,0 +1,201 @@
+"""
+Server-Sent Events stream of quote deltas
+
+One producer per process watches the shared snapshot store and, whenever a
+new snapshot is published, diffs its quotes (price, change %, volume)
+against the previous one. The delta is rendered once and fanned out to
+every connected client, so subscribers never trigger fetches or diffs
+themselves. Each event carries a sequence number; new clients, clients
+that fall behind, snapshots that don't directly follow the last one sent
+and every ``resync_every``-th event get a full snapshot instead of a delta.
+"""
+
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+
+from .deltas import diff, keyed_frame
+from .executor import ExecutorSaturated, get_blocking_executor
+from .fields import STOCK_FIELDS_BY_NAME, FieldConverter
+from .refresher import get_latest_snapshot
+from .renderers import render_json
+
+logger = logging.getLogger(__name__)
+
+# Values sent per symbol, in order
+QUOTE_FIELDS = ('price', 'change_percent', 'volume')
+QUOTE_CONVERTER = FieldConverter(
+    [STOCK_FIELDS_BY_NAME[name] for name in ('symbol',) + QUOTE_FIELDS]
+)
+
+# Comment line sent when nothing else was, so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15
+KEEPALIVE = b": keepalive\n\n"
+# Client reconnect delay (milliseconds)
+RETRY = b"retry: 5000\n\n"
+
+
+def quote_frame(snapshot):
+    """Quote fields of a snapshot indexed by symbol"""
+    return snapshot.derive("quotes", lambda snap: keyed_frame(QUOTE_CONVERTER.columns(snap.frame)))
+
+
+def quote_delta(previous, current):
+    """Rows of ``current`` that are new or whose quote changed, and the symbols that disappeared"""
+    added, changed, removed = diff(previous, current, QUOTE_FIELDS)
+    return current[added | changed], removed
+
+
+def _rows(frame):
+    """{symbol: [price, change_percent, volume]}"""
+    columns = [frame[name].tolist() for name in QUOTE_FIELDS]
+    return dict(zip(frame.index.tolist(), map(list, zip(*columns))))
+
+
+def sse_event(event, seq, data):
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, event.encode(), render_json(data))
+
+
+def render_events(previous, snapshot, seq, full):
+    """
+    SSE frames for ``snapshot`` as event ``seq``: the event to broadcast
+    (a delta, or a full snapshot when ``full``) and the full snapshot
+    served to clients that need to resync at this point
+    """
+    current = quote_frame(snapshot)
+    header = {
+        "seq": seq,
+        "version": snapshot.tag,
+        "fetched_at": snapshot.fetched_at,
+        "fields": QUOTE_FIELDS,
+    }
+    resync = sse_event("snapshot", seq, {**header, "rows": _rows(current)})
+    if full or previous is None:
+        return resync, resync
+
+    changed, removed = quote_delta(quote_frame(previous), current)
+    delta = sse_event("delta", seq, {**header, "changed": _rows(changed), "removed": removed})
+    return delta, resync
+
+
+class _Subscriber:
+    """One connected client; a ``None`` in its queue asks for a resync"""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.queue.put_nowait(None)
+
+    def send(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind for deltas to be useful; skip straight to a resync
+            self.drain()
+            self.queue.put_nowait(None)
+
+    def drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class SnapshotBroadcaster:
+    """Single producer fanning snapshot deltas out to every subscriber"""
+
+    def __init__(self, name, poll_interval=1.0, resync_every=60, queue_size=16):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.resync_every = resync_every
+        self.queue_size = queue_size
+        self.seq = 0
+        self._snapshot = None
+        self._resync = None
+        self._subscribers = set()
+        self._task = None
+
+    async def events(self):
+        """SSE frames for one client: a full snapshot, then deltas as they are published"""
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        self._ensure_running()
+        try:
+            yield RETRY
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if frame is None:
+                    # Anything still queued is already covered by the resync
+                    subscriber.drain()
+                    frame = self._resync
+                    if frame is None:
+                        continue  # No snapshot yet; the first one is sent in full
+                yield frame
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """Poll the snapshot store while anyone is subscribed"""
+        executor = get_blocking_executor()
+        while self._subscribers:
+            try:
+                # A stat, possibly a re-map: looked up on the executor like the async views do
+                snapshot = await executor.run(get_latest_snapshot, self.name)
+            except ExecutorSaturated:
+                snapshot = None  # Looked up again on the next poll
+            if snapshot is not None and (self._snapshot is None or snapshot.tag != self._snapshot.tag):
+                try:
+                    await self._advance(snapshot)
+                except Exception:
+                    # Retried on the next poll since the snapshot was not consumed
+                    logger.exception("Streaming %s snapshot v%s failed", self.name, snapshot.version)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _advance(self, snapshot):
+        previous = self._snapshot
+        seq = self.seq + 1
+        # A delta only bridges consecutive versions of one store; after a gap everyone resyncs
+        full = (
+            (self.resync_every and seq % self.resync_every == 0)
+            or previous is None
+            or snapshot.epoch != previous.epoch
+            or snapshot.version != previous.version + 1
+        )
+        event, resync = await get_blocking_executor().run(
+            render_events, previous, snapshot, seq, full
+        )
+        # No awaits from here on: subscribers see the state and event together
+        self.seq = seq
+        self._snapshot = snapshot
+        self._resync = resync
+        for subscriber in list(self._subscribers):
+            subscriber.send(event)
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(name=None):
+    """Process-wide broadcaster for the given market (default market if None)"""
+    name = name or settings.STOCK_DEFAULT_MARKET
+    broadcaster = _broadcasters.get(name)
+    if broadcaster is None:
+        with _broadcasters_lock:
+            broadcaster = _broadcasters.get(name)
+            if broadcaster is None:
+                broadcaster = SnapshotBroadcaster(
+                    name,
+                    poll_interval=settings.STOCK_STREAM_POLL_INTERVAL,
+                    resync_every=settings.STOCK_STREAM_RESYNC_EVERY,
+                    queue_size=settings.STOCK_STREAM_QUEUE_SIZE,
+                )
+                _broadcasters[name] = broadcaster
+    return broadcaster
@@ -1,3 +1,969 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import duckdb
+import numpy as np
+import orjson
+import pandas as pd
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+from rest_framework.permissions import IsAuthenticated
+
+from stock_api.settings import _parse_market_ttls
+
+from . import async_views, history as history_module, snapshot as snapshot_module, stream
+from .benchmarks import make_screener_frame
+from .benchmarks.legacy import LegacyInsights
+from .dtypes import CATEGORY_COLUMNS, normalize_frame
+from .fields import STOCK_FIELDS
+from .insights import SCREENER_COLUMNS, InsightsEngine, top_k
+from .lru import LRUCache
+from .models import Stock
+from .range_fetch import RangeFetchError, fetch_ranges
+from .renderers import NumpyJSONRenderer, render_json
+from .refresher import (
+    MIN_REFRESH_INTERVAL, PROJECTED_COLUMNS, SnapshotRefresher, next_delay, refresh_snapshot, refresh_snapshots,
+)
+from .singleflight import SingleFlight
+from .snapshot import get_snapshot_store
+from .stock_fetcher import StockDataFetcher
+from .stock_filter import InvalidQuery, StockListFilter
+
+
+class StubScreener:
+    """Stand-in for tvs.StockScreener counting upstream calls"""
+
+    calls = 0
+    latency = 0.2
+    lock = threading.Lock()
+
+    def set_markets(self, *markets):
+        pass
+
+    def set_range(self, start, end):
+        pass
+
+    def get(self):
+        with StubScreener.lock:
+            StubScreener.calls += 1
+        time.sleep(StubScreener.latency)
+        return make_screener_frame(50)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        StubScreener.calls = 0
+
+    @mock.patch("stocks.stock_fetcher.tvs.StockScreener", StubScreener)
+    def test_concurrent_fetches_share_one_upstream_call(self):
+        start = threading.Barrier(100)
+
+        def request():
+            start.wait()
+            return StockDataFetcher.fetch_egypt_stocks()
+
+        with ThreadPoolExecutor(max_workers=100) as pool:
+            frames = list(pool.map(lambda _: request(), range(100)))
+
+        self.assertEqual(StubScreener.calls, 1)
+        self.assertTrue(all(frame is frames[0] for frame in frames))
+
+    @mock.patch("stocks.stock_fetcher.tvs.StockScreener", StubScreener)
+    def test_sequential_fetches_are_not_coalesced(self):
+        StockDataFetcher.fetch_egypt_stocks()
+        StockDataFetcher.fetch_egypt_stocks()
+        self.assertEqual(StubScreener.calls, 2)
+
+    def test_errors_are_shared_with_waiting_callers(self):
+        flight = SingleFlight()
+        entered = threading.Event()
+
+        def failing():
+            entered.set()
+            time.sleep(0.1)
+            raise RuntimeError("upstream down")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "key", failing)
+            entered.wait()
+            follower = pool.submit(flight.do, "key", failing)
+            for future in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+    def test_lock_file_coalesces_across_processes(self):
+        # Two SingleFlight instances stand in for two worker processes
+        calls = []
+        published = []
+        entered = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            entered.set()
+            time.sleep(0.2)
+            published.append("frame")
+            return "frame"
+
+        def reuse():
+            return published[-1] if published else None
+
+        with tempfile.TemporaryDirectory() as lock_dir:
+            first, second = SingleFlight(lock_dir), SingleFlight(lock_dir)
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                leader = pool.submit(first.do, "egypt", fetch, reuse)
+                entered.wait()
+                follower = pool.submit(second.do, "egypt", fetch, reuse)
+                results = [leader.result(), follower.result()]
+
+        self.assertEqual(results, ["frame", "frame"])
+        self.assertEqual(len(calls), 1)
+
+
+class MarketStubScreener:
+    """Stand-in for tvs.StockScreener with a latency per market"""
+
+    latency = {}
+    calls = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def set_markets(self, *markets):
+        self.market = markets[0].name
+
+    def set_range(self, start, end):
+        pass
+
+    def get(self):
+        cls = MarketStubScreener
+        with cls.lock:
+            cls.calls.append(self.market)
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(cls.latency.get(self.market, 0.2))
+            frame = make_screener_frame(20)
+            frame["Exchange"] = self.market
+            return frame
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+MARKETS = ["egypt", "ksa", "uae", "qatar"]
+
+
+@mock.patch("stocks.stock_fetcher.tvs.StockScreener", MarketStubScreener)
+class MultiMarketTests(SimpleTestCase):
+    def setUp(self):
+        MarketStubScreener.latency = {}
+        MarketStubScreener.calls = []
+        MarketStubScreener.active = MarketStubScreener.peak = 0
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            STOCK_SNAPSHOT_DIR=directory.name,
+            STOCK_SNAPSHOT_REFRESHER="command",
+            STOCK_MARKETS=MARKETS,
+            STOCK_DEFAULT_MARKET="egypt",
+            STOCK_SNAPSHOT_TTL=300,
+            STOCK_MARKET_TTLS={"ksa": 0},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        logging.disable(logging.INFO)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        # Stores are process-wide; give each test its own
+        stores = mock.patch.dict(snapshot_module._stores, clear=True)
+        stores.start()
+        self.addCleanup(stores.stop)
+
+    def stores(self):
+        return [get_snapshot_store(market) for market in MARKETS]
+
+    def test_markets_refresh_concurrently(self):
+        MarketStubScreener.latency = {market.upper(): 0.3 for market in MARKETS}
+
+        snapshots = refresh_snapshots(self.stores(), force=True, max_workers=4)
+
+        # Every market's upstream call was in flight at once
+        self.assertEqual(MarketStubScreener.peak, 4)
+        for market in MARKETS:
+            snapshot = snapshots[market]
+            self.assertEqual(snapshot.market, market)
+            self.assertEqual(set(snapshot.frame["Exchange"]), {market.upper()})
+
+    def test_refresh_pool_is_bounded(self):
+        refresh_snapshots(self.stores(), force=True, max_workers=2)
+
+        self.assertEqual(sorted(MarketStubScreener.calls), sorted(m.upper() for m in MARKETS))
+        self.assertEqual(MarketStubScreener.peak, 2)
+
+    def test_slow_market_does_not_delay_the_others(self):
+        MarketStubScreener.latency = {"EGYPT": 0.05, "UAE": 0.05, "QATAR": 0.05, "KSA": 2.0}
+        refresher = SnapshotRefresher(self.stores(), max_workers=4)
+        refresher.start()
+        self.addCleanup(refresher.join)
+        self.addCleanup(refresher.stop)
+
+        deadline = time.monotonic() + 1.5
+        fast = [get_snapshot_store(market) for market in ("egypt", "uae", "qatar")]
+        while time.monotonic() < deadline and any(store.current() is None for store in fast):
+            time.sleep(0.02)
+
+        self.assertTrue(all(store.current() is not None for store in fast))
+        self.assertIsNone(get_snapshot_store("ksa").current())
+
+    def test_markets_have_independent_ttls(self):
+        self.assertEqual(get_snapshot_store("egypt").ttl, 300)
+        self.assertEqual(get_snapshot_store("ksa").ttl, 0)
+
+        refresh_snapshots(self.stores())
+        MarketStubScreener.calls = []
+        refresh_snapshots(self.stores())
+
+        # Only the market whose snapshot already expired is fetched again
+        self.assertEqual(MarketStubScreener.calls, ["KSA"])
+
+    def test_zero_ttl_does_not_spin_the_refresher(self):
+        store = get_snapshot_store("ksa")
+        self.assertEqual(next_delay(store), MIN_REFRESH_INTERVAL)
+        refresh_snapshots([store], force=True)
+        self.assertEqual(next_delay(store), MIN_REFRESH_INTERVAL)
+
+        for value in ("ksa=0", "ksa=-5"):
+            with self.assertRaises(ImproperlyConfigured):
+                _parse_market_ttls(value)
+        self.assertEqual(_parse_market_ttls("KSA=120, uae=600"), {"ksa": 120, "uae": 600})
+
+    def test_market_query_parameter(self):
+        refresh_snapshots(self.stores(), force=True)
+
+        response = self.client.get("/api/stocks/", {"market": "uae", "fields": "symbol"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["market"], "uae")
+
+        response = self.client.get("/api/stocks/SYM00001/", {"market": "QATAR"})
+        self.assertEqual(response.json()["data"]["exchange"], "QATAR")
+
+        response = self.client.get("/api/insights/")
+        self.assertEqual(response.json()["market"], "egypt")
+
+        response = self.client.get("/api/insights/", {"market": "atlantis"})
+        self.assertEqual(response.status_code, 400)
+
+
+class RangeFetchTests(SimpleTestCase):
+    def setUp(self):
+        self.universe = make_screener_frame(95)
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def fetch_range(self, start, end):
+        with self.lock:
+            self.requested.append((start, end))
+        return self.universe.iloc[start:end]
+
+    def test_windows_are_concatenated_in_order(self):
+        frame, report = fetch_ranges(self.fetch_range, chunk_size=20, max_rows=1000, max_workers=3)
+
+        self.assertEqual(frame["Symbol"].tolist(), self.universe["Symbol"].tolist())
+        self.assertEqual(report.rows, 95)
+        self.assertEqual((report.duplicates, report.missing, report.truncated), (0, 0, False))
+        # Nothing is requested past the in-flight windows once a short one returns
+        self.assertLessEqual(max(start for start, _ in self.requested), 140)
+
+    def test_failed_windows_are_retried(self):
+        failures = {40: 2}
+
+        def flaky(start, end):
+            with self.lock:
+                if failures.get(start):
+                    failures[start] -= 1
+                    raise ConnectionError("reset by peer")
+            return self.fetch_range(start, end)
+
+        frame, report = fetch_ranges(flaky, chunk_size=20, max_rows=1000, retries=2, backoff=0)
+
+        self.assertEqual(len(frame), 95)
+        self.assertEqual(report.retries, 2)
+        with self.assertRaises(RangeFetchError):
+            failures[40] = 3
+            fetch_ranges(flaky, chunk_size=20, max_rows=1000, retries=2, backoff=0)
+
+    def test_rows_shifted_across_windows_are_reported(self):
+        def shifting(start, end):
+            # Windows after the first see the universe moved down by one row
+            rows = self.fetch_range(start, end)
+            return rows if start == 0 else self.universe.iloc[start - 1:end - 1]
+
+        frame, report = fetch_ranges(shifting, chunk_size=20, max_rows=1000, max_workers=1)
+
+        self.assertFalse(frame["Symbol"].duplicated().any())
+        self.assertEqual(report.duplicates, 1)
+        self.assertGreaterEqual(report.missing, 1)
+        self.assertTrue(all(chunk.seconds >= 0 for chunk in report.chunks))
+
+    @override_settings(STOCK_FETCH_CHUNK_SIZE=10, STOCK_FETCH_MAX_ROWS=15, STOCK_FETCH_UNIVERSE_ROWS=1000)
+    def test_truncated_chunked_fetch_keeps_the_largest_stocks(self):
+        by_name = self.universe.sort_values("Symbol", ascending=False).reset_index(drop=True)
+
+        def fetch_range(market, start, end, sort_by=None, fields=None):
+            return by_name.iloc[start:end].reset_index(drop=True)
+
+        with mock.patch.object(StockDataFetcher, "_fetch_market_range", staticmethod(fetch_range)):
+            frame = StockDataFetcher._fetch_market_stocks("egypt")
+
+        largest = self.universe.nlargest(15, "Market Capitalization")
+        self.assertEqual(frame["Symbol"].tolist(), largest["Symbol"].tolist())
+
+
+class ProjectedFetchTests(SimpleTestCase):
+    def setUp(self):
+        self.universe = make_screener_frame(60)
+        self.requested = []
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            STOCK_SNAPSHOT_DIR=directory.name,
+            STOCK_SNAPSHOT_REFRESHER="command",
+            STOCK_FETCH_PROJECTED=True,
+            STOCK_DETAIL_TTL=3600,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        logging.disable(logging.INFO)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        stores = mock.patch.dict(snapshot_module._stores, clear=True)
+        stores.start()
+        self.addCleanup(stores.stop)
+
+    def fetch(self, columns):
+        self.requested.append(columns)
+        if columns is None:
+            return self.universe
+        return self.universe[[c for c in self.universe.columns if c in columns]]
+
+    def test_insights_only_read_their_columns(self):
+        projected = self.universe[[c for c in self.universe.columns if c in SCREENER_COLUMNS]]
+        full = StockDataFetcher.process_stock_insights(self.universe)
+        narrow = StockDataFetcher.process_stock_insights(projected)
+        full.pop("timestamp")
+        narrow.pop("timestamp")
+        self.assertEqual(narrow, full)
+
+    def test_details_are_overlaid_between_full_fetches(self):
+        store = get_snapshot_store("egypt")
+        first = refresh_snapshot(store, fetch=self.fetch, force=True)
+        self.universe.loc[0, "Price"] = 123.0
+        self.universe.loc[0, "Open"] = 99.0
+        second = refresh_snapshot(store, fetch=self.fetch, force=True)
+
+        self.assertEqual(self.requested, [None, PROJECTED_COLUMNS])
+        self.assertLess(len(second.frame.columns), len(first.frame.columns))
+        details = second.derive("stock_details", None)["SYM00000"]
+        # Fetched fields are fresh; the rest wait for the next full fetch
+        self.assertEqual(details["price"], 123.0)
+        self.assertNotEqual(details["open_price"], 99.0)
+        self.assertEqual(second.derive("details_fetched_at", None), first.fetched_at)
+
+        with override_settings(STOCK_DETAIL_TTL=0):
+            third = refresh_snapshot(store, fetch=self.fetch, force=True)
+        self.assertIsNone(self.requested[-1])
+        self.assertEqual(third.derive("stock_details", None)["SYM00000"]["open_price"], 99.0)
+
+
+class NormalizeFrameTests(SimpleTestCase):
+    def setUp(self):
+        self.raw = make_screener_frame(80)
+        self.raw["Technical Rating"] = np.round(self.raw["Technical Rating"] * 2) / 2
+        self.raw.loc[3, "Price"] = np.inf
+        self.raw.loc[4, "Technical Rating"] = -np.inf
+
+    def test_compact_dtypes_are_lossless(self):
+        frame = normalize_frame(self.raw)
+
+        self.assertEqual(frame["Technical Rating"].dtype, np.float32)
+        self.assertEqual(frame["Price"].dtype, np.float64)
+        for column in CATEGORY_COLUMNS:
+            self.assertIsInstance(frame[column].dtype, pd.CategoricalDtype)
+        self.assertTrue(np.isnan(frame.loc[3, "Price"]) and np.isnan(frame.loc[4, "Technical Rating"]))
+        self.assertEqual(np.isinf(self.raw["Price"]).sum(), 1)  # The fetched frame is untouched
+        self.assertTrue(np.array_equal(
+            frame["Technical Rating"].to_numpy(np.float64),
+            self.raw["Technical Rating"].replace(-np.inf, np.nan).to_numpy(),
+            equal_nan=True,
+        ))
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = snapshot_module.SnapshotStore(directory).publish(frame)
+        self.assertEqual(snapshot.frame["Technical Rating"].dtype, np.float32)
+        self.assertIsInstance(snapshot.frame["Sector"].dtype, pd.CategoricalDtype)
+
+    def test_payloads_match_the_raw_frame(self):
+        frame = normalize_frame(self.raw)
+
+        for build in (StockDataFetcher._prepare_stocks_data, StockDataFetcher._prepare_all_comprehensive_stock_data):
+            self.assertEqual(build(frame), build(self.raw))
+        raw_insights = StockDataFetcher.process_stock_insights(self.raw)
+        insights = StockDataFetcher.process_stock_insights(frame)
+        raw_insights.pop("timestamp")
+        insights.pop("timestamp")
+        self.assertEqual(insights, raw_insights)
+
+
+class SnapshotAPITestCase(SimpleTestCase):
+    """API tests over snapshots published to a private store directory"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(STOCK_SNAPSHOT_DIR=self.directory, STOCK_SNAPSHOT_REFRESHER="command")
+        settings.enable()
+        self.addCleanup(settings.disable)
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        stores = mock.patch.dict(snapshot_module._stores, clear=True)
+        stores.start()
+        self.addCleanup(stores.stop)
+
+    def publish(self, universe):
+        return refresh_snapshot(get_snapshot_store(), fetch=lambda columns: universe, force=True)
+
+
+class SnapshotEpochTests(SnapshotAPITestCase):
+    def test_delta_count_matches_the_full_list(self):
+        universe = make_screener_frame(30)
+        first = self.publish(universe)
+        self.publish(universe.iloc[:25])
+
+        delta = self.client.get("/api/stocks/", {"since": first.tag}).json()
+        full = self.client.get("/api/stocks/").json()
+
+        self.assertTrue(delta["delta"])
+        self.assertEqual(delta["since"], first.tag)
+        self.assertEqual(len(delta["removed"]), 5)
+        self.assertEqual(delta["count"], full["count"])
+        self.assertEqual(delta["snapshot_version"], full["snapshot_version"])
+
+    def test_versions_from_before_a_reset_get_the_full_list(self):
+        old = self.publish(make_screener_frame(30))
+        # A wiped snapshot directory restarts numbering at 1
+        shutil.rmtree(self.directory)
+        snapshot_module._stores.clear()
+        self.publish(make_screener_frame(20))
+        new = self.publish(make_screener_frame(20))
+
+        self.assertEqual(new.version, 2)
+        self.assertNotEqual(new.tag, old.tag)
+        self.assertIsNone(get_snapshot_store().at(old.version, old.epoch))
+        body = self.client.get("/api/stocks/", {"since": old.tag}).json()
+        self.assertFalse(body["delta"])
+        self.assertEqual(body["count"], 20)
+        # Bare numbers carry no epoch and always get the full list
+        self.assertFalse(self.client.get("/api/stocks/", {"since": "1"}).json()["delta"])
+
+
+class AsyncViewPolicyTests(SimpleTestCase):
+    def test_unsafe_methods_and_drf_policies_are_enforced(self):
+        factory = AsyncRequestFactory()
+
+        response = async_to_sync(async_views.stock_list)(factory.post("/api/stocks/"))
+        self.assertEqual(response.status_code, 405)
+
+        # APIView classes read their policies from the DRF settings when defined
+        with mock.patch.object(async_views._APIPolicy, "permission_classes", [IsAuthenticated]):
+            response = async_to_sync(async_views.stock_list)(factory.get("/api/stocks/"))
+        self.assertIn(response.status_code, (401, 403))
+        self.assertIn("detail", orjson.loads(response.content))
+
+
+def parse_event(frame):
+    """(event, payload) of one SSE frame"""
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return fields["event"], orjson.loads(fields["data"])
+
+
+class SnapshotBroadcasterTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = snapshot_module.SnapshotStore(directory.name)
+        self.universe = make_screener_frame(10)
+        self.latest = None
+        self.lookups = []
+        self.broadcaster = stream.SnapshotBroadcaster("egypt", poll_interval=0.01, resync_every=0, queue_size=2)
+        lookup = mock.patch.object(stream, "get_latest_snapshot", self.get_latest_snapshot)
+        lookup.start()
+        self.addCleanup(lookup.stop)
+
+    def get_latest_snapshot(self, name):
+        self.lookups.append(threading.current_thread().name)
+        return self.latest
+
+    def publish(self, price=None):
+        if price is not None:
+            self.universe.loc[0, "Price"] = price
+        return self.store.publish(self.universe.copy())
+
+    async def advance(self, snapshot):
+        """Expose ``snapshot`` and wait for the broadcaster to send it"""
+        seq = self.broadcaster.seq
+        self.latest = snapshot
+        while self.broadcaster.seq == seq:
+            await asyncio.sleep(0.005)
+
+    async def subscribe(self):
+        client = self.broadcaster.events()
+        self.assertEqual(await anext(client), stream.RETRY)
+        return client
+
+    async def receive(self, client):
+        return parse_event(await asyncio.wait_for(anext(client), 2))
+
+    async def close(self, *clients):
+        for client in clients:
+            await client.aclose()
+        await asyncio.wait_for(self.broadcaster._task, 2)
+
+    async def test_deltas_are_rendered_once_for_every_subscriber(self):
+        first, second = await self.subscribe(), await self.subscribe()
+        await self.advance(self.publish())
+        for client in (first, second):
+            event, body = await self.receive(client)
+            self.assertEqual((event, body["seq"]), ("snapshot", 1))
+            self.assertEqual(len(body["rows"]), 10)
+
+        await self.advance(self.publish(price=1234.5))
+        frames = [await asyncio.wait_for(anext(client), 2) for client in (first, second)]
+        self.assertIs(frames[0], frames[1])
+        event, body = parse_event(frames[0])
+        self.assertEqual((event, body["seq"], body["removed"]), ("delta", 2, []))
+        self.assertEqual(list(body["changed"]), ["SYM00000"])
+        self.assertEqual(body["changed"]["SYM00000"][0], 1234.5)
+
+        # Lookups stat and may re-map the snapshot file, so they stay off the event loop
+        self.assertTrue(all(name.startswith("stocks-blocking") for name in self.lookups))
+        await self.close(first, second)
+
+    async def test_overflowing_subscriber_is_resynced(self):
+        slow, fast = await self.subscribe(), await self.subscribe()
+        await self.advance(self.publish())
+        await self.receive(slow)
+        await self.receive(fast)
+
+        for price in (1.0, 2.0, 3.0):
+            await self.advance(self.publish(price=price))
+            event, body = await self.receive(fast)
+            self.assertEqual(event, "delta")
+
+        # The third delta overflowed the two-slot queue: the queued deltas gave way to a resync
+        event, body = await self.receive(slow)
+        self.assertEqual((event, body["seq"]), ("snapshot", 4))
+        self.assertEqual(body["rows"]["SYM00000"][0], 3.0)
+        await self.close(slow, fast)
+
+    async def test_version_gap_is_sent_in_full(self):
+        client = await self.subscribe()
+        await self.advance(self.publish())
+        await self.receive(client)
+
+        self.publish(price=1.0)
+        await self.advance(self.publish(price=2.0))
+        event, body = await self.receive(client)
+        self.assertEqual((event, body["seq"]), ("snapshot", 2))
+        self.assertEqual(body["version"], self.latest.tag)
+
+        await self.advance(self.publish(price=3.0))
+        event, body = await self.receive(client)
+        self.assertEqual((event, body["seq"]), ("delta", 3))
+        await self.close(client)
+
+
+@override_settings(STOCK_HISTORY_MAX_POINTS=5)
+class PriceHistoryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = f"{directory.name}/stocks.db"
+        settings = override_settings(STOCK_HISTORY_DB=self.db_path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reader = mock.patch.object(history_module, "_history", None)
+        reader.start()
+        self.addCleanup(reader.stop)
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+        # 2024-01-01 is a Monday: days 1-7 and 8-14 are whole weeks; 40 days span two months
+        with duckdb.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE raw_stock_data AS
+                SELECT
+                    'COMI' AS symbol,
+                    CAST(DATE '2024-01-01' + INTERVAL (d) DAY AS DATE) AS date,
+                    d + 1.0 AS open,
+                    d + 3.0 AS high,
+                    d - 1.0 AS low,
+                    d + 1.5 AS close,
+                    CAST(10 * (d + 1) AS BIGINT) AS volume
+                FROM range(40) t(d)
+            """)
+
+    def get(self, **params):
+        return self.client.get("/api/stocks/comi/history/", params)
+
+    def test_buckets_aggregate_ohlcv(self):
+        body = self.get(interval="week", start="2024-01-01", end="2024-01-14").json()
+
+        self.assertEqual((body["symbol"], body["interval"], body["count"]), ("COMI", "week", 2))
+        first, second = body["data"]
+        self.assertEqual(first, {
+            "date": "2024-01-01", "open": 1.0, "high": 9.0, "low": -1.0, "close": 7.5, "volume": 280,
+        })
+        self.assertEqual((second["date"], second["open"], second["close"]), ("2024-01-08", 8.0, 14.5))
+        self.assertEqual((body["start"], body["end"]), ("2024-01-01", "2024-01-08"))
+
+        body = self.get(interval="day", start="2024-01-03", end="2024-01-05").json()
+        self.assertEqual([row["date"] for row in body["data"]], ["2024-01-03", "2024-01-04", "2024-01-05"])
+
+    def test_intervals_coarsen_to_fit_the_point_cap(self):
+        # 40 days and 6 weeks exceed 5 points; 2 months fit
+        body = self.get().json()
+        self.assertEqual((body["interval"], body["count"]), ("month", 2))
+        self.assertEqual(body["data"][1]["volume"], sum(10 * (d + 1) for d in range(31, 40)))
+
+        body = self.get(interval="day", start="2024-01-01", end="2024-01-05").json()
+        self.assertEqual((body["interval"], body["count"]), ("day", 5))
+
+        with override_settings(STOCK_HISTORY_MAX_POINTS=1), mock.patch.object(history_module, "_history", None):
+            body = self.get(interval="month").json()
+        # Even monthly buckets exceed the cap: only the latest are kept
+        self.assertEqual([row["date"] for row in body["data"]], ["2024-02-01"])
+
+    def test_invalid_queries_and_missing_data(self):
+        for params in ({"start": "2024-13-01"}, {"end": "yesterday"},
+                       {"start": "2024-02-01", "end": "2024-01-01"}, {"interval": "hour"}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()["success"])
+
+        self.assertEqual(self.client.get("/api/stocks/ETEL/history/").status_code, 404)
+        self.assertEqual(self.get(start="2025-01-01").status_code, 404)
+
+        with override_settings(STOCK_HISTORY_DB=f"{self.db_path}.missing"), \
+                mock.patch.object(history_module, "_history", None):
+            response = self.get()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_results_are_cached_until_the_database_changes(self):
+        self.assertEqual(self.get(interval="day", start="2024-01-01", end="2024-01-01").json()["count"], 1)
+        with duckdb.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM raw_stock_data WHERE date = DATE '2024-01-01'")
+        self.assertEqual(self.get(interval="day", start="2024-01-01", end="2024-01-01").status_code, 404)
+
+
+class PrecompressedResponseTests(SnapshotAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.snapshot = self.publish(make_screener_frame(40))
+        self.identity = self.client.get("/api/insights/")
+
+    def get(self, **headers):
+        return self.client.get("/api/insights/", headers=headers)
+
+    def test_bodies_are_encoded_for_the_accepted_coding(self):
+        response = self.identity
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertIn("Accept-Encoding", response["Vary"].split(", "))
+        self.assertEqual(response["X-Snapshot-Version"], self.snapshot.tag)
+        self.assertTrue(orjson.loads(response.content)["success"])
+
+        decoders = {"gzip": gzip.decompress, "br": brotli.decompress}
+        cases = [
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0, gzip;q=0.5", "gzip"),
+            ("*", "br"),
+            ("gzip;q=0, *;q=0", None),
+            ("identity", None),
+            ("deflate", None),
+        ]
+        etags = {response["ETag"]}
+        for accept, coding in cases:
+            response = self.get(accept_encoding=accept)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get("Content-Encoding"), coding, accept)
+            self.assertIn("Accept-Encoding", response["Vary"].split(", "))
+            body = decoders[coding](response.content) if coding else response.content
+            self.assertEqual(body, self.identity.content)
+            etags.add(response["ETag"])
+        # One strong validator per representation
+        self.assertEqual(len(etags), 3)
+        self.assertTrue(all(etag.startswith('"') for etag in etags))
+
+    def test_revalidation_is_answered_with_304(self):
+        etag = self.identity["ETag"]
+        last_modified = self.identity["Last-Modified"]
+
+        for headers in ({"if_none_match": etag}, {"if_none_match": f'"other", W/{etag}'},
+                        {"if_none_match": "*"}, {"if_modified_since": last_modified}):
+            response = self.get(**headers)
+            self.assertEqual(response.status_code, 304, headers)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["ETag"], etag)
+
+        gzip_etag = self.get(accept_encoding="gzip")["ETag"]
+        self.assertEqual(self.get(accept_encoding="gzip", if_none_match=gzip_etag).status_code, 304)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+        self.assertEqual(self.get(if_modified_since="Mon, 01 Jan 2001 00:00:00 GMT").status_code, 200)
+        # If-None-Match wins over If-Modified-Since
+        self.assertEqual(self.get(if_none_match='"other"', if_modified_since=last_modified).status_code, 200)
+
+    def test_new_snapshots_get_new_validators(self):
+        self.publish(make_screener_frame(41))
+        response = self.get(if_none_match=self.identity["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.identity["ETag"])
+        self.assertNotEqual(response.content, self.identity.content)
+
+
+def list_stock(symbol, name, sector, industry, market_cap, price):
+    return {
+        "symbol": symbol, "name": name, "sector": sector, "industry": industry,
+        "market_capitalization": market_cap, "price": price,
+    }
+
+
+class StockListFilterTests(SimpleTestCase):
+    def setUp(self):
+        self.list_filter = StockListFilter([
+            list_stock("COMI", "Commercial International Bank", "Finance", "Major Banks", 400.0, 80.0),
+            list_stock("ETEL", "Telecom Egypt", "Communications", "Major Telecommunications", 60.0, 40.0),
+            list_stock("HRHO", "EFG Holding", "Finance", "Investment Banks/Brokers", 40.0, 20.0),
+            list_stock("ABUK", "Abu Qir Fertilizers", "Process Industries", "Chemicals: Agricultural", 90.0, 60.0),
+            list_stock("NEWX", "New Listing", "Finance", "Regional Banks", 0.0, 10.0),
+        ])
+
+    def symbols(self, **query):
+        return [stock["symbol"] for stock in self.list_filter.apply(query)]
+
+    def test_each_filter(self):
+        # Default order is by market cap, largest first
+        self.assertEqual(self.symbols(), ["COMI", "ABUK", "ETEL", "HRHO", "NEWX"])
+        self.assertEqual(self.symbols(sector="FINANCE"), ["COMI", "HRHO", "NEWX"])
+        # Sector and industry match substrings of the indexed values
+        self.assertEqual(self.symbols(industry="banks"), ["COMI", "HRHO", "NEWX"])
+        self.assertEqual(self.symbols(sector="industries"), ["ABUK"])
+        self.assertEqual(self.symbols(sector="energy"), [])
+        self.assertEqual(self.symbols(min_market_cap="60"), ["COMI", "ABUK", "ETEL"])
+        self.assertEqual(self.symbols(max_market_cap="60"), ["ETEL", "HRHO"])
+        self.assertEqual(self.symbols(min_market_cap="40", max_market_cap="90"), ["ABUK", "ETEL", "HRHO"])
+        # Stocks without a market cap never match a range
+        self.assertEqual(self.symbols(max_market_cap="1000"), ["COMI", "ABUK", "ETEL", "HRHO"])
+        # Search matches symbols or names
+        self.assertEqual(self.symbols(search="co"), ["COMI", "ETEL"])
+        self.assertEqual(self.symbols(search="hrho"), ["HRHO"])
+        # Empty values are no filter
+        self.assertEqual(self.symbols(sector="", search=""), self.symbols())
+
+    def test_combined_filters_and_ordering(self):
+        self.assertEqual(self.symbols(sector="finance", industry="major"), ["COMI"])
+        self.assertEqual(self.symbols(sector="finance", min_market_cap="10", search="bank"), ["COMI"])
+        self.assertEqual(self.symbols(industry="banks", ordering="price"), ["NEWX", "HRHO", "COMI"])
+        self.assertEqual(self.symbols(ordering="-price"), ["COMI", "ABUK", "ETEL", "HRHO", "NEWX"])
+
+        for query in ({"min_market_cap": "lots"}, {"ordering": "name"}, {"ordering": "-unknown"}):
+            with self.assertRaises(InvalidQuery):
+                self.list_filter.apply(query)
+
+    def test_queries_are_cached_per_normalized_key(self):
+        with mock.patch.object(self.list_filter, "_evaluate", wraps=self.list_filter._evaluate) as evaluate:
+            first = self.list_filter.apply({"sector": "Finance"})
+            second = self.list_filter.apply({"sector": "finance", "search": ""})
+            self.list_filter.apply({"sector": "finance", "ordering": "price"})
+        self.assertEqual(first, second)
+        self.assertEqual(evaluate.call_count, 2)
+
+    def test_lru_cache_evicts_the_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        self.assertEqual(len(cache), 2)
+
+
+class StockListAPITests(SnapshotAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.publish(make_screener_frame(30))
+        self.full = self.get()
+
+    def get(self, status=200, **params):
+        response = self.client.get("/api/stocks/", params)
+        self.assertEqual(response.status_code, status, params)
+        return response.json()
+
+    def test_pagination_is_opt_in(self):
+        self.assertEqual((self.full["count"], len(self.full["data"])), (30, 30))
+        self.assertNotIn("next", self.full)
+
+        first = self.get(page_size=12)
+        self.assertEqual(first["count"], 30)
+        self.assertEqual(first["data"], self.full["data"][:12])
+        self.assertIn("page=2", first["next"])
+        self.assertIn("page_size=12", first["next"])
+        self.assertIsNone(first["previous"])
+
+        last = self.get(page=3, page_size=12)
+        self.assertEqual(last["data"], self.full["data"][24:])
+        self.assertIsNone(last["next"])
+        self.assertIn("page=2", last["previous"])
+
+        self.assertEqual(len(self.get(page=1)["data"]), 30)  # Default page size is the REST_FRAMEWORK one
+        self.assertFalse(self.get(status=404, page=4, page_size=12)["success"])
+
+    def test_ordering(self):
+        caps = [row["market_capitalization"] for row in self.full["data"]]
+        self.assertEqual(caps, sorted(caps, reverse=True))
+
+        prices = [row["price"] for row in self.get(ordering="price")["data"]]
+        self.assertEqual(prices, sorted(prices))
+        descending = self.get(ordering="-price", page_size=5, page=2)["data"]
+        self.assertEqual([row["price"] for row in descending], sorted(prices, reverse=True)[5:10])
+
+        for ordering in ("name", "-bogus"):
+            body = self.get(status=400, ordering=ordering)
+            self.assertIn("Cannot order by", body["message"])
+
+    def test_field_projection(self):
+        body = self.get(fields="symbol, price", ordering="-price", page_size=3)
+        self.assertEqual([list(row) for row in body["data"]], [["symbol", "price"]] * 3)
+        self.assertEqual(body["data"][0]["price"], max(row["price"] for row in self.full["data"]))
+
+        body = self.get(status=400, fields="symbol,bogus")
+        self.assertEqual(body["message"], "Unknown fields: bogus")
+
+
+class InsightsParityTests(SimpleTestCase):
+    def frame(self, rows):
+        df = make_screener_frame(rows)
+        # Ties in the ranked columns
+        df["Volume"] = np.round(df["Volume"], -6)
+        df["Technical Rating"] = np.round(df["Technical Rating"], 1)
+        df.loc[:6, "Change %"] = 2.5
+        df.loc[:4, "Weekly Performance"] = df.loc[5, "Weekly Performance"]
+        # Missing and infinite values in ranked, filtered and output columns
+        df.loc[7:9, ["Change %", "Price to Earnings Ratio (TTM)", "Dividend Yield Forward"]] = np.nan
+        df.loc[10, "Change %"] = np.inf
+        df.loc[11, "Price to Earnings Ratio (TTM)"] = -np.inf
+        df.loc[12, "Monthly Performance"] = np.inf
+        df.loc[13, "Price"] = np.inf
+        df.loc[14, "Name"] = None
+        return df
+
+    def assertMatchesLegacy(self, df):
+        expected = LegacyInsights.process_stock_insights(df)
+        actual = InsightsEngine(df).run()
+        expected.pop("timestamp")
+        actual.pop("timestamp")
+        # Rendered, so NaN compares equal to NaN and floats must not turn into strings
+        self.assertEqual(render_json(actual), render_json(expected))
+        return actual
+
+    def test_mixed_frame_matches_the_pandas_implementation(self):
+        insights = self.assertMatchesLegacy(self.frame(40))
+        # Text columns make every row an object row: values come out as strings
+        self.assertIsInstance(insights["top_bullish"][0]["Price"], str)
+
+    def test_numeric_frame_matches_the_pandas_implementation(self):
+        df = self.frame(40).select_dtypes("number")
+        insights = self.assertMatchesLegacy(df)
+        self.assertIsInstance(insights["volume_leaders"][0]["Volume"], float)
+
+    def test_short_frames_are_padded_with_missing_rows(self):
+        df = self.frame(15)
+        df.loc[:, "Weekly Performance"] = np.nan
+        df.loc[[2, 5, 9], "Weekly Performance"] = [4.0, 4.0, -1.0]
+        insights = self.assertMatchesLegacy(df)
+        self.assertEqual(len(insights["best_short_term"]), 10)
+
+    def test_top_k_matches_nlargest_and_nsmallest(self):
+        values = pd.Series([3.0, np.nan, 1.0, 3.0, np.inf, 2.0, np.nan, 1.0, 3.0])
+        # Ties keep row order; NaN rows only fill the tail once real values run out
+        for k in (1, 3, 4, 6, 8, 9, 12):
+            self.assertEqual(top_k(values.to_numpy(), k).tolist(), values.nlargest(k).index.tolist())
+            self.assertEqual(
+                top_k(values.to_numpy(), k, largest=False).tolist(), values.nsmallest(k).index.tolist()
+            )
+        candidates = np.array([1, 2, 5, 6, 7])
+        self.assertEqual(top_k(values.to_numpy(), 4, candidates=candidates).tolist(), [5, 2, 7, 1])
+
+
+class RendererTests(SimpleTestCase):
+    def test_numpy_values_and_non_finite_floats(self):
+        data = {
+            "nan": float("nan"),
+            "inf": np.inf,
+            "float32": np.float32(1.5),
+            "int64": np.int64(7),
+            "bool": np.bool_(True),
+            "array": np.array([1.0, np.nan, -np.inf]),
+            "ints": np.arange(3),
+            "timestamp": pd.Timestamp("2024-01-02"),
+            "decimal": Decimal("1.25"),
+            1: "non-string key",
+        }
+        self.assertEqual(orjson.loads(render_json(data)), {
+            "nan": None,
+            "inf": None,
+            "float32": 1.5,
+            "int64": 7,
+            "bool": True,
+            "array": [1.0, None, None],
+            "ints": [0, 1, 2],
+            "timestamp": "2024-01-02T00:00:00",
+            "decimal": 1.25,
+            "1": "non-string key",
+        })
+
+    def test_line_separators_are_escaped(self):
+        content = render_json({"name": "Line\u2028Paragraph\u2029End"})
+        self.assertNotIn("\u2028".encode(), content)
+        self.assertNotIn("\u2029".encode(), content)
+        self.assertIn(b"Line\\u2028Paragraph\\u2029End", content)
+        self.assertEqual(orjson.loads(content)["name"], "Line\u2028Paragraph\u2029End")
+
+    def test_drf_renderer(self):
+        renderer = NumpyJSONRenderer()
+        self.assertEqual(renderer.render(None), b"")
+        self.assertEqual(renderer.render({"price": np.float64("nan")}), b'{"price":null}')
+        indented = renderer.render({"a": [1]}, "application/json; indent=4", {})
+        self.assertEqual(indented, b'{\n  "a": [\n    1\n  ]\n}')
+
+
+class FieldRegistryTests(SimpleTestCase):
+    def test_stock_model_declares_every_registry_field_in_order(self):
+        model_fields = [field for field in Stock._meta.concrete_fields if field.name != "id"]
+        self.assertEqual(
+            [field.name for field in model_fields],
+            [field.name for field in STOCK_FIELDS] + ["created_at", "updated_at"],
+        )
+        kinds = {str: ("CharField", "TextField"), int: ("BigIntegerField",), float: ("FloatField",)}
+        for field in STOCK_FIELDS:
+            self.assertIn(Stock._meta.get_field(field.name).get_internal_type(), kinds[field.kind], field.name)
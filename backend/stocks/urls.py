@@ -2,14 +2,33 @@
 URL configuration for stocks app.
 """
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.STOCK_ASYNC_VIEWS:
+    # ASGI: blocking work runs on a bounded executor, not the event loop
+    insights_view = async_views.stock_insights
+    list_view = async_views.stock_list
+    detail_view = async_views.stock_detail
+    history_view = async_views.stock_history
+else:
+    insights_view = views.StockInsightsAPIView.as_view()
+    list_view = views.StockListAPIView.as_view()
+    detail_view = views.StockDetailAPIView.as_view()
+    history_view = views.StockHistoryAPIView.as_view()
 
 urlpatterns = [
     # Main insights endpoint (includes all categorized data)
-    path('insights/', views.StockInsightsAPIView.as_view(), name='stock-insights'),
+    path('insights/', insights_view, name='stock-insights'),
     
     # Stock lists
-    path('stocks/', views.StockListAPIView.as_view(), name='stock-list'),
-    path('stocks/<str:symbol>/', views.StockDetailAPIView.as_view(), name='stock-detail'),
+    path('stocks/', list_view, name='stock-list'),
+    path('stocks/<str:symbol>/', detail_view, name='stock-detail'),
+    path('stocks/<str:symbol>/history/', history_view, name='stock-history'),
 ]
+
+if settings.STOCK_ASYNC_VIEWS:
+    # Quote deltas as Server-Sent Events; each client holds a connection open,
+    # which only an event loop can afford. Matched before the detail route.
+    urlpatterns.insert(0, path('stocks/stream/', async_views.stock_stream, name='stock-stream'))
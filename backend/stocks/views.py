@@ -2,15 +2,185 @@
 Stock API Views
 """
 
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.cache import cache
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
 from datetime import datetime
-from .stock_fetcher import StockDataFetcher
+from .deltas import diff, keyed_frame, records
+from .fields import STOCK_LIST_CONVERTER
+from .history import HistoryUnavailable, get_price_history
+from .refresher import get_latest_snapshot, snapshot_artifact
+from .responses import cached_json_response
+from .snapshot import get_snapshot_store
+from .stock_filter import LIST_FIELDS, InvalidQuery, StockListFilter
 import json
 
 
+def snapshot_unavailable_response():
+    """503 returned while the first snapshot is still being fetched"""
+    response = Response(
+        {
+            "success": False,
+            "message": "Stock data is being prepared, please retry shortly",
+        },
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = "5"
+    return response
+
+
+def requested_market(query_params):
+    """Market selected with ``market=``, or the default market"""
+    market = (query_params.get('market') or settings.STOCK_DEFAULT_MARKET).lower()
+    if market not in settings.STOCK_MARKETS:
+        raise InvalidQuery(
+            f"Unknown market '{market}'; available: {', '.join(settings.STOCK_MARKETS)}"
+        )
+    return market
+
+
+def snapshot_fields(snapshot):
+    """Body fields identifying the snapshot; its age is sent as X-Snapshot-Age"""
+    return {
+        "market": snapshot.market,
+        "snapshot_version": snapshot.tag,
+        "fetched_at": datetime.fromtimestamp(snapshot.fetched_at).isoformat(),
+    }
+
+
+def stock_list_filter(snapshot):
+    """Filter engine over the snapshot's precomputed stock list"""
+    return snapshot.derive(
+        "stock_filter",
+        lambda snap: StockListFilter(snapshot_artifact(snap, "stocks_list")),
+    )
+
+
+def stock_list_frame(snapshot):
+    """The snapshot's stock list as converted columns indexed by symbol"""
+    return snapshot.derive(
+        "stock_list_frame",
+        lambda snap: keyed_frame(STOCK_LIST_CONVERTER.columns(snap.frame)),
+    )
+
+
+# Query parameters that select a subset of the list; ``since`` diffs all of it
+SUBSET_PARAMS = (
+    'sector', 'industry', 'min_market_cap', 'max_market_cap', 'search', 'ordering', 'page', 'page_size',
+)
+
+
+def since_version(query_params):
+    """
+    ``(epoch, version)`` of the snapshot tag requested with ``since=<tag>``,
+    or None. Tags without an epoch never match a current snapshot.
+    """
+    value = query_params.get('since')
+    if not value:
+        return None
+    epoch, _, number = value.rpartition('-')
+    try:
+        version = int(number)
+    except ValueError:
+        raise InvalidQuery("'since' must be a snapshot version")
+    subset = [name for name in SUBSET_PARAMS if query_params.get(name)]
+    if subset:
+        raise InvalidQuery(f"'since' cannot be combined with {', '.join(subset)}")
+    return epoch, version
+
+
+def stock_list_delta_body(snapshot, previous, fields):
+    """Rows added, changed and removed since the ``previous`` snapshot"""
+    names = fields or LIST_FIELDS
+    current = stock_list_frame(snapshot)
+    # Only the projected fields count as changes
+    added, changed, removed = diff(stock_list_frame(previous), current, names)
+    return {
+        "success": True,
+        "cached": True,
+        **snapshot_fields(snapshot),
+        "delta": True,
+        "since": previous.tag,
+        # Same as the full list's, so clients can check the applied delta
+        "count": len(snapshot_artifact(snapshot, "stocks_list")),
+        "added": records(current[added], names),
+        "changed": records(current[changed], names),
+        "removed": removed,
+    }
+
+
+class StockListPagination(PageNumberPagination):
+    """Opt-in ``page``/``page_size`` pagination for the stock list"""
+
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def is_requested(self, request):
+        return (
+            self.page_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+
+def insights_body(snapshot):
+    """Insights response body"""
+    return {
+        "success": True,
+        "cached": True,
+        **snapshot_fields(snapshot),
+        "data": snapshot_artifact(snapshot, "insights"),
+    }
+
+
+def stock_list_body(request, snapshot):
+    """Filtered, ordered, paginated and projected list response body"""
+    list_filter = stock_list_filter(snapshot)
+    fields = list_filter.projection(request.query_params)
+
+    since = since_version(request.query_params)
+    if since is not None:
+        epoch, version = since
+        previous = get_snapshot_store(snapshot.market).at(version, epoch)
+        if previous is not None:
+            return stock_list_delta_body(snapshot, previous, fields)
+
+    filtered_data = list_filter.apply(request.query_params)
+
+    body = {
+        "success": True,
+        "cached": True,
+        **snapshot_fields(snapshot),
+        "count": len(filtered_data),
+    }
+    if since is not None:
+        # The requested version is no longer retained or from an earlier epoch: send everything
+        body["delta"] = False
+
+    # Paginate only when asked so clients fetching the whole list keep working
+    paginator = StockListPagination()
+    if paginator.is_requested(request):
+        filtered_data = paginator.paginate_queryset(filtered_data, request)
+        body["next"] = paginator.get_next_link()
+        body["previous"] = paginator.get_previous_link()
+
+    if fields is not None:
+        filtered_data = [{name: stock[name] for name in fields} for stock in filtered_data]
+    body["data"] = filtered_data
+    return body
+
+
+def stock_detail_body(snapshot, symbol):
+    """Detail response body; raises NotFound for an unknown symbol"""
+    # Detail payloads for every symbol are precomputed per snapshot
+    stock_data = snapshot_artifact(snapshot, "stock_details").get(symbol.upper())
+    if not stock_data:
+        raise NotFound(f'Stock with symbol {symbol} not found')
+    return {'success': True, **snapshot_fields(snapshot), 'data': stock_data}
+
+
 class StockInsightsAPIView(APIView):
     """
     API endpoint to fetch Egyptian stock market insights
@@ -19,42 +189,25 @@ class StockInsightsAPIView(APIView):
     def get(self, request):
         """
         GET endpoint to fetch stock insights
-        Caches data for 5 minutes to avoid excessive API calls
+        Served from the latest snapshot without waiting on the upstream
+        market=<name> selects one of STOCK_MARKETS (default market otherwise)
         """
         try:
-            # Try to get cached data first
-            cache_key = "egypt_stock_insights"
-            cached_data = cache.get(cache_key)
+            # Latest completed snapshot; the refresher keeps it up to date
+            snapshot = get_latest_snapshot(requested_market(request.query_params))
 
-            if cached_data:
-                return Response(
-                    {"success": True, "cached": True, "data": cached_data},
-                    status=status.HTTP_200_OK,
-                )
-
-            # Fetch fresh data
-            stocks_df = StockDataFetcher.fetch_egypt_stocks()
-
-            if stocks_df.empty:
-                return Response(
-                    {
-                        "success": False,
-                        "message": "Unable to fetch stock data at this time",
-                    },
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
-                )
-
-            # Process insights
-            insights = StockDataFetcher.process_stock_insights(stocks_df)
+            if snapshot is None:
+                return snapshot_unavailable_response()
 
-            # Cache for 5 minutes
-            cache.set(cache_key, insights, 300)
+            # Insights are precomputed when the snapshot is published and
+            # the body is rendered once per snapshot
+            return cached_json_response(request, snapshot, lambda: insights_body(snapshot))
 
+        except InvalidQuery as e:
             return Response(
-                {"success": True, "cached": False, "data": insights},
-                status=status.HTTP_200_OK,
+                {"success": False, "message": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
         except Exception as e:
             return Response(
                 {"success": False, "message": f"Error processing request: {str(e)}"},
@@ -70,113 +223,45 @@ class StockListAPIView(APIView):
     def get(self, request):
         """
         GET endpoint to fetch all stocks from StockDataFetcher
-        Caches data for 5 minutes to avoid excessive API calls
-        """
-        try:
-            # Try to get cached data first
-            cache_key = "egypt_stocks_list"
-            cached_data = cache.get(cache_key)
+        Served from the latest snapshot without waiting on the upstream
 
-            if cached_data:
-                return Response(
-                    {"success": True, "cached": True, "data": cached_data},
-                    status=status.HTTP_200_OK,
-                )
+        market=<name> selects one of STOCK_MARKETS.
+        Filters: sector, industry, min_market_cap, max_market_cap, search.
+        ordering=<field> or -<field> on any numeric field, fields=a,b to
+        project columns, page/page_size to paginate.
 
-            # Fetch fresh data
-            stocks_df = StockDataFetcher.fetch_egypt_stocks()
-
-            if stocks_df.empty:
-                return Response(
-                    {
-                        "success": False,
-                        "message": "Unable to fetch stock data at this time",
-                    },
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
-                )
+        since=<snapshot_version> returns only the rows added, changed and
+        removed since that version, or the full list with "delta": false
+        once it is no longer retained or the store was reset since.
+        """
+        try:
+            # Latest completed snapshot; the refresher keeps it up to date
+            snapshot = get_latest_snapshot(requested_market(request.query_params))
 
-            # Process stocks data
-            stocks_data = StockDataFetcher._prepare_stocks_data(stocks_df)
-            
-            # Apply filters if provided
-            filtered_data = self._apply_filters(stocks_data, request.query_params)
+            if snapshot is None:
+                return snapshot_unavailable_response()
 
-            # Cache for 5 minutes
-            cache.set(cache_key, filtered_data, 300)
+            # Filters run against indexes built once per snapshot, and each
+            # distinct query's body is rendered once per snapshot
+            return cached_json_response(
+                request, snapshot, lambda: stock_list_body(request, snapshot)
+            )
 
+        except InvalidQuery as e:
             return Response(
-                {
-                    "success": True, 
-                    "cached": False, 
-                    "data": filtered_data,
-                    "count": len(filtered_data)
-                },
-                status=status.HTTP_200_OK,
+                {"success": False, "message": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except NotFound as e:
+            return Response(
+                {"success": False, "message": str(e.detail)},
+                status=status.HTTP_404_NOT_FOUND,
             )
-
         except Exception as e:
             return Response(
                 {"success": False, "message": f"Error processing request: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-    
-    def _apply_filters(self, stocks_data, query_params):
-        """
-        Apply filters to the stocks data
-        """
-        filtered_data = stocks_data.copy()
-        
-        # Filter by sector if provided
-        sector = query_params.get('sector', None)
-        if sector:
-            filtered_data = [
-                stock for stock in filtered_data 
-                if stock.get('Sector', '').lower().find(sector.lower()) != -1
-            ]
-        
-        # Filter by industry if provided
-        industry = query_params.get('industry', None)
-        if industry:
-            filtered_data = [
-                stock for stock in filtered_data 
-                if stock.get('Industry', '').lower().find(industry.lower()) != -1
-            ]
-        
-        # Filter by market cap range
-        min_market_cap = query_params.get('min_market_cap', None)
-        max_market_cap = query_params.get('max_market_cap', None)
-        
-        if min_market_cap:
-            min_cap = float(min_market_cap)
-            filtered_data = [
-                stock for stock in filtered_data 
-                if stock.get('Market Capitalization', 0) and stock.get('Market Capitalization', 0) >= min_cap
-            ]
-        
-        if max_market_cap:
-            max_cap = float(max_market_cap)
-            filtered_data = [
-                stock for stock in filtered_data 
-                if stock.get('Market Capitalization', 0) and stock.get('Market Capitalization', 0) <= max_cap
-            ]
-        
-        # Search by symbol or name
-        search = query_params.get('search', None)
-        if search:
-            search_lower = search.lower()
-            filtered_data = [
-                stock for stock in filtered_data 
-                if (stock.get('Symbol', '').lower().find(search_lower) != -1 or
-                    stock.get('Name', '').lower().find(search_lower) != -1)
-            ]
-        
-        # Sort by market capitalization (descending)
-        filtered_data.sort(
-            key=lambda x: x.get('Market Capitalization', 0), 
-            reverse=True
-        )
-        
-        return filtered_data
 
 
 class StockDetailAPIView(APIView):
@@ -187,37 +272,74 @@ class StockDetailAPIView(APIView):
     def get(self, request, symbol):
         """
         GET endpoint to fetch detailed stock information by symbol
+        in the market selected with market=<name>
         """
         try:
-            # Always fetch comprehensive data for individual stock details
-            stocks_df = StockDataFetcher.fetch_egypt_stocks()
-            if stocks_df.empty:
-                return Response(
-                    {
-                        "success": False,
-                        "message": "Unable to fetch stock data at this time",
-                    },
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
-                )
-            
-            # Get comprehensive stock data
-            stock_data = StockDataFetcher._prepare_comprehensive_stock_data(stocks_df, symbol.upper())
+            # Detail payloads for every symbol are precomputed per snapshot
+            snapshot = get_latest_snapshot(requested_market(request.query_params))
+            if snapshot is None:
+                return snapshot_unavailable_response()
             
-            if not stock_data:
+            return cached_json_response(
+                request, snapshot, lambda: stock_detail_body(snapshot, symbol)
+            )
+
+        except InvalidQuery as e:
+            return Response(
+                {'success': False, 'message': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except NotFound as e:
+            return Response(
+                {'success': False, 'message': str(e.detail)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {'success': False, 'message': f'Error processing request: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+
+
+class StockHistoryAPIView(APIView):
+    """
+    API endpoint for a stock's OHLCV price history
+    """
+
+    def get(self, request, symbol):
+        """
+        GET endpoint to fetch price history by symbol
+
+        start/end (YYYY-MM-DD) bound the range; interval=day, week, month or
+        auto (default). Buckets are coarsened to stay under the point cap.
+        """
+        try:
+            history = get_price_history().get(symbol, request.query_params)
+
+            if not history["count"]:
                 return Response(
-                    {'success': False, 'message': f'Stock with symbol {symbol} not found'},
+                    {'success': False, 'message': f'No price history for {symbol}'},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            return Response({
-                'success': True,
-                'data': stock_data
-            }, status=status.HTTP_200_OK)
+            return Response({'success': True, **history})
 
+        except InvalidQuery as e:
+            return Response(
+                {'success': False, 'message': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except HistoryUnavailable as e:
+            response = Response(
+                {'success': False, 'message': str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response["Retry-After"] = "5"
+            return response
         except Exception as e:
             return Response(
                 {'success': False, 'message': f'Error processing request: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-
-
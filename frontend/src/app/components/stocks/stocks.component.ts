@@ -194,6 +194,11 @@ export class StocksComponent implements OnInit {
   sectors: string[] = [];
   industries: string[] = [];
 
+  readonly listFields = [
+    'symbol', 'name', 'price', 'change_percent', 'volume',
+    'market_capitalization', 'price_to_earnings_ratio_ttm', 'sector', 'industry'
+  ];
+
   constructor(
     private stockService: StockService,
     public languageService: LanguageService
@@ -207,7 +212,8 @@ export class StocksComponent implements OnInit {
     this.loading = true;
     this.error = null;
 
-    this.stockService.getStocks().subscribe({
+    // Only request the columns the table and filters render
+    this.stockService.getStocks({ fields: this.listFields.join(',') }).subscribe({
       next: (response) => {
         console.log('Stocks API Response:', response); // Debug log
         
@@ -197,6 +197,68 @@ export interface StockInsights {
   all_stocks: Stock[];
 }
 
+// With `since`, either the rows changed since that snapshot version
+// (delta: true) or, once it is no longer retained, the full list in `data`.
+// Versions are opaque tags; `count` is the full list's size either way.
+export interface StockListResponse {
+  success: boolean;
+  cached?: boolean;
+  market: string;
+  snapshot_version: string;
+  fetched_at: string;
+  count: number;
+  data?: Stock[];
+  next?: string | null;
+  previous?: string | null;
+  delta?: boolean;
+  since?: string;
+  added?: Stock[];
+  changed?: Stock[];
+  removed?: string[];
+}
+
+export interface PriceBar {
+  date: string;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+}
+
+export interface StockHistory {
+  success: boolean;
+  symbol: string;
+  interval: 'day' | 'week' | 'month';
+  start: string | null;
+  end: string | null;
+  count: number;
+  data: PriceBar[];
+}
+
+export interface Quote {
+  price: number;
+  change_percent: number;
+  volume: number;
+}
+
+// Latest quotes by symbol, as of snapshot `version`
+export interface QuoteState {
+  seq: number;
+  version: string;
+  fetched_at: number;
+  quotes: Map<string, Quote>;
+}
+
+interface QuoteEvent {
+  seq: number;
+  version: string;
+  fetched_at: number;
+  fields: (keyof Quote)[];
+  rows?: {[symbol: string]: number[]};
+  changed?: {[symbol: string]: number[]};
+  removed?: string[];
+}
 
 @Injectable({
   providedIn: 'root'
@@ -206,20 +268,27 @@ export class StockService {
 
   constructor(private http: HttpClient) {}
 
-  // Get comprehensive stock insights
-  getStockInsights(): Observable<{success: boolean, cached?: boolean, data: StockInsights}> {
-    return this.http.get<{success: boolean, cached?: boolean, data: StockInsights}>(`${this.apiUrl}/insights/`);
+  // Get comprehensive stock insights (default market unless `market` is given)
+  getStockInsights(market?: string): Observable<{success: boolean, cached?: boolean, market: string, data: StockInsights}> {
+    const params = market ? new HttpParams().set('market', market) : undefined;
+    return this.http.get<{success: boolean, cached?: boolean, market: string, data: StockInsights}>(`${this.apiUrl}/insights/`, { params });
   }
 
 
   // Get all stocks with optional filters
   getStocks(params?: {
+    market?: string;
     sector?: string;
     industry?: string;
     min_market_cap?: number;
     max_market_cap?: number;
     search?: string;
-  }): Observable<{success: boolean, cached?: boolean, data: Stock[], count: number}> {
+    ordering?: string;
+    fields?: string;
+    page?: number;
+    page_size?: number;
+    since?: string;
+  }): Observable<StockListResponse> {
     let httpParams = new HttpParams();
     
     if (params) {
@@ -230,12 +299,80 @@ export class StockService {
       });
     }
 
-    return this.http.get<{success: boolean, cached?: boolean, data: Stock[], count: number}>(`${this.apiUrl}/stocks/`, { params: httpParams });
+    return this.http.get<StockListResponse>(`${this.apiUrl}/stocks/`, { params: httpParams });
   }
 
   // Get individual stock details
-  getStockDetail(symbol: string): Observable<{success: boolean, cached?: boolean, data: StockDetail}> {
-    return this.http.get<{success: boolean, cached?: boolean, data: StockDetail}>(`${this.apiUrl}/stocks/${symbol}/`);
+  getStockDetail(symbol: string, market?: string): Observable<{success: boolean, cached?: boolean, data: StockDetail}> {
+    const params = market ? new HttpParams().set('market', market) : undefined;
+    return this.http.get<{success: boolean, cached?: boolean, data: StockDetail}>(`${this.apiUrl}/stocks/${symbol}/`, { params });
+  }
+
+  // Get downsampled OHLCV history for charting
+  getStockHistory(symbol: string, params?: {
+    start?: string;
+    end?: string;
+    interval?: 'auto' | 'day' | 'week' | 'month';
+  }): Observable<StockHistory> {
+    let httpParams = new HttpParams();
+
+    if (params) {
+      Object.keys(params).forEach(key => {
+        if (params[key as keyof typeof params] !== undefined) {
+          httpParams = httpParams.set(key, params[key as keyof typeof params]!.toString());
+        }
+      });
+    }
+
+    return this.http.get<StockHistory>(`${this.apiUrl}/stocks/${symbol}/history/`, { params: httpParams });
+  }
+
+  // Live quotes from the server-sent delta stream (ASGI deployments only).
+  // Emits the full quote map after every snapshot; reconnects to resync
+  // whenever an event is missed.
+  streamQuotes(market?: string): Observable<QuoteState> {
+    return new Observable<QuoteState>(subscriber => {
+      let source: EventSource;
+      let state: QuoteState | null = null;
+
+      const toQuote = (fields: (keyof Quote)[], values: number[]): Quote => {
+        const quote = {} as Quote;
+        fields.forEach((field, i) => quote[field] = values[i]);
+        return quote;
+      };
+
+      const connect = () => {
+        const query = market ? `?market=${encodeURIComponent(market)}` : '';
+        source = new EventSource(`${this.apiUrl}/stocks/stream/${query}`);
+
+        source.addEventListener('snapshot', message => {
+          const event: QuoteEvent = JSON.parse((message as MessageEvent).data);
+          const quotes = new Map<string, Quote>();
+          Object.entries(event.rows ?? {}).forEach(([symbol, values]) => quotes.set(symbol, toQuote(event.fields, values)));
+          state = {seq: event.seq, version: event.version, fetched_at: event.fetched_at, quotes};
+          subscriber.next(state);
+        });
+
+        source.addEventListener('delta', message => {
+          const event: QuoteEvent = JSON.parse((message as MessageEvent).data);
+          if (!state || event.seq !== state.seq + 1) {
+            // Missed an event: start over from a full snapshot
+            source.close();
+            state = null;
+            connect();
+            return;
+          }
+          const quotes = new Map(state.quotes);
+          Object.entries(event.changed ?? {}).forEach(([symbol, values]) => quotes.set(symbol, toQuote(event.fields, values)));
+          (event.removed ?? []).forEach(symbol => quotes.delete(symbol));
+          state = {seq: event.seq, version: event.version, fetched_at: event.fetched_at, quotes};
+          subscriber.next(state);
+        });
+      };
+
+      connect();
+      return () => source.close();
+    });
   }
 
 }